@@ -25,6 +25,7 @@ OPTIONAL_PACKAGES = {
     'openai': '>=1.0.0',
     'python-dotenv': '>=1.0.0',
     'schedule': '>=1.2.0',
+    'msgpack': '>=1.0.0',
     'sqlalchemy': '>=2.0.0',
     'pandas': '>=2.0.0',
     'numpy': '>=1.24.0',
@@ -6,6 +6,29 @@
 
 import re
 from typing import Dict, List, Tuple
+from .keyword_matcher import get_keyword_matcher
+
+# 二级小标题和分隔线（分隔线之后是文末说明，不属于任何章节）
+_SECTION_HEADING_RE = re.compile(r'^##\s+(.+?)\s*$', re.MULTILINE)
+_RULE_RE = re.compile(r'^-{3,}\s*$', re.MULTILINE)
+
+def split_sections(content: str) -> List[Dict]:
+    """按二级小标题切分章节，返回标题、正文及正文在原文中的起止位置"""
+    headings = list(_SECTION_HEADING_RE.finditer(content))
+    sections = []
+    for i, match in enumerate(headings):
+        start = match.end()
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(content)
+        rule = _RULE_RE.search(content, start, end)
+        if rule:
+            end = rule.start()
+        sections.append({
+            'heading': match.group(1),
+            'body': content[start:end].strip(),
+            'start': start,
+            'end': end
+        })
+    return sections
 
 class ArticleQualityAssessor:
     """文章质量评估器"""
@@ -19,6 +42,14 @@ class ArticleQualityAssessor:
             'content_quality': {'weight': 0.25},
             'originality': {'weight': 0.1}
         }
+        # 章节级评估：结构由整篇文章决定，不参与章节评分
+        self.section_metrics = {
+            'length': {'min': 100, 'max': 800, 'weight': 0.3},
+            'readability': {'weight': 0.3},
+            'content_quality': {'weight': 0.25},
+            'originality': {'weight': 0.15}
+        }
+        self.section_threshold = 0.6
     
     def assess_article(self, article_content: str, original_news: Dict = None) -> Dict:
         """评估文章质量"""
@@ -52,8 +83,63 @@ class ArticleQualityAssessor:
             'total_score': round(total_score, 2),
             'scores': scores,
             'grade': self._get_grade(total_score),
-            'suggestions': self._get_suggestions(scores)
+            'suggestions': self._get_suggestions(scores),
+            'sections': self.assess_sections(article_content, original_news)
         }
+
+    def assess_sections(self, content: str, original_news: Dict = None) -> List[Dict]:
+        """逐章节评估，把低分归因到具体章节，weak为True的章节需要改进"""
+        results = []
+        for index, section in enumerate(split_sections(content)):
+            body = section['body']
+            scores = {
+                'length': self._assess_section_length(body),
+                'readability': self._assess_readability(body),
+                'content_quality': self._assess_content_quality(body),
+                'originality': self._assess_originality(body, original_news) if original_news else 0.8
+            }
+            score = sum(scores[metric] * self.section_metrics[metric]['weight'] for metric in scores)
+            issues = self._get_section_issues(scores)
+            results.append({
+                'index': index,
+                'heading': section['heading'],
+                'score': round(score, 2),
+                'scores': scores,
+                'issues': issues,
+                'weak': score < self.section_threshold
+            })
+        return results
+
+    def _assess_section_length(self, body: str) -> float:
+        """评估章节长度"""
+        length = len(body)
+        min_len = self.section_metrics['length']['min']
+        max_len = self.section_metrics['length']['max']
+
+        if length < min_len:
+            return max(0.1, length / min_len)
+        elif length > max_len:
+            return max(0.5, 1 - (length - max_len) / max_len)
+        else:
+            return 1.0
+
+    def _get_section_issues(self, scores: Dict) -> List[str]:
+        """根据章节评分给出该章节的问题"""
+        issues = []
+
+        if scores['length'] < 0.6:
+            issues.append("内容过短，需要补充细节和分析")
+
+        if scores['readability'] < 0.6:
+            issues.append("句子或段落长度不合适，需要调整以提高可读性")
+
+        if scores['content_quality'] < 0.3:
+            issues.append("缺少数据、专家观点和事实支撑，逻辑衔接不足")
+
+        if scores['originality'] < 0.6:
+            issues.append("与原新闻重复较多，需要增加原创分析")
+
+        return issues
     
     def _assess_length(self, content: str) -> float:
         """评估文章长度"""
@@ -153,13 +239,9 @@ class ArticleQualityAssessor:
         """评估内容质量"""
         score = 0.0
         
-        # 关键词密度检查
-        quality_keywords = [
-            '分析', '研究', '数据', '专家', '观点', '影响', '发展', '趋势',
-            '政策', '市场', '技术', '创新', '改革', '合作', '建设'
-        ]
-        
-        keyword_count = sum(1 for keyword in quality_keywords if keyword in content)
+        # 关键词密度检查（质量词和连接词在同一遍扫描中统计）
+        keyword_hits = get_keyword_matcher().distinct(content)
+        keyword_count = keyword_hits.get('quality', 0)
         score += min(0.3, keyword_count * 0.05)
         
         # 数据和事实检查
@@ -177,8 +259,7 @@ class ArticleQualityAssessor:
             score += 0.1
         
         # 逻辑连接词检查
-        connectors = ['因此', '然而', '此外', '同时', '另外', '总之', '综上']
-        connector_count = sum(1 for connector in connectors if connector in content)
+        connector_count = keyword_hits.get('connector', 0)
         score += min(0.3, connector_count * 0.1)
         
         return min(1.0, score)
@@ -10,6 +10,42 @@ from typing import Dict, List
 
 class ArticleTemplateManager:
     """文章模板管理器"""
+
+    # 章节名 -> 生成方法名，模板渲染和预编译的渲染计划共用
+    SECTION_GENERATORS = {
+        '导语': '_generate_lead',
+        '引言': '_generate_introduction',
+        '开篇': '_generate_opening',
+        '观点提出': '_generate_viewpoint',
+        '人物介绍': '_generate_person_intro',
+
+        '事件详情': '_generate_event_details',
+        '现状分析': '_generate_current_analysis',
+        '核心内容': '_generate_core_content',
+        '论据支撑': '_generate_evidence',
+        '核心观点': '_generate_key_points',
+
+        '背景分析': '_generate_background',
+        '原因探讨': '_generate_cause_analysis',
+        '多角度分析': '_generate_multi_angle',
+        '反驳质疑': '_generate_counter_argument',
+        '深度对话': '_generate_dialogue',
+
+        '影响评估': '_generate_impact_assessment',
+        '趋势预测': '_generate_trend_prediction',
+        '案例展示': '_generate_case_study',
+        '深层思考': '_generate_deep_thinking',
+        '行业影响': '_generate_industry_impact',
+
+        '专家观点': '_generate_expert_opinion',
+        '建议对策': '_generate_suggestions',
+        '未来展望': '_generate_future_outlook',
+        '结论': '_generate_conclusion',
+
+        '结语': '_generate_conclusion',
+        '总结': '_generate_summary',
+        '结尾': '_generate_ending'
+    }
     
     def __init__(self):
         """初始化模板管理器"""
@@ -141,42 +177,7 @@ class ArticleTemplateManager:
     
     def _generate_section_content(self, section: str, news_data: Dict, analysis: Dict, article_type: str) -> str:
         """生成特定章节的内容"""
-        content_generators = {
-            '导语': self._generate_lead,
-            '引言': self._generate_introduction,
-            '开篇': self._generate_opening,
-            '观点提出': self._generate_viewpoint,
-            '人物介绍': self._generate_person_intro,
-            
-            '事件详情': self._generate_event_details,
-            '现状分析': self._generate_current_analysis,
-            '核心内容': self._generate_core_content,
-            '论据支撑': self._generate_evidence,
-            '核心观点': self._generate_key_points,
-            
-            '背景分析': self._generate_background,
-            '原因探讨': self._generate_cause_analysis,
-            '多角度分析': self._generate_multi_angle,
-            '反驳质疑': self._generate_counter_argument,
-            '深度对话': self._generate_dialogue,
-            
-            '影响评估': self._generate_impact_assessment,
-            '趋势预测': self._generate_trend_prediction,
-            '案例展示': self._generate_case_study,
-            '深层思考': self._generate_deep_thinking,
-            '行业影响': self._generate_industry_impact,
-            
-            '专家观点': self._generate_expert_opinion,
-            '建议对策': self._generate_suggestions,
-            '未来展望': self._generate_future_outlook,
-            '结论': self._generate_conclusion,
-            
-            '结语': self._generate_conclusion,
-            '总结': self._generate_summary,
-            '结尾': self._generate_ending
-        }
-        
-        generator = content_generators.get(section, self._generate_default_content)
+        generator = getattr(self, self.SECTION_GENERATORS.get(section, '_generate_default_content'))
         return generator(news_data, analysis, article_type)
     
     def _generate_lead(self, news_data: Dict, analysis: Dict, article_type: str) -> str:
@@ -14,9 +14,23 @@ except ImportError:
 from datetime import datetime
 import json
 import re
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+from . import text_analysis
+from .database import IdempotencyConflict
+from .singleflight import SingleFlight
+
+# 提示词版本号，提示词或生成流程变化时递增，使旧版本生成的文章不再被幂等复用
+PROMPT_VERSION = 1
 
 class ArticleWriter:
-    """文章撰写器类"""
+    """文章撰写器类
+
+    一个实例可被多个线程（如Flask的各请求线程）共享：撰写过程中的状态都在局部变量中，
+    路由器重建和模型切换在锁内进行，LLM客户端共用进程内的HTTP连接池。
+    """
     
     def __init__(self):
         """初始化文章撰写器"""
@@ -28,6 +42,54 @@ class ArticleWriter:
             # 如果配置模块不可用，使用环境变量
             self.config = None
 
+        # 共享缓存（分析结果等）
+        from .cache import get_cache
+        self.cache = get_cache()
+
+        # LLM响应缓存（落盘），可通过LLM_CACHE_ENABLED关闭
+        from .cache import get_llm_cache
+        cache_enabled = self.config.LLM_CACHE_ENABLED if self.config else True
+        self.llm_cache = get_llm_cache() if cache_enabled else None
+
+        # LLM调用账本：记录每次调用的用量、延迟和结果
+        from .usage_ledger import UsageLedger
+        self.usage_ledger = UsageLedger(
+            batch_size=self.config.LLM_USAGE_BATCH_SIZE if self.config else 50,
+            enabled=self.config.LLM_USAGE_LEDGER_ENABLED if self.config else True
+        )
+
+        # 进程内共享的LLM调用限流器
+        from .rate_limiter import get_rate_limiter
+        self.rate_limiter = get_rate_limiter()
+
+        # 提示词构建器：按模型计算token数，把原文压缩到预算内
+        from .prompt_builder import PromptBuilder
+        self.prompt_builder = PromptBuilder(
+            model=self.config.OPENAI_MODEL if self.config else None,
+            source_budget=self.config.PROMPT_SOURCE_TOKENS if self.config else 600,
+            list_budget=self.config.PROMPT_LIST_TOKENS if self.config else 150
+        )
+
+        # 多服务商路由器（按需构建），重建和模型切换在锁内进行
+        self._router = None
+        self._router_key = None
+        self._lock = threading.RLock()
+
+        # 相同幂等键的并发请求合并为一次生成
+        self._inflight = SingleFlight()
+
+        # LLM调用线程池，用于并发执行互不依赖的AI请求
+        max_workers = self.config.LLM_MAX_WORKERS if self.config else 8
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        # 章节生成在正文任务内部提交，使用独立线程池，避免占满上面的线程池后互相等待
+        self.section_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-section')
+        # 截止时间模式下的AI生成和后台升级任务
+        self.deadline_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-deadline')
+        # 路由器发送服务商请求的线程池；路由器重建时共用，旧路由器上进行中的请求不受影响
+        self.router_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='llm-route')
+        # 使用分章节并发生成的文章类型
+        self.sectioned_types = set(self.config.SECTIONED_ARTICLE_TYPES) if self.config else {'analysis', 'feature'}
+
         # 初始化AI客户端
         self.ai_clients = {}
         self._init_ai_clients()
@@ -54,62 +116,196 @@ class ArticleWriter:
     def _init_ai_clients(self):
         """初始化AI客户端"""
         # OpenAI客户端
+        from .llm_providers import HTTPPoolSettings, get_openai_http_client
+        pool_settings = HTTPPoolSettings(self.config) if self.config else None
+
         openai_key = self.config.OPENAI_API_KEY if self.config else os.getenv('OPENAI_API_KEY')
         if openai_key and OPENAI_AVAILABLE:
             try:
                 import openai
-                self.ai_clients['openai'] = openai.OpenAI(api_key=openai_key)
+                base_url = self.config.OPENAI_BASE_URL if self.config else os.getenv('OPENAI_BASE_URL')
+                # 重试由共享限流器统一处理，客户端自身不再重试；连接池在进程内共享
+                options = {'http_client': get_openai_http_client()} if pool_settings else {}
+                self.ai_clients['openai'] = openai.OpenAI(api_key=openai_key, base_url=base_url or None,
+                                                          max_retries=0, **options)
                 print("✅ OpenAI客户端初始化成功")
             except Exception as e:
                 print(f"❌ OpenAI客户端初始化失败: {e}")
 
-        # 可以在这里添加其他AI模型的初始化
-        # 例如：Claude, Gemini等
+        # Claude、Gemini客户端（按配置各自限流，限流器在进程内共享，与OpenAI一起参与路由和对冲）
+        from .llm_providers import ClaudeProvider, GeminiProvider
+        from .rate_limiter import get_rate_limiter
+        claude_key = self.config.CLAUDE_API_KEY if self.config else os.getenv('CLAUDE_API_KEY')
+        gemini_key = self.config.GEMINI_API_KEY if self.config else os.getenv('GEMINI_API_KEY')
+        provider_options = {
+            'timeout': pool_settings.timeout if pool_settings else 30
+        }
+        if claude_key:
+            self.ai_clients['claude'] = ClaudeProvider(
+                claude_key,
+                self.config.CLAUDE_MODEL if self.config else 'claude-3-5-haiku-latest',
+                self.config.CLAUDE_BASE_URL if self.config else 'https://api.anthropic.com',
+                rate_limiter=get_rate_limiter('claude'),
+                **provider_options
+            )
+            print("✅ Claude客户端初始化成功")
+        if gemini_key:
+            self.ai_clients['gemini'] = GeminiProvider(
+                gemini_key,
+                self.config.GEMINI_MODEL if self.config else 'gemini-1.5-flash',
+                self.config.GEMINI_BASE_URL if self.config else 'https://generativelanguage.googleapis.com',
+                rate_limiter=get_rate_limiter('gemini'),
+                **provider_options
+            )
+            print("✅ Gemini客户端初始化成功")
 
     def _get_best_available_model(self):
         """获取最佳可用的AI模型"""
-        if 'openai' in self.ai_clients:
-            return 'openai'
+        for name in ('openai', 'claude', 'gemini'):
+            if name in self.ai_clients:
+                return name
 
         # 如果没有AI模型可用，使用模板模式
         return 'template'
 
+    def set_ai_model(self, name):
+        """切换首选AI模型（对之后的调用生效，进行中的调用不受影响）"""
+        if name not in self.ai_clients:
+            raise ValueError(f"AI模型不可用: {name}")
+        with self._lock:
+            self.current_ai_model = name
+            self._router = None
+
     def _is_ai_available(self):
         """检查是否有可用的AI模型"""
         return len(self.ai_clients) > 0
 
-    def write_article(self, news_data, article_type='breaking_news', style='professional'):
-        """撰写文章"""
+    def write_article(self, news_data, article_type='breaking_news', style='professional', fresh=False,
+                      deadline_ms=None, regenerate=False, status='published'):
+        """撰写文章
+
+        同一(新闻, 类型, 风格, 提示词版本)已有文章时直接返回该文章（reused为True），
+        并发的相同请求等待进行中的那一次生成；regenerate为True时重新生成并取代已有文章，
+        并发的重新生成同样合并为一次。
+        fresh为True时不使用LLM响应缓存，强制重新生成（同样不复用已有文章）；
+        设置deadline_ms时AI生成与模板生成同时进行，到期AI仍未完成则先返回模板文章，
+        AI完成后在后台替换已保存的文件和数据库记录。
+        status为新保存文章的状态，如待审核的草稿使用'pending'（复用已有文章时不改变其状态）。
+        """
+        idempotency_key = self._idempotency_key(news_data, article_type, style)
+        try:
+            if regenerate or fresh:
+                result = self._inflight.do(idempotency_key, self._write_article, news_data, article_type, style,
+                                           fresh, deadline_ms, idempotency_key, True, status)
+            else:
+                result = self._find_existing_article(idempotency_key) or self._inflight.do(
+                    idempotency_key, self._write_once, news_data, article_type, style, deadline_ms, idempotency_key,
+                    status)
+        except IdempotencyConflict:
+            # 其他进程同时保存了同一幂等键的文章，以已保存的那篇为准
+            result = self._find_existing_article(idempotency_key) or self._generate_fallback_article(news_data)
+        if isinstance(result, dict):
+            result = dict(result)
+            result.setdefault('reused', False)
+        return result
+
+    def find_article(self, news_data, article_type='breaking_news', style='professional'):
+        """查找同一(新闻, 类型, 风格, 提示词版本)已保存的文章，没有时返回None"""
+        return self._find_existing_article(self._idempotency_key(news_data, article_type, style))
+
+    def estimate_tokens(self, news_data, article_type='breaking_news', style='professional'):
+        """预估撰写一篇文章消耗的token数（提示词 + 最大生成长度），模板模式下为0"""
+        if not self._is_ai_available():
+            return 0
+        analysis = self._analyze_news_content(news_data)
+        max_tokens = self.config.OPENAI_MAX_TOKENS if self.config else 2000
+        prompt_tokens = self._prompt_tokens(news_data, analysis, article_type, style)
+        return sum(prompt_tokens.values()) + max_tokens + min(max_tokens, 100)
+
+    def _idempotency_key(self, news_data, article_type, style):
+        """幂等键：对(稳定的新闻ID, 文章类型, 写作风格, 提示词版本)做哈希"""
+        news_id = news_data.get('id') or news_data.get('link') or news_data.get('title', '')
+        payload = json.dumps([str(news_id), article_type, style, PROMPT_VERSION], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _write_once(self, news_data, article_type, style, deadline_ms, idempotency_key, status='published'):
+        """合并后的单次生成；刚结束的同键生成可能已经保存，先再查一次"""
+        existing = self._find_existing_article(idempotency_key)
+        if existing:
+            return existing
+        return self._write_article(news_data, article_type, style, False, deadline_ms, idempotency_key,
+                                   status=status)
+
+    def _find_existing_article(self, idempotency_key):
+        """按幂等键查找已保存的文章，返回与write_article相同结构的结果，没有时返回None"""
+        try:
+            from .database import get_database_manager
+            existing = get_database_manager().get_article_by_idempotency_key(idempotency_key)
+        except ImportError:
+            return None
+        if not existing:
+            return None
+
+        article = existing['content']
+        filename = existing.get('filename')
+        if filename:
+            try:
+                with open(os.path.join(self._articles_dir(), filename), 'r', encoding='utf-8') as f:
+                    article = f.read()
+            except OSError:
+                filename = None
+
+        print(f"✅ 复用已有文章，ID: {existing['id']}")
+        result = {
+            'title': existing['title'],
+            'content': existing['content'],
+            'article': article,
+            'filename': filename,
+            'article_id': existing['id'],
+            'analysis': {},
+            'quality': {'total_score': existing['quality_score'], 'grade': existing['quality_grade']},
+            'timings': {'total': 0.0},
+            'prompt_tokens': {},
+            'mode': existing.get('mode'),
+            'upgrade_pending': False,
+            'reused': True
+        }
+        if existing.get('sources') is not None:
+            result['sources'] = existing['sources']
+        return result
+
+    def _write_article(self, news_data, article_type, style, fresh, deadline_ms, idempotency_key=None,
+                       replace_key=False, status='published'):
+        """生成并保存文章（不检查已有文章）"""
         try:
+            total_start = time.perf_counter()
+            timings = {}
+
             # 分析新闻内容
-            analysis = self._analyze_news_content(news_data)
-            
-            # 生成文章标题
-            title = self._generate_title(news_data, analysis, article_type)
-            
-            # 生成文章内容
-            content = self._generate_content(news_data, analysis, article_type, style)
-            
-            # 组装完整文章
-            article = self._format_article(title, content, news_data)
+            analysis, timings['analysis'] = self._timed(self._analyze_news_content, news_data)
+
+            if deadline_ms is not None and self._is_ai_available():
+                return self._write_with_deadline(news_data, analysis, article_type, style, not fresh,
+                                                 deadline_ms, timings, total_start, idempotency_key, replace_key,
+                                                 status)
 
-            # 评估文章质量
-            quality_result = self._assess_article_quality(article, news_data)
+            prompt_tokens = self._prompt_tokens(news_data, analysis, article_type, style) \
+                if self._is_ai_available() else {}
+            
+            title, content, article, quality_result, mode = self._compose_article(
+                news_data, analysis, article_type, style, timings, use_cache=not fresh)
 
-            # 如果质量不达标且有AI可用，尝试改进
-            if quality_result['total_score'] < 0.7 and self._is_ai_available():
-                print(f"文章质量评分: {quality_result['total_score']:.2f}，尝试改进...")
-                improved_content = self._improve_article_content(content, quality_result['suggestions'])
-                if improved_content:
-                    article = self._format_article(title, improved_content, news_data)
-                    # 重新评估改进后的文章质量
-                    quality_result = self._assess_article_quality(article, news_data)
+            save_start = time.perf_counter()
 
             # 保存文章到文件
             filename = self._save_article_to_file(article, news_data)
 
             # 保存到数据库
-            article_id = self._save_to_database(article, news_data, analysis, quality_result, article_type, style)
+            article_id = self._save_to_database(article, news_data, analysis, quality_result, article_type, style,
+                                                filename, idempotency_key, replace_key, status, mode)
+
+            timings['save'] = round(time.perf_counter() - save_start, 3)
+            timings['total'] = round(time.perf_counter() - total_start, 3)
 
             return {
                 'title': title,
@@ -118,34 +314,701 @@ class ArticleWriter:
                 'filename': filename,
                 'article_id': article_id,
                 'analysis': analysis,
-                'quality': quality_result
+                'quality': quality_result,
+                'timings': timings,
+                'prompt_tokens': prompt_tokens,
+                'mode': mode,
+                'upgrade_pending': False
             }
             
+        except IdempotencyConflict:
+            raise
         except Exception as e:
             print(f"文章撰写失败: {e}")
             return self._generate_fallback_article(news_data)
     
-    def _analyze_news_content(self, news_data):
-        """分析新闻内容"""
-        analysis = {
-            'key_points': self._extract_key_points(news_data['content']),
-            'entities': self._extract_entities(news_data['content']),
-            'sentiment': self._analyze_sentiment(news_data['content']),
-            'category': self._categorize_news(news_data['title']),
-            'urgency': self._assess_urgency(news_data)
+    def _write_with_deadline(self, news_data, analysis, article_type, style, use_cache, deadline_ms,
+                             timings, total_start, idempotency_key=None, replace_key=False, status='published'):
+        """在截止时间内撰写文章：AI生成和模板生成赛跑，超时返回模板文章并登记后台升级"""
+        ai_timings = {}
+        ai_future = self.deadline_executor.submit(
+            self._compose_article, news_data, analysis, article_type, style, ai_timings, use_cache)
+
+        # 模板生成不依赖网络，在等待AI的同时完成
+        template_start = time.perf_counter()
+        template_title = self._generate_template_title(news_data, analysis, article_type)
+        template_content = self._generate_template_content(news_data, analysis, article_type)
+        timings['template'] = round(time.perf_counter() - template_start, 3)
+
+        remaining = deadline_ms / 1000.0 - (time.perf_counter() - total_start)
+        # 是否走了超时分支必须在这里记下，之后再看ai_future.done()会与AI线程竞争
+        timed_out = failed = False
+        try:
+            title, content, article, quality_result, mode = ai_future.result(timeout=max(0.0, remaining))
+            timings.update(ai_timings)
+        except FutureTimeoutError:
+            print(f"AI生成超过截止时间（{deadline_ms}ms），先返回模板文章")
+            timed_out = True
+        except Exception as e:
+            print(f"AI生成失败，使用模板文章: {e}")
+            failed = True
+
+        if timed_out or failed:
+            mode = 'template'
+            title, content = template_title, template_content
+            article = self._format_article(title, content, news_data)
+            quality_result, timings['quality'] = self._timed(self._assess_article_quality, article, news_data)
+
+        save_start = time.perf_counter()
+        filename = self._save_article_to_file(article, news_data)
+        article_id = self._save_to_database(article, news_data, analysis, quality_result, article_type, style,
+                                            filename, idempotency_key, replace_key, status, mode)
+        timings['save'] = round(time.perf_counter() - save_start, 3)
+
+        upgrade_pending = timed_out
+        if upgrade_pending:
+            # AI已在此期间完成时回调立即执行；回调可能在AI线程中执行，升级本身交给线程池，避免阻塞
+            ai_future.add_done_callback(lambda future: self.deadline_executor.submit(
+                self._upgrade_article, future, news_data, filename, article_id, article_type, style))
+
+        timings['total'] = round(time.perf_counter() - total_start, 3)
+        return {
+            'title': title,
+            'content': content,
+            'article': article,
+            'filename': filename,
+            'article_id': article_id,
+            'analysis': analysis,
+            'quality': quality_result,
+            'timings': timings,
+            'prompt_tokens': self._prompt_tokens(news_data, analysis, article_type, style),
+            'mode': mode,
+            'upgrade_pending': upgrade_pending
+        }
+
+    def _upgrade_article(self, future, news_data, filename, article_id, article_type, style):
+        """用后台完成的AI文章替换先行保存的模板文章"""
+        try:
+            title, content, article, quality_result, mode = future.result()
+        except Exception as e:
+            print(f"后台AI生成失败，保留模板文章: {e}")
+            return False
+        if mode != 'ai':
+            print("后台AI生成退回了模板内容，保留模板文章")
+            return False
+
+        if filename:
+            self._save_article_to_file(article, news_data, filename=filename)
+
+        if article_id:
+            try:
+                from .database import get_database_manager
+                record = self._build_article_record(article, news_data, quality_result, article_type, style)
+                update_data = {key: record[key] for key in ('title', 'content', 'quality_score', 'quality_grade')}
+                update_data['generation_mode'] = 'ai'
+                get_database_manager().update_article(article_id, update_data)
+            except Exception as e:
+                print(f"❌ 升级数据库中的文章失败: {e}")
+                return False
+
+        print(f"✅ 文章已升级为AI版本: {filename or article_id}")
+        return True
+
+    def _compose_article(self, news_data, analysis, article_type, style, timings, use_cache=True):
+        """生成标题和正文、评估质量并在需要时改进，返回(标题, 正文, 完整文章, 质量评估, 模式)
+
+        模式为正文实际使用的生成方式：AI生成失败退回模板时为'template'。
+        """
+        # 标题和正文互不依赖，AI模式下并发生成，总耗时接近较慢的那一次调用
+        if self._is_ai_available():
+            title_future = self.executor.submit(
+                self._timed, self._generate_title, news_data, analysis, article_type, use_cache)
+            content_future = self.executor.submit(
+                self._timed, self._generate_content, news_data, analysis, article_type, style, use_cache, False)
+            title, timings['title'] = title_future.result()
+            try:
+                content, timings['content'] = content_future.result()
+                mode = 'ai'
+            except Exception:
+                content, timings['content'] = self._timed(
+                    self._generate_template_content, news_data, analysis, article_type)
+                mode = 'template'
+        else:
+            title, timings['title'] = self._timed(
+                self._generate_title, news_data, analysis, article_type)
+            content, timings['content'] = self._timed(
+                self._generate_content, news_data, analysis, article_type, style)
+            mode = 'template'
+
+        content, article, quality_result = self._review_article(title, content, news_data, timings, use_cache,
+                                                                article_type)
+        return title, content, article, quality_result, mode
+
+    def _review_article(self, title, content, news_data, timings, use_cache=True, article_type=None):
+        """组装文章并评估质量，低分时改进弱章节，返回(正文, 完整文章, 质量评估)"""
+        # 组装完整文章
+        article = self._format_article(title, content, news_data)
+
+        # 评估文章质量
+        quality_result, timings['quality'] = self._timed(self._assess_article_quality, article, news_data)
+
+        # 如果质量不达标且有AI可用，只改进得分低的章节
+        if quality_result['total_score'] < 0.7 and self._is_ai_available():
+            print(f"文章质量评分: {quality_result['total_score']:.2f}，尝试改进...")
+            (improved_content, improved_sections), timings['improve'] = self._timed(
+                self._improve_weak_sections, title, content, quality_result, use_cache, article_type)
+            if improved_content:
+                content = improved_content
+                article = self._format_article(title, improved_content, news_data)
+                # 重新评估改进后的文章质量
+                quality_result = self._assess_article_quality(article, news_data)
+                quality_result['improved_sections'] = improved_sections
+
+        return content, article, quality_result
+
+    def write_digest(self, news_items, article_type='analysis', style='professional', fresh=False,
+                     regenerate=False):
+        """把多个来源报道同一事件的新闻写成一篇综述文章
+
+        先并发为每个来源生成摘要（map，摘要按原文缓存，可在不同综述间复用），
+        再基于各来源摘要撰写一篇文章（reduce），避免把多篇原文放进同一个提示词。
+        同一组来源、类型和风格已有综述时直接返回；regenerate为True时重新撰写（仍复用来源摘要），
+        fresh为True时同时跳过所有缓存。
+        """
+        from . import digest
+
+        max_sources = self.config.DIGEST_MAX_SOURCES if self.config else 5
+        items = list(news_items)[:max_sources]
+        if not items:
+            raise ValueError("综述至少需要一条新闻")
+
+        idempotency_key = self._idempotency_key({'id': digest.story_id(items)}, article_type, style)
+        try:
+            if fresh or regenerate:
+                result = self._inflight.do(idempotency_key, self._write_digest, items, article_type, style, fresh,
+                                           idempotency_key, True)
+            else:
+                result = self._find_existing_article(idempotency_key) or self._inflight.do(
+                    idempotency_key, self._write_digest, items, article_type, style, False, idempotency_key)
+        except IdempotencyConflict:
+            # 其他进程同时保存了同一组来源的综述，以已保存的那篇为准
+            result = self._find_existing_article(idempotency_key)
+            if not result:
+                raise
+        return dict(result)
+
+    def _write_digest(self, items, article_type, style, fresh, idempotency_key, replace_key=False):
+        """合并后的单次综述撰写；不取代已有综述时，刚结束的同键撰写可能已经保存，先再查一次"""
+        from . import digest
+
+        if not replace_key:
+            existing = self._find_existing_article(idempotency_key)
+            if existing:
+                return existing
+
+        total_start = time.perf_counter()
+        timings = {}
+        use_cache = not fresh
+
+        summaries, timings['map'] = self._timed(self._summarize_sources, items, use_cache, article_type)
+        news_data = digest.merge_story(items, summaries)
+        analysis, timings['analysis'] = self._timed(self._analyze_news_content, news_data)
+
+        reduce_start = time.perf_counter()
+        if self._is_ai_available():
+            try:
+                title_future = self.executor.submit(
+                    self._chat_completion, self._build_digest_title_prompt(news_data), 100,
+                    self.config.OPENAI_TEMPERATURE if self.config else 0.7, use_cache, 'digest_title', article_type)
+                content = self._chat_completion(
+                    self._build_digest_prompt(news_data, analysis, article_type, style),
+                    max_tokens=self.config.OPENAI_MAX_TOKENS if self.config else 2000,
+                    temperature=self.config.OPENAI_TEMPERATURE if self.config else 0.8,
+                    use_cache=use_cache,
+                    kind='digest',
+                    article_type=article_type
+                )
+                title = title_future.result()
+                mode = 'ai'
+            except Exception as e:
+                print(f"AI综述生成失败，使用模板: {e}")
+                mode = 'template'
+        else:
+            mode = 'template'
+        if mode == 'template':
+            title = self._generate_template_title(news_data, analysis, article_type)
+            content = self._generate_template_content(news_data, analysis, article_type)
+        timings['reduce'] = round(time.perf_counter() - reduce_start, 3)
+
+        content, article, quality_result = self._review_article(title, content, news_data, timings, use_cache,
+                                                                article_type)
+
+        save_start = time.perf_counter()
+        filename = self._save_article_to_file(article, news_data, suffix='_digest')
+        article_id = self._save_to_database(article, news_data, analysis, quality_result, article_type, style,
+                                            filename, idempotency_key, replace_key, mode=mode,
+                                            sources=news_data['digest_sources'])
+        timings['save'] = round(time.perf_counter() - save_start, 3)
+        timings['total'] = round(time.perf_counter() - total_start, 3)
+
+        return {
+            'title': title,
+            'content': content,
+            'article': article,
+            'filename': filename,
+            'article_id': article_id,
+            'analysis': analysis,
+            'quality': quality_result,
+            'timings': timings,
+            'sources': news_data['digest_sources'],
+            'mode': mode,
+            'reused': False
+        }
+
+    def _summarize_sources(self, items, use_cache=True, article_type=None):
+        """并发生成各来源的摘要，返回与输入顺序一致的列表"""
+        futures = [self.executor.submit(self._summarize_source, news_data, use_cache, article_type)
+                   for news_data in items]
+        return [future.result() for future in futures]
+
+    def _summarize_source(self, news_data, use_cache=True, article_type=None):
+        """生成单个来源的事实摘要；AI不可用或失败时用TextRank抽取关键句"""
+        budget = self.config.DIGEST_SUMMARY_TOKENS if self.config else 200
+        content = text_analysis.strip_html(news_data.get('content') or news_data.get('summary') or '')
+        if not self._is_ai_available():
+            return self.prompt_builder.compress(content, budget)
+
+        content_digest = hashlib.md5(f"{news_data['title']}\n{content}".encode('utf-8')).hexdigest()
+        cache_key = f"digest_summary:v{PROMPT_VERSION}:{self.current_ai_model}:{budget}:{content_digest}"
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        prompt = f"""
+        用不超过{budget}字概括以下新闻报道中的事实，保留时间、地点、人物、数据和引语，不要评论：
+
+        标题：{news_data['title']}
+        来源：{news_data.get('source', '')}
+        内容：{self.prompt_builder.compress(content)}
+        """
+        try:
+            summary = self._chat_completion(prompt, max_tokens=budget * 2, temperature=0.3, use_cache=use_cache,
+                                            kind='digest_map', article_type=article_type)
+        except Exception as e:
+            print(f"来源摘要生成失败（{news_data.get('source', '')}），改用关键句: {e}")
+            return self.prompt_builder.compress(content, budget)
+
+        self.cache.set(cache_key, summary, timeout=86400)
+        return summary
+
+    def _build_digest_title_prompt(self, news_data):
+        """构建综述标题提示词"""
+        return f"""
+        以下是{len(news_data['digest_sources'])}家媒体对同一事件的报道摘要，为综述文章生成一个吸引人的中文标题：
+
+        {news_data['content']}
+
+        要求：不超过30字，突出事件的核心事实，只返回标题本身。
+        """
+
+    def _build_digest_prompt(self, news_data, analysis, article_type, style):
+        """构建综述正文提示词：输入各来源摘要而非原文"""
+        structure = self.article_templates[article_type]['structure']
+        return f"""
+        以下是{len(news_data['digest_sources'])}家媒体对同一事件的报道摘要，综合各来源撰写一篇{style}风格的{article_type}类型文章：
+
+        {news_data['content']}
+
+        关键点：{self.prompt_builder.fit_list(analysis['key_points'])}
+        实体：{self.prompt_builder.fit_list(analysis['entities'])}
+        类别：{analysis['category']}
+
+        文章结构：{' -> '.join(structure)}
+
+        要求：
+        1. 文章长度800-1200字
+        2. 综合各来源的事实，互相补充，不要逐条复述
+        3. 各来源说法不一致时指出差异并注明来源
+        4. 体现独家分析和深度思考
+        5. 结构完整，每个部分都要充实
+
+        请按照指定结构撰写完整文章。
+        """
+
+    def write_article_variants(self, news_data, types=('breaking_news', 'analysis', 'feature'),
+                               styles=('professional',), fresh=False):
+        """一次LLM调用为同一条新闻生成多种类型/风格的文章，返回各篇结果的列表（一起保存）"""
+        return list(self.write_articles([news_data], types, styles, fresh=fresh, combined=True))
+
+    def write_articles(self, items, types=('breaking_news',), styles=('professional',), max_workers=None,
+                       fresh=False, combined=False):
+        """批量撰写文章，按完成顺序逐个产出结果
+
+        每条新闻只分析一次，分析结果在各文章类型和风格之间共享；同一时刻完成的文章合并为一次数据库写入。
+        批量撰写不使用幂等键，不复用已有文章，每次都保存新文章。
+        combined为True时同一条新闻的所有类型/风格在一次LLM调用中生成（JSON结构化输出），
+        原文和分析只发送一次。
+        """
+        items = list(items)
+        types = list(types) or ['breaking_news']
+        styles = list(styles) or ['professional']
+        if max_workers is None:
+            max_workers = self.config.BATCH_MAX_WORKERS if self.config else 4
+
+        # 批量任务使用独立线程池，避免与标题/正文并发生成共用的LLM线程池互相等待
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='batch') as pool:
+            analysis_futures = [pool.submit(self._timed, self._analyze_news_content, news_data)
+                                for news_data in items]
+
+            variants = [(article_type, style) for article_type in types for style in styles]
+            pending = {}
+            for news_data, analysis_future in zip(items, analysis_futures):
+                if combined and self._is_ai_available():
+                    future = pool.submit(self._write_combined_variants, news_data, analysis_future,
+                                         variants, not fresh)
+                    pending[future] = (news_data, variants)
+                    continue
+                for article_type, style in variants:
+                    future = pool.submit(self._write_batch_variant, news_data, analysis_future,
+                                         article_type, style, not fresh)
+                    pending[future] = (news_data, [(article_type, style)])
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                finished = []
+                for future in done:
+                    news_data, future_variants = pending.pop(future)
+                    try:
+                        result = future.result()
+                        finished.extend(result if isinstance(result, list) else [result])
+                    except Exception as e:
+                        print(f"批量撰写失败 ({news_data.get('title', '')}): {e}")
+                        finished.extend({
+                            'success': False,
+                            'news_id': news_data.get('id'),
+                            'article_type': article_type,
+                            'style': style,
+                            'error': str(e)
+                        } for article_type, style in future_variants)
+
+                self._save_batch_to_database([result for result in finished if result['success']])
+                for result in finished:
+                    result.pop('record', None)
+                    yield result
+
+    def _write_batch_variant(self, news_data, analysis_future, article_type, style, use_cache=True):
+        """批量撰写中的单篇文章（数据库写入由调用方合并执行）"""
+        total_start = time.perf_counter()
+        timings = {}
+        analysis, timings['analysis'] = analysis_future.result()
+
+        title, content, article, quality_result, _ = self._compose_article(
+            news_data, analysis, article_type, style, timings, use_cache)
+
+        return self._batch_result(news_data, analysis, article_type, style, title, content, article,
+                                  quality_result, timings, total_start)
+
+    def _write_combined_variants(self, news_data, analysis_future, variants, use_cache=True):
+        """一次LLM调用生成同一条新闻的多篇文章；解析失败或缺失的变体逐篇单独生成"""
+        total_start = time.perf_counter()
+        timings = {}
+        analysis, timings['analysis'] = analysis_future.result()
+
+        generated, timings['combined'] = self._timed(
+            self._generate_combined_variants, news_data, analysis, variants, use_cache)
+
+        results = []
+        for article_type, style in variants:
+            variant_timings = dict(timings)
+            variant_start = time.perf_counter()
+            if (article_type, style) in generated:
+                title, content = generated[(article_type, style)]
+                content, article, quality_result = self._review_article(
+                    title, content, news_data, variant_timings, use_cache, article_type)
+            else:
+                print(f"合并生成缺少 {article_type}/{style}，单独生成")
+                title, content, article, quality_result, _ = self._compose_article(
+                    news_data, analysis, article_type, style, variant_timings, use_cache)
+            variant_timings['variant'] = round(time.perf_counter() - variant_start, 3)
+            results.append(self._batch_result(news_data, analysis, article_type, style, title, content,
+                                              article, quality_result, variant_timings, total_start))
+        return results
+
+    def _build_variants_prompt(self, news_data, analysis, variants):
+        """构建多变体合并生成提示词：原文和分析只出现一次，要求按JSON返回各篇文章"""
+        material = self._source_material(news_data, analysis)
+        requirements = '\n'.join(
+            f"        {i + 1}. article_type={article_type}，style={style}，"
+            f"文章结构：{' -> '.join(self.article_templates.get(article_type, {}).get('structure', []))}"
+            for i, (article_type, style) in enumerate(variants)
+        )
+
+        return f"""
+        基于以下新闻信息，一次撰写{len(variants)}篇不同类型/风格的文章：
+
+        原新闻：
+        标题：{news_data['title']}
+        内容：{material['content']}
+        来源：{news_data['source']}
+
+        分析结果：
+        关键点：{material['key_points']}
+        实体：{material['entities']}
+        类别：{analysis['category']}
+
+        需要撰写的文章：
+{requirements}
+
+        要求：
+        1. 每篇文章长度800-1200字，按各自的文章结构用“## 小标题”分节
+        2. 各篇文章角度不同，不要互相复制段落
+        3. 每篇标题15-25字，体现独家或首发特色
+        4. 避免抄袭原文，要有原创观点，包含数据支撑和专业分析
+
+        只返回JSON，不要其他内容，格式为：
+        {{"articles": [{{"article_type": "...", "style": "...", "title": "...", "content": "..."}}]}}
+        """
+
+    def _generate_combined_variants(self, news_data, analysis, variants, use_cache=True):
+        """调用LLM合并生成多篇文章，返回{(类型, 风格): (标题, 正文)}，失败的变体不在结果中
+
+        每篇需要一份完整的生成预算，合并输出超过模型输出上限会被截断成无法解析的JSON，
+        因此按上限能容纳的篇数把变体分组，每组一次调用，各组并发。
+        """
+        max_tokens = self.config.OPENAI_MAX_TOKENS if self.config else 2000
+        output_limit = self.config.LLM_MAX_OUTPUT_TOKENS if self.config else 4096
+        per_call = max(1, output_limit // max_tokens)
+        groups = [variants[i:i + per_call] for i in range(0, len(variants), per_call)]
+        if len(groups) == 1:
+            return self._generate_variant_group(news_data, analysis, variants, use_cache)
+
+        futures = [self.section_executor.submit(self._generate_variant_group, news_data, analysis, group, use_cache)
+                   for group in groups]
+        generated = {}
+        for future in futures:
+            generated.update(future.result())
+        return generated
+
+    def _generate_variant_group(self, news_data, analysis, variants, use_cache=True):
+        """一次调用生成一组变体，失败时返回空字典"""
+        prompt = self._build_variants_prompt(news_data, analysis, variants)
+        max_tokens = self.config.OPENAI_MAX_TOKENS if self.config else 2000
+        output_limit = self.config.LLM_MAX_OUTPUT_TOKENS if self.config else 4096
+        # 一次调用覆盖多篇文章，类型相同时计入该类型，否则计入mixed
+        article_types = {article_type for article_type, _ in variants}
+        usage_type = article_types.pop() if len(article_types) == 1 else 'mixed'
+
+        try:
+            text = self._chat_completion(
+                prompt,
+                max_tokens=min(max_tokens * len(variants), output_limit),
+                temperature=self.config.OPENAI_TEMPERATURE if self.config else 0.8,
+                use_cache=use_cache,
+                kind='variants',
+                article_type=usage_type
+            )
+        except Exception as e:
+            print(f"AI合并生成失败: {e}")
+            return {}
+
+        return self._parse_variants(text, variants)
+
+    @staticmethod
+    def _parse_variants(text, variants):
+        """解析合并生成的JSON输出（允许包裹在代码块或说明文字中）"""
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end <= start:
+            print("合并生成结果不是JSON")
+            return {}
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError as e:
+            print(f"合并生成结果解析失败: {e}")
+            return {}
+
+        articles = data.get('articles', []) if isinstance(data, dict) else data
+        wanted = set(variants)
+        parsed = {}
+        for index, item in enumerate(articles if isinstance(articles, list) else []):
+            if not isinstance(item, dict):
+                continue
+            key = (item.get('article_type'), item.get('style'))
+            # 模型未回填类型/风格时按顺序对应
+            if key not in wanted and index < len(variants):
+                key = variants[index]
+            title = str(item.get('title') or '').strip()
+            content = str(item.get('content') or '').strip()
+            if key in wanted and key not in parsed and title and content:
+                parsed[key] = (title, content)
+        return parsed
+
+    def _batch_result(self, news_data, analysis, article_type, style, title, content, article, quality_result,
+                      timings, total_start):
+        """保存批量撰写中的一篇文章到文件，返回结果字典（数据库写入由调用方合并执行）"""
+        save_start = time.perf_counter()
+        filename = self._save_article_to_file(article, news_data, suffix=f'_{article_type}_{style}')
+        timings['save'] = round(time.perf_counter() - save_start, 3)
+        timings['total'] = round(time.perf_counter() - total_start, 3)
+
+        return {
+            'success': True,
+            'news_id': news_data.get('id'),
+            'article_type': article_type,
+            'style': style,
+            'title': title,
+            'content': content,
+            'article': article,
+            'filename': filename,
+            'article_id': None,
+            'analysis': analysis,
+            'quality': quality_result,
+            'timings': timings,
+            'record': self._build_article_record(article, news_data, quality_result, article_type, style, filename)
         }
+
+    def _save_batch_to_database(self, results):
+        """一次数据库写入保存多篇文章，并回填文章ID"""
+        if not results:
+            return
+        try:
+            from .database import get_database_manager
+            db_manager = get_database_manager()
+
+            if not db_manager.available:
+                print("数据库不可用，跳过数据库保存")
+                return
+
+            article_ids = db_manager.save_articles([result['record'] for result in results])
+            for result, article_id in zip(results, article_ids):
+                result['article_id'] = article_id
+            print(f"✅ 批量保存 {len([i for i in article_ids if i])} 篇文章到数据库")
+
+        except ImportError:
+            print("数据库模块不可用，跳过数据库保存")
+        except Exception as e:
+            print(f"❌ 批量保存文章到数据库失败: {e}")
+
+    def stream_article(self, news_data, article_type='breaking_news', style='professional', fresh=False):
+        """流式撰写文章，依次产出事件字典
+
+        事件类型：token（模型文本片段）、title（标题就绪）、done（质量评估和保存完成后的最终结果）、
+        error（生成失败）。流式模式下不做整篇改写，低分时只返回改进建议。
+        流式撰写不使用幂等键，不复用已有文章，每次都保存新文章。
+        """
+        try:
+            total_start = time.perf_counter()
+            timings = {}
+
+            analysis, timings['analysis'] = self._timed(self._analyze_news_content, news_data)
+            title_future = self.executor.submit(
+                self._timed, self._generate_title, news_data, analysis, article_type, not fresh)
+            title_sent = False
+
+            content_start = time.perf_counter()
+            chunks = []
+            for text in self._stream_content(news_data, analysis, article_type, style, not fresh):
+                if not chunks:
+                    timings['first_token'] = round(time.perf_counter() - total_start, 3)
+                chunks.append(text)
+                yield {'event': 'token', 'data': {'text': text}}
+
+                if not title_sent and title_future.done():
+                    title, timings['title'] = title_future.result()
+                    title_sent = True
+                    yield {'event': 'title', 'data': {'title': title}}
+            timings['content'] = round(time.perf_counter() - content_start, 3)
+
+            if not title_sent:
+                title, timings['title'] = title_future.result()
+                yield {'event': 'title', 'data': {'title': title}}
+
+            content = ''.join(chunks).strip()
+            article = self._format_article(title, content, news_data)
+
+            quality_result, timings['quality'] = self._timed(self._assess_article_quality, article, news_data)
+
+            save_start = time.perf_counter()
+            filename = self._save_article_to_file(article, news_data)
+            article_id = self._save_to_database(article, news_data, analysis, quality_result, article_type, style,
+                                                filename)
+            timings['save'] = round(time.perf_counter() - save_start, 3)
+            timings['total'] = round(time.perf_counter() - total_start, 3)
+
+            yield {'event': 'done', 'data': {
+                'title': title,
+                'content': content,
+                'article': article,
+                'filename': filename,
+                'article_id': article_id,
+                'analysis': analysis,
+                'quality': quality_result,
+                'timings': timings
+            }}
+
+        except Exception as e:
+            print(f"流式文章撰写失败: {e}")
+            yield {'event': 'error', 'data': {'error': str(e)}}
+
+    @staticmethod
+    def _timed(func, *args):
+        """执行函数并返回(结果, 耗时秒数)"""
+        start = time.perf_counter()
+        result = func(*args)
+        return result, round(time.perf_counter() - start, 3)
+
+    def _analyze_news_content(self, news_data):
+        """分析新闻内容（优先复用入库时的预计算结果，其次使用共享缓存）"""
+        analysis = text_analysis.get_precomputed_analysis(news_data)
+
+        if analysis is None:
+            digest = hashlib.md5(f"{news_data['title']}\n{news_data['content']}".encode('utf-8')).hexdigest()
+            cache_key = f"analysis:v{text_analysis.analysis_version()}:{digest}"
+
+            analysis = self.cache.get(cache_key)
+            if analysis is None:
+                analysis = text_analysis.analyze_news(news_data)
+                self.cache.set(cache_key, analysis, timeout=86400)
+
+        # 紧急程度与当前时间相关，不缓存
+        analysis = dict(analysis)
+        analysis['urgency'] = self._assess_urgency(news_data)
         return analysis
     
-    def _generate_title(self, news_data, analysis, article_type):
+    def _generate_title(self, news_data, analysis, article_type, use_cache=True):
         """生成文章标题"""
         if self._is_ai_available():
-            return self._generate_ai_title(news_data, analysis, article_type)
+            return self._generate_ai_title(news_data, analysis, article_type, use_cache)
         else:
             return self._generate_template_title(news_data, analysis, article_type)
     
-    def _generate_ai_title(self, news_data, analysis, article_type):
+    def _generate_ai_title(self, news_data, analysis, article_type, use_cache=True):
         """使用AI生成标题"""
-        prompt = f"""
+        prompt = self._build_title_prompt(news_data, analysis, article_type)
+
+        try:
+            if self.ai_clients:
+                max_tokens = self.config.OPENAI_MAX_TOKENS if self.config else 100
+                temperature = self.config.OPENAI_TEMPERATURE if self.config else 0.7
+
+                return self._chat_completion(
+                    prompt,
+                    max_tokens=min(max_tokens, 100),  # 标题不需要太多token
+                    temperature=temperature,
+                    use_cache=use_cache,
+                    kind='title',
+                    article_type=article_type
+                )
+            else:
+                raise Exception("没有可用的AI模型")
+
+        except Exception as e:
+            print(f"AI标题生成失败: {e}")
+            return self._generate_template_title(news_data, analysis, article_type)
+
+    def _build_title_prompt(self, news_data, analysis, article_type):
+        """构建标题生成提示词"""
+        return f"""
         基于以下新闻信息，生成一个吸引人的{article_type}类型文章标题：
 
         原标题：{news_data['title']}
@@ -163,26 +1026,149 @@ class ArticleWriter:
         请只返回标题，不要其他内容。
         """
 
-        try:
-            if self.current_ai_model == 'openai' and 'openai' in self.ai_clients:
-                model_name = self.config.OPENAI_MODEL if self.config else "gpt-3.5-turbo"
-                max_tokens = self.config.OPENAI_MAX_TOKENS if self.config else 100
-                temperature = self.config.OPENAI_TEMPERATURE if self.config else 0.7
-
-                response = self.ai_clients['openai'].chat.completions.create(
-                    model=model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=min(max_tokens, 100),  # 标题不需要太多token
-                    temperature=temperature
-                )
-                return response.choices[0].message.content.strip()
-            else:
-                raise Exception("没有可用的AI模型")
+    def _source_material(self, news_data, analysis):
+        """按token预算整理提示词中的新闻素材：原文用TextRank压缩，关键点和实体按预算截取"""
+        return {
+            'content': self.prompt_builder.compress(news_data['content']),
+            'key_points': self.prompt_builder.fit_list(analysis['key_points']),
+            'entities': self.prompt_builder.fit_list(analysis['entities'])
+        }
 
-        except Exception as e:
-            print(f"AI标题生成失败: {e}")
-            return self._generate_template_title(news_data, analysis, article_type)
+    def _prompt_tokens(self, news_data, analysis, article_type, style):
+        """标题和整篇正文提示词的token数（素材压缩结果有缓存，重复构建开销很小）"""
+        return {
+            'title': self.prompt_builder.count(self._build_title_prompt(news_data, analysis, article_type)),
+            'content': self.prompt_builder.count(
+                self._build_content_prompt(news_data, analysis, article_type, style))
+        }
     
+    def _llm_cache_key(self, model_name, temperature, max_tokens, prompt):
+        """LLM响应缓存键：对(模型, 温度, 最大token数, 提示词)做内容寻址"""
+        payload = json.dumps([model_name, temperature, max_tokens, prompt], ensure_ascii=False)
+        return 'llm:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _get_router(self):
+        """获取LLM路由器；AI客户端变化（如测试中替换客户端）时重新构建
+
+        检查和重建在锁内进行，并发请求共用同一个路由器（及其线程池和延迟统计）。
+        """
+        from .llm_providers import LLMProvider, LLMRouter, OpenAIProvider
+
+        with self._lock:
+            clients = dict(self.ai_clients)
+            names = sorted(clients, key=lambda name: name != self.current_ai_model)
+            router_key = tuple((name, id(clients[name])) for name in names)
+            if self._router is not None and self._router_key == router_key:
+                return self._router
+
+            providers = []
+            for name in names:
+                client = clients[name]
+                if isinstance(client, LLMProvider):
+                    providers.append(client)
+                else:
+                    model_name = self.config.OPENAI_MODEL if self.config else "gpt-3.5-turbo"
+                    providers.append(OpenAIProvider(client, model_name, name=name,
+                                                    rate_limiter=self.rate_limiter))
+
+            self._router = LLMRouter(
+                providers,
+                hedge_enabled=self.config.LLM_HEDGE_ENABLED if self.config else True,
+                hedge_percentile=self.config.LLM_HEDGE_PERCENTILE if self.config else 95,
+                hedge_min_samples=self.config.LLM_HEDGE_MIN_SAMPLES if self.config else 20,
+                hedge_delay=self.config.LLM_HEDGE_DELAY if self.config else 10.0,
+                executor=self.router_executor
+            )
+            self._router_key = router_key
+            return self._router
+
+    def _chat_completion(self, prompt, max_tokens, temperature, use_cache=True, kind='other', article_type=None):
+        """调用聊天模型并返回文本，相同请求直接返回缓存的响应
+
+        kind为提示词类型，与article_type一起用于token统计和用量账本。
+        """
+        prompt_tokens = self.prompt_builder.record(kind, prompt)
+        router = self._get_router()
+        model_name = router.providers[0].model
+        cache_key = None
+        if use_cache and self.llm_cache is not None:
+            cache_key = self._llm_cache_key(model_name, temperature, max_tokens, prompt)
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                self.usage_ledger.record(kind, model_name, cache_hit=True, article_type=article_type)
+                return cached
+
+        from .llm_providers import CallTrace
+        trace = CallTrace()
+        start = time.time()
+        try:
+            result = router.generate(prompt, max_tokens, temperature, trace=trace)
+        except Exception:
+            self.usage_ledger.record(kind, trace.model or model_name, prompt_tokens=prompt_tokens,
+                                     latency=time.time() - start, retries=trace.retries, outcome='error',
+                                     article_type=article_type, provider=trace.provider, tokens_estimated=True)
+            raise
+        text = result.text
+
+        # 服务商未返回用量时按提示词和回复估算
+        estimated = result.prompt_tokens is None or result.completion_tokens is None
+        self.usage_ledger.record(
+            kind, result.model or model_name,
+            prompt_tokens=prompt_tokens if result.prompt_tokens is None else result.prompt_tokens,
+            completion_tokens=self.prompt_builder.count(text) if result.completion_tokens is None
+            else result.completion_tokens,
+            latency=time.time() - start, retries=trace.retries, article_type=article_type,
+            provider=result.provider, tokens_estimated=estimated
+        )
+
+        # 按实际回答的模型写入缓存，故障切换得到的回复不会记在首选模型名下
+        if cache_key and text:
+            self.llm_cache.set(self._llm_cache_key(result.model or model_name, temperature, max_tokens, prompt),
+                               text)
+        return text
+
+    def _stream_chat_completion(self, prompt, max_tokens, temperature, use_cache=True, kind='other',
+                                article_type=None):
+        """流式调用聊天模型；缓存命中时一次性产出全文，完整接收后写入缓存"""
+        prompt_tokens = self.prompt_builder.record(kind, prompt)
+        router = self._get_router()
+        model_name = router.providers[0].model
+        cache_key = None
+        if use_cache and self.llm_cache is not None:
+            cache_key = self._llm_cache_key(model_name, temperature, max_tokens, prompt)
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                self.usage_ledger.record(kind, model_name, cache_hit=True, article_type=article_type)
+                yield cached
+                return
+
+        # 流式响应不带用量，token数按提示词和回复估算
+        from .llm_providers import CallTrace
+        trace = CallTrace()
+        start = time.time()
+        chunks = []
+        outcome = 'error'
+        try:
+            for text in router.stream(prompt, max_tokens, temperature, trace=trace):
+                chunks.append(text)
+                yield text
+            outcome = 'ok'
+        except GeneratorExit:
+            # 调用方提前停止读取（如截止时间已到）
+            outcome = 'cancelled'
+            raise
+        finally:
+            self.usage_ledger.record(kind, trace.model or model_name, prompt_tokens=prompt_tokens,
+                                     completion_tokens=self.prompt_builder.count(''.join(chunks)),
+                                     latency=time.time() - start, retries=trace.retries, outcome=outcome,
+                                     article_type=article_type, provider=trace.provider, tokens_estimated=True)
+
+        # 与非流式调用共用缓存，缓存内容同样去除首尾空白
+        text = ''.join(chunks).strip()
+        if cache_key and text:
+            self.llm_cache.set(self._llm_cache_key(trace.model or model_name, temperature, max_tokens, prompt),
+                               text)
+
     def _generate_template_title(self, news_data, analysis, article_type):
         """使用模板生成标题"""
         template = self.article_templates[article_type]['title_format']
@@ -191,30 +1177,31 @@ class ArticleWriter:
         topic = analysis['entities'][0] if analysis['entities'] else '重要事件'
         key_point = analysis['key_points'][0] if analysis['key_points'] else '最新进展'
         
-        return template.format(topic=topic, key_point=key_point, angle='深层原因')
+        return template.format(topic=topic, key_point=key_point, angle='深层原因', subtitle='全面解读')
     
-    def _generate_content(self, news_data, analysis, article_type, style):
+    def _generate_content(self, news_data, analysis, article_type, style, use_cache=True, fallback=True):
         """生成文章内容"""
         if self._is_ai_available():
-            return self._generate_ai_content(news_data, analysis, article_type, style)
+            return self._generate_ai_content(news_data, analysis, article_type, style, use_cache, fallback)
         else:
             return self._generate_template_content(news_data, analysis, article_type)
     
-    def _generate_ai_content(self, news_data, analysis, article_type, style):
-        """使用AI生成内容"""
+    def _build_content_prompt(self, news_data, analysis, article_type, style):
+        """构建正文生成提示词"""
         structure = self.article_templates[article_type]['structure']
+        material = self._source_material(news_data, analysis)
         
-        prompt = f"""
+        return f"""
         基于以下新闻信息，撰写一篇{style}风格的{article_type}类型文章：
         
         原新闻：
         标题：{news_data['title']}
-        内容：{news_data['content'][:1000]}
+        内容：{material['content']}
         来源：{news_data['source']}
         
         分析结果：
-        关键点：{', '.join(analysis['key_points'])}
-        实体：{', '.join(analysis['entities'])}
+        关键点：{material['key_points']}
+        实体：{material['entities']}
         类别：{analysis['category']}
         
         文章结构：{' -> '.join(structure)}
@@ -229,26 +1216,172 @@ class ArticleWriter:
         
         请按照指定结构撰写完整文章。
         """
+
+    def _generate_ai_content(self, news_data, analysis, article_type, style, use_cache=True, fallback=True):
+        """使用AI生成内容；fallback为False时失败直接抛出，由调用方决定如何退回"""
+        if article_type in self.sectioned_types and article_type in self.article_templates:
+            content = self._generate_sectioned_content(news_data, analysis, article_type, style, use_cache)
+            if content:
+                return content
+
+        prompt = self._build_content_prompt(news_data, analysis, article_type, style)
         
         try:
-            if self.current_ai_model == 'openai' and 'openai' in self.ai_clients:
-                model_name = self.config.OPENAI_MODEL if self.config else "gpt-3.5-turbo"
-                max_tokens = self.config.OPENAI_MAX_TOKENS if self.config else 2000
-                temperature = self.config.OPENAI_TEMPERATURE if self.config else 0.8
-
-                response = self.ai_clients['openai'].chat.completions.create(
-                    model=model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=max_tokens,
-                    temperature=temperature
+            if self.ai_clients:
+                return self._chat_completion(
+                    prompt,
+                    max_tokens=self.config.OPENAI_MAX_TOKENS if self.config else 2000,
+                    temperature=self.config.OPENAI_TEMPERATURE if self.config else 0.8,
+                    use_cache=use_cache,
+                    kind='content',
+                    article_type=article_type
                 )
-                return response.choices[0].message.content.strip()
             else:
                 raise Exception("没有可用的AI模型")
 
         except Exception as e:
             print(f"AI生成内容失败: {e}")
+            if not fallback:
+                raise
             return self._generate_template_content(news_data, analysis, article_type)
+
+    def _generate_sectioned_content(self, news_data, analysis, article_type, style, use_cache=True):
+        """分章节并发生成：先规划一次提纲，再为每个章节并发调用模型，最后按顺序拼接
+
+        任一章节失败时返回None，由调用方退回整篇生成。
+        """
+        structure = self.article_templates[article_type]['structure']
+        max_tokens = self.config.OPENAI_MAX_TOKENS if self.config else 2000
+        temperature = self.config.OPENAI_TEMPERATURE if self.config else 0.8
+
+        try:
+            outline = self._plan_outline(news_data, analysis, article_type, style, structure, use_cache)
+            section_tokens = max(300, max_tokens // len(structure))
+            futures = [
+                self.section_executor.submit(
+                    self._chat_completion,
+                    self._build_section_prompt(news_data, analysis, article_type, style, outline, index),
+                    section_tokens, temperature, use_cache, 'section', article_type)
+                for index in range(len(structure))
+            ]
+            bodies = [future.result() for future in futures]
+        except Exception as e:
+            print(f"分章节生成失败，改为整篇生成: {e}")
+            return None
+
+        return self._stitch_sections(structure, bodies)
+
+    def _plan_outline(self, news_data, analysis, article_type, style, structure, use_cache=True):
+        """规划提纲：返回[(章节名, 要点)]，模型未给出的章节要点为空"""
+        material = self._source_material(news_data, analysis)
+        prompt = f"""
+        基于以下新闻信息，为一篇{style}风格的{article_type}类型文章规划提纲：
+
+        标题：{news_data['title']}
+        内容：{material['content']}
+        关键点：{material['key_points']}
+
+        文章结构：{' -> '.join(structure)}
+
+        请为每个部分写一句话要点，每行一个，格式为“部分名称：要点”，不要其他内容。
+        """
+        text = self._chat_completion(prompt, max_tokens=300, temperature=0.5, use_cache=use_cache,
+                                     kind='outline', article_type=article_type)
+
+        points = {}
+        for line in text.splitlines():
+            line = line.strip().lstrip('0123456789.、-*# ')
+            for heading in structure:
+                if line.startswith(heading) and heading not in points:
+                    points[heading] = re.sub(r'^[：:\s]+', '', line[len(heading):])
+                    break
+        return [(heading, points.get(heading, '')) for heading in structure]
+
+    def _build_section_prompt(self, news_data, analysis, article_type, style, outline, index):
+        """构建单个章节的生成提示词（共享新闻信息和完整提纲）"""
+        heading, point = outline[index]
+        outline_text = '\n'.join(f"{i + 1}. {name}：{text}" for i, (name, text) in enumerate(outline))
+        position = '开篇' if index == 0 else ('结尾' if index == len(outline) - 1 else '中间')
+        material = self._source_material(news_data, analysis)
+
+        return f"""
+        你正在撰写一篇{style}风格的{article_type}类型文章，请只撰写其中的“{heading}”部分（全文的{position}部分）。
+
+        原新闻：
+        标题：{news_data['title']}
+        内容：{material['content']}
+        来源：{news_data['source']}
+
+        分析结果：
+        关键点：{material['key_points']}
+        实体：{material['entities']}
+        类别：{analysis['category']}
+
+        全文提纲：
+        {outline_text}
+
+        本部分要点：{point or heading}
+
+        要求：
+        1. 本部分长度150-200字
+        2. 只写本部分内容，不要重复提纲中其他部分的内容
+        3. 包含数据支撑和专业分析，体现原创观点
+        4. 不要包含小标题，直接返回正文
+        """
+
+    def _stitch_sections(self, structure, bodies):
+        """按顺序拼接章节，并做轻量的衔接处理：去掉模型附带的小标题和与前文重复的句子"""
+        seen = set()
+        parts = []
+        for heading, body in zip(structure, bodies):
+            body = re.sub(r'^#{1,6}\s+.*\n+', '', body.strip())
+            sentences = re.split(r'(?<=[。！？])', body)
+            kept = []
+            for sentence in sentences:
+                key = sentence.strip()
+                if len(key) > 10 and key in seen:
+                    continue
+                seen.add(key)
+                kept.append(sentence)
+            parts.append(f"## {heading}\n\n{''.join(kept).strip()}")
+        return '\n\n'.join(parts)
+
+    def _stream_ai_content(self, news_data, analysis, article_type, style, use_cache=True):
+        """使用AI流式生成内容，逐段产出模型返回的文本"""
+        prompt = self._build_content_prompt(news_data, analysis, article_type, style)
+        received = False
+
+        try:
+            if self.ai_clients:
+                for text in self._stream_chat_completion(
+                    prompt,
+                    max_tokens=self.config.OPENAI_MAX_TOKENS if self.config else 2000,
+                    temperature=self.config.OPENAI_TEMPERATURE if self.config else 0.8,
+                    use_cache=use_cache,
+                    kind='content',
+                    article_type=article_type
+                ):
+                    received = True
+                    yield text
+            else:
+                raise Exception("没有可用的AI模型")
+
+        except Exception as e:
+            print(f"AI流式生成内容失败: {e}")
+            if received:
+                # 已经输出了部分内容，不再拼接模板内容
+                return
+            yield self._generate_template_content(news_data, analysis, article_type)
+
+    def _stream_content(self, news_data, analysis, article_type, style, use_cache=True):
+        """流式生成内容（模板模式按章节输出）"""
+        if self._is_ai_available():
+            yield from self._stream_ai_content(news_data, analysis, article_type, style, use_cache)
+        else:
+            content = self._generate_template_content(news_data, analysis, article_type)
+            for section in re.split(r'(?m)(?=^## )', content):
+                if section:
+                    yield section
     
     def _generate_template_content(self, news_data, analysis, article_type):
         """使用模板生成内容"""
@@ -295,7 +1428,74 @@ class ArticleWriter:
                 'suggestions': []
             }
 
-    def _improve_article_content(self, content, suggestions):
+    def _improve_weak_sections(self, title, content, quality_result, use_cache=True, article_type=None):
+        """并发重写质量评估中得分低的章节并拼回原文，返回(改进后的内容, 重写的章节标题)
+
+        没有章节结构时退回整篇改写。
+        """
+        from .article_quality import split_sections
+
+        sections = split_sections(content)
+        assessed = quality_result.get('sections') or []
+        if not sections or len(assessed) != len(sections):
+            return self._improve_article_content(content, quality_result['suggestions'], use_cache,
+                                                 article_type), []
+
+        # 没有章节低于阈值时只重写得分最低的一节
+        weak = [section for section in assessed if section['weak']] or [min(assessed, key=lambda s: s['score'])]
+        futures = {
+            section['index']: self.executor.submit(
+                self._improve_section, title, sections, section['index'],
+                section['issues'] or quality_result['suggestions'], use_cache, article_type)
+            for section in weak
+        }
+        improved = {index: future.result() for index, future in futures.items()}
+        improved = {index: text for index, text in improved.items() if text}
+        if not improved:
+            return None, []
+
+        # 从后往前替换，前面章节的位置不受影响
+        for index in sorted(improved, reverse=True):
+            section = sections[index]
+            content = content[:section['start']] + '\n\n' + improved[index] + '\n\n' + content[section['end']:]
+        return content.strip(), [sections[index]['heading'] for index in sorted(improved)]
+
+    def _improve_section(self, title, sections, index, issues, use_cache=True, article_type=None):
+        """根据问题重写单个章节，返回不含小标题的正文"""
+        section = sections[index]
+        previous_tail = sections[index - 1]['body'][-100:] if index > 0 else '（无，本节为开篇）'
+        next_head = sections[index + 1]['body'][:100] if index + 1 < len(sections) else '（无，本节为结尾）'
+
+        prompt = f"""
+        请改写文章《{title}》中的“{section['heading']}”部分。
+
+        上一部分结尾：{previous_tail}
+        下一部分开头：{next_head}
+
+        本部分原内容：
+        {section['body']}
+
+        存在的问题：
+        {chr(10).join(f"- {issue}" for issue in issues)}
+
+        要求：
+        1. 只返回改写后的本部分正文，不要包含小标题
+        2. 与上下文自然衔接，不重复其他部分的内容
+        3. 针对问题补充数据、事实和分析
+        4. 使用中文撰写
+        """
+
+        try:
+            max_tokens = self.config.OPENAI_MAX_TOKENS if self.config else 2000
+            text = self._chat_completion(prompt, max_tokens=min(max_tokens, 800), temperature=0.7,
+                                         use_cache=use_cache, kind='improve_section', article_type=article_type)
+            # 模型有时仍会带上小标题
+            return re.sub(r'^#{1,6}\s+.*\n+', '', text).strip()
+        except Exception as e:
+            print(f"章节改进失败 ({section['heading']}): {e}")
+            return None
+
+    def _improve_article_content(self, content, suggestions, use_cache=True, article_type=None):
         """根据建议改进文章内容"""
         if not suggestions or not self._is_ai_available():
             return None
@@ -319,37 +1519,51 @@ class ArticleWriter:
         """
 
         try:
-            if self.current_ai_model == 'openai' and 'openai' in self.ai_clients:
-                response = self.ai_clients['openai'].chat.completions.create(
-                    model=self.config.OPENAI_MODEL if self.config else "gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": improvement_prompt}],
+            if self.ai_clients:
+                return self._chat_completion(
+                    improvement_prompt,
                     max_tokens=self.config.OPENAI_MAX_TOKENS if self.config else 2000,
-                    temperature=0.7
+                    temperature=0.7,
+                    use_cache=use_cache,
+                    kind='improve',
+                    article_type=article_type
                 )
-                return response.choices[0].message.content.strip()
         except Exception as e:
             print(f"文章改进失败: {e}")
 
         return None
 
-    def _save_article_to_file(self, article, news_data):
-        """保存文章到文件"""
+    def _articles_dir(self):
+        """文章文件目录"""
+        return self.config.ARTICLES_DIR if self.config else 'articles'
+
+    def _save_article_to_file(self, article, news_data, suffix='', filename=None):
+        """保存文章到文件（suffix用于区分同一新闻的不同文章，指定filename时覆盖该文件）"""
         try:
             # 确保articles目录存在
-            articles_dir = "articles"
-            if not os.path.exists(articles_dir):
-                os.makedirs(articles_dir)
-
-            # 生成文件名
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            safe_title = re.sub(r'[^\w\s-]', '', news_data['title'])[:30]
-            safe_title = re.sub(r'[-\s]+', '-', safe_title)
-            filename = f"{timestamp}_{safe_title}.md"
+            articles_dir = self._articles_dir()
+            os.makedirs(articles_dir, exist_ok=True)
 
-            # 保存文件
-            filepath = os.path.join(articles_dir, filename)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(article)
+            if filename:
+                with open(os.path.join(articles_dir, filename), 'w', encoding='utf-8') as f:
+                    f.write(article)
+            else:
+                # 生成文件名
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                safe_title = re.sub(r'[^\w\s-]', '', news_data['title'])[:30]
+                safe_title = re.sub(r'[-\s]+', '-', safe_title)
+
+                # 以独占方式创建文件，同一秒内并发撰写同一条新闻时依次加序号，不会互相覆盖
+                for attempt in range(1, 100):
+                    filename = f"{timestamp}_{safe_title}{suffix}{'' if attempt == 1 else f'_{attempt}'}.md"
+                    try:
+                        with open(os.path.join(articles_dir, filename), 'x', encoding='utf-8') as f:
+                            f.write(article)
+                        break
+                    except FileExistsError:
+                        continue
+                else:
+                    raise FileExistsError(f"文件名冲突过多: {filename}")
 
             print(f"✅ 文章已保存到文件: {filename}")
             return filename
@@ -358,8 +1572,12 @@ class ArticleWriter:
             print(f"❌ 保存文章到文件失败: {e}")
             return None
 
-    def _save_to_database(self, article, news_data, analysis, quality_result, article_type, style):
-        """保存文章到数据库"""
+    def _save_to_database(self, article, news_data, analysis, quality_result, article_type, style, filename=None,
+                          idempotency_key=None, replace_key=False, status='published', mode=None, sources=None):
+        """保存文章到数据库（replace_key为True时新文章取代持有同一幂等键的旧文章）
+
+        mode和sources（综述的各来源摘要）随文章保存，复用已有文章时原样返回。
+        """
         try:
             from .database import get_database_manager
             db_manager = get_database_manager()
@@ -368,38 +1586,9 @@ class ArticleWriter:
                 print("数据库不可用，跳过数据库保存")
                 return None
 
-            # 提取标题
-            title_match = re.search(r'^# (.+)', article, re.MULTILINE)
-            title = title_match.group(1) if title_match else news_data['title']
-
-            # 提取纯文本内容（去除Markdown格式）
-            content_lines = article.split('\n')
-            content_start = 0
-            for i, line in enumerate(content_lines):
-                if line.strip() == '---' and i > 0:
-                    content_start = i + 1
-                    break
-
-            content = '\n'.join(content_lines[content_start:])
-            content = re.sub(r'#{1,6}\s+', '', content)  # 移除标题标记
-            content = re.sub(r'\*{1,2}([^*]+)\*{1,2}', r'\1', content)  # 移除粗体/斜体
-            content = content.strip()
-
-            # 准备数据库数据
-            article_data = {
-                'title': title,
-                'content': content,
-                'summary': news_data.get('summary', '')[:500],  # 限制摘要长度
-                'article_type': article_type,
-                'writing_style': style,
-                'source_news_id': str(news_data.get('id', '')),
-                'source_news_title': news_data.get('title', ''),
-                'source_news_url': news_data.get('link', ''),
-                'quality_score': quality_result.get('total_score', 0.0),
-                'quality_grade': quality_result.get('grade', 'C')
-            }
-
-            article_id = db_manager.save_article(article_data)
+            article_data = self._build_article_record(article, news_data, quality_result, article_type, style,
+                                                      filename, idempotency_key, status, mode, sources)
+            article_id = db_manager.save_article(article_data, replace_key=replace_key)
 
             if article_id:
                 print(f"✅ 文章已保存到数据库，ID: {article_id}")
@@ -411,10 +1600,58 @@ class ArticleWriter:
         except ImportError:
             print("数据库模块不可用，跳过数据库保存")
             return None
+        except IdempotencyConflict:
+            # 本次生成的文章不会被引用，删除已写出的文件
+            print("同一文章已被其他请求保存，放弃本次结果")
+            if filename:
+                try:
+                    os.remove(os.path.join(self._articles_dir(), filename))
+                except OSError:
+                    pass
+            raise
         except Exception as e:
             print(f"❌ 保存文章到数据库失败: {e}")
             return None
 
+    def _build_article_record(self, article, news_data, quality_result, article_type, style, filename=None,
+                              idempotency_key=None, status='published', mode=None, sources=None):
+        """把Markdown文章转换为数据库记录"""
+        # 提取标题
+        title_match = re.search(r'^# (.+)', article, re.MULTILINE)
+        title = title_match.group(1) if title_match else news_data['title']
+
+        # 提取纯文本内容（去除Markdown格式）
+        content_lines = article.split('\n')
+        content_start = 0
+        for i, line in enumerate(content_lines):
+            if line.strip() == '---' and i > 0:
+                content_start = i + 1
+                break
+
+        content = '\n'.join(content_lines[content_start:])
+        content = re.sub(r'#{1,6}\s+', '', content)  # 移除标题标记
+        content = re.sub(r'\*{1,2}([^*]+)\*{1,2}', r'\1', content)  # 移除粗体/斜体
+        content = content.strip()
+
+        # 准备数据库数据
+        return {
+            'title': title,
+            'content': content,
+            'summary': text_analysis.summary_text(news_data)[:500],  # 限制摘要长度
+            'article_type': article_type,
+            'writing_style': style,
+            'source_news_id': str(news_data.get('id', '')),
+            'source_news_title': news_data.get('title', ''),
+            'source_news_url': news_data.get('link', ''),
+            'quality_score': quality_result.get('total_score', 0.0),
+            'quality_grade': quality_result.get('grade', 'C'),
+            'filename': filename,
+            'idempotency_key': idempotency_key,
+            'status': status,
+            'mode': mode,
+            'sources': sources
+        }
+
     def _format_article(self, title, content, news_data):
         """格式化文章"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -437,80 +1674,23 @@ class ArticleWriter:
     
     def _extract_key_points(self, content):
         """提取关键点"""
-        # 简单实现：提取包含数字或重要词汇的句子
-        sentences = re.split(r'[。！？]', content)
-        key_points = []
-        
-        important_patterns = [
-            r'\d+%', r'\d+万', r'\d+亿', r'\d+年', r'\d+月',
-            r'宣布', r'发布', r'启动', r'完成', r'增长', r'下降'
-        ]
-        
-        for sentence in sentences:
-            if any(re.search(pattern, sentence) for pattern in important_patterns):
-                key_points.append(sentence.strip())
-        
-        return key_points[:5]
+        return text_analysis.extract_key_points(content)
     
     def _extract_entities(self, content):
-        """提取实体（简单实现）"""
-        # 这里可以使用更复杂的NER模型
-        import jieba.posseg as pseg
-        
-        entities = []
-        words = pseg.cut(content)
-        
-        for word, flag in words:
-            if flag in ['nr', 'ns', 'nt'] and len(word) > 1:  # 人名、地名、机构名
-                entities.append(word)
-        
-        return list(set(entities))[:10]
+        """提取实体"""
+        return text_analysis.extract_entities(content)
     
     def _analyze_sentiment(self, content):
         """分析情感"""
-        positive_words = ['好', '优秀', '成功', '增长', '提升', '改善', '突破', '创新']
-        negative_words = ['坏', '失败', '下降', '问题', '危机', '困难', '风险', '担忧']
-        
-        import jieba
-        words = list(jieba.cut(content))
-        
-        positive_count = sum(1 for word in words if word in positive_words)
-        negative_count = sum(1 for word in words if word in negative_words)
-        
-        if positive_count > negative_count:
-            return 'positive'
-        elif negative_count > positive_count:
-            return 'negative'
-        else:
-            return 'neutral'
+        return text_analysis.analyze_sentiment(content)
     
     def _categorize_news(self, title):
         """新闻分类"""
-        categories = {
-            '经济': ['经济', '金融', '股市', '投资', 'GDP', '通胀', '贸易'],
-            '科技': ['科技', '人工智能', '互联网', '5G', '芯片', '创新'],
-            '政治': ['政府', '政策', '法律', '外交', '会议', '领导'],
-            '社会': ['社会', '民生', '教育', '医疗', '环境', '文化'],
-            '体育': ['体育', '奥运', '世界杯', '比赛', '运动员'],
-            '娱乐': ['娱乐', '明星', '电影', '音乐', '综艺']
-        }
-        
-        for category, keywords in categories.items():
-            if any(keyword in title for keyword in keywords):
-                return category
-        
-        return '综合'
+        return text_analysis.categorize_news(title)
     
     def _assess_urgency(self, news_data):
         """评估紧急程度"""
-        urgent_keywords = ['突发', '紧急', '重大', '严重', '危机', '事故']
-        
-        if any(keyword in news_data['title'] for keyword in urgent_keywords):
-            return 'high'
-        elif (datetime.now() - news_data['publish_time']).total_seconds() < 3600:  # 1小时内
-            return 'medium'
-        else:
-            return 'low'
+        return text_analysis.assess_urgency(news_data)
     
     def _generate_fallback_article(self, news_data):
         """生成备用文章（当AI不可用时）"""
@@ -523,11 +1703,11 @@ class ArticleWriter:
 
 ## 事件概述
 
-{news_data['summary']}
+{text_analysis.summary_text(news_data)}
 
 ## 详细内容
 
-{news_data['content'][:500]}...
+{text_analysis.strip_html(news_data['content'])[:500]}...
 
 ## 分析观点
 
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自动驾驶模块
+按计划（schedule）取热点新闻前N条，为尚未撰写的新闻预生成草稿，单轮受并发数和token预算限制
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+class Autopilot:
+    """热点新闻草稿预生成
+
+    每轮取get_trending_news的前top_n条，跳过已有文章的(新闻, 类型, 风格)，
+    在token预算内生成文章并标记为pending草稿；超出预算的新闻留到下一轮。
+    """
+
+    def __init__(self, news_analyzer, article_writer, top_n: int = 5, interval_minutes: float = 30,
+                 article_types: Optional[List[str]] = None, styles: Optional[List[str]] = None,
+                 max_workers: int = 2, token_budget: int = 0, scheduler=None):
+        """初始化自动驾驶
+
+        token_budget为单轮预估token数上限，0表示不限制；scheduler默认为独立的schedule.Scheduler。
+        """
+        self.news_analyzer = news_analyzer
+        self.article_writer = article_writer
+        self.top_n = top_n
+        self.interval_minutes = interval_minutes
+        self.article_types = list(article_types or ['breaking_news'])
+        self.styles = list(styles or ['professional'])
+        self.max_workers = max(1, max_workers)
+        self.token_budget = token_budget
+        if scheduler is None:
+            import schedule
+            scheduler = schedule.Scheduler()
+        self.scheduler = scheduler
+
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.last_run: Dict = {}
+        self.stats = {'runs': 0, 'generated': 0, 'skipped': 0, 'deferred': 0, 'failed': 0, 'tokens': 0}
+
+    @classmethod
+    def from_config(cls, news_analyzer, article_writer, autopilot_config=None) -> 'Autopilot':
+        """根据配置创建自动驾驶"""
+        if autopilot_config is None:
+            from .config import get_config
+            autopilot_config = get_config()
+
+        return cls(
+            news_analyzer,
+            article_writer,
+            top_n=autopilot_config.AUTOPILOT_TOP_N,
+            interval_minutes=autopilot_config.AUTOPILOT_INTERVAL_MINUTES,
+            article_types=autopilot_config.AUTOPILOT_ARTICLE_TYPES,
+            styles=autopilot_config.AUTOPILOT_STYLES,
+            max_workers=autopilot_config.AUTOPILOT_MAX_WORKERS,
+            token_budget=autopilot_config.AUTOPILOT_TOKEN_BUDGET
+        )
+
+    @property
+    def running(self) -> bool:
+        """调度线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, run_now: bool = True):
+        """启动调度线程（重复调用无副作用）；run_now为True时立即执行一轮"""
+        if self.running:
+            return
+        self.scheduler.clear('autopilot')
+        self.scheduler.every(self.interval_minutes).minutes.do(self.run_once).tag('autopilot')
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, args=(run_now,), name='autopilot', daemon=True)
+        self._thread.start()
+        print(f"✅ 自动驾驶已启动：每 {self.interval_minutes} 分钟预生成前 {self.top_n} 条热点新闻")
+
+    def stop(self, wait: bool = True):
+        """停止调度线程，进行中的一轮会执行完"""
+        self._stop_event.set()
+        self.scheduler.clear('autopilot')
+        thread, self._thread = self._thread, None
+        if wait and thread is not None:
+            thread.join()
+
+    def _loop(self, run_now: bool):
+        """调度线程主循环"""
+        if run_now:
+            self.run_once()
+        while not self._stop_event.wait(1.0):
+            self.scheduler.run_pending()
+
+    def trigger(self) -> bool:
+        """在后台立即执行一轮；已有一轮在执行时返回False"""
+        if self._run_lock.locked():
+            return False
+        threading.Thread(target=self.run_once, name='autopilot-run', daemon=True).start()
+        return True
+
+    def run_once(self) -> Dict:
+        """执行一轮预生成，返回本轮统计；已有一轮在执行时直接返回"""
+        if not self._run_lock.acquire(blocking=False):
+            return {'skipped_run': True}
+        try:
+            return self._run()
+        finally:
+            self._run_lock.release()
+
+    def _run(self) -> Dict:
+        start = time.time()
+        summary = {'started_at': start, 'generated': 0, 'skipped': 0, 'deferred': 0, 'failed': 0,
+                   'tokens': 0, 'article_ids': []}
+        try:
+            news_list = self.news_analyzer.get_trending_news(self.top_n)[:self.top_n]
+        except Exception as e:
+            print(f"自动驾驶获取热点新闻失败: {e}")
+            news_list = []
+
+        # 按热度顺序挑选需要撰写的文章，直到用完token预算
+        planned = []
+        for news_data in news_list:
+            for article_type in self.article_types:
+                for style in self.styles:
+                    if self.article_writer.find_article(news_data, article_type, style):
+                        summary['skipped'] += 1
+                        continue
+                    tokens = self.article_writer.estimate_tokens(news_data, article_type, style)
+                    if self.token_budget and planned and summary['tokens'] + tokens > self.token_budget:
+                        summary['deferred'] += 1
+                        continue
+                    summary['tokens'] += tokens
+                    planned.append((news_data, article_type, style))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='autopilot') as pool:
+            results = list(pool.map(lambda task: self._write_draft(*task), planned))
+
+        for article_id in results:
+            if article_id:
+                summary['generated'] += 1
+                summary['article_ids'].append(article_id)
+            else:
+                summary['failed'] += 1
+
+        summary['duration'] = round(time.time() - start, 3)
+        self.last_run = summary
+        self.stats['runs'] += 1
+        for key in ('generated', 'skipped', 'deferred', 'failed', 'tokens'):
+            self.stats[key] += summary[key]
+        print(f"✅ 自动驾驶完成一轮：生成 {summary['generated']} 篇，跳过 {summary['skipped']} 篇，"
+              f"推迟 {summary['deferred']} 篇，失败 {summary['failed']} 篇")
+        return summary
+
+    def _write_draft(self, news_data, article_type, style) -> Optional[int]:
+        """撰写一篇文章并直接保存为待审核草稿，返回文章ID"""
+        try:
+            result = self.article_writer.write_article(news_data, article_type=article_type, style=style,
+                                                       status='pending')
+            if not isinstance(result, dict) or not result.get('article_id'):
+                return None
+            return result['article_id']
+        except Exception as e:
+            print(f"自动驾驶撰写失败 ({news_data.get('title', '')} / {article_type}): {e}")
+            return None
+
+    def get_stats(self) -> Dict:
+        """获取运行状态和累计统计"""
+        next_run = self.scheduler.next_run if self.running and self.scheduler.jobs else None
+        return {
+            'running': self.running,
+            'top_n': self.top_n,
+            'interval_minutes': self.interval_minutes,
+            'token_budget': self.token_budget,
+            'next_run': next_run.isoformat() if next_run else None,
+            'last_run': self.last_run,
+            'totals': dict(self.stats)
+        }
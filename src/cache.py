@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存模块
+提供进程内LRU缓存（L1）与同机多进程共享的SQLite缓存（L2）
+"""
+
+import os
+import time
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+# 前缀失效时使用的上界字符
+_PREFIX_UPPER = '\U0010ffff'
+
+class LRUCache:
+    """进程内LRU缓存，支持TTL和按前缀失效"""
+
+    def __init__(self, max_entries: int = 1024, default_timeout: int = 300):
+        """初始化LRU缓存"""
+        self.max_entries = max_entries
+        self.default_timeout = default_timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expires_at(self, timeout: Optional[float]) -> Optional[float]:
+        """计算过期时间，timeout为0表示永不过期"""
+        timeout = self.default_timeout if timeout is None else timeout
+        return time.time() + timeout if timeout else None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """获取缓存值"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def get_with_expiry(self, key: str):
+        """获取缓存值及其过期时间，未命中时返回(None, None)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None, None
+            if entry[1] is not None and entry[1] <= time.time():
+                del self._data[key]
+                return None, None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, timeout: Optional[float] = None, expires_at: Optional[float] = None):
+        """设置缓存值"""
+        if expires_at is None:
+            expires_at = self._expires_at(timeout)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        """删除缓存值"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> int:
+        """按键前缀批量失效"""
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class SQLiteCache:
+    """基于SQLite的共享磁盘缓存，同一主机上的所有工作进程可共同读写"""
+
+    # 每写入多少次检查一次容量
+    EVICT_CHECK_INTERVAL = 32
+    # 访问时间的更新粒度（秒），避免每次读取都写库
+    TOUCH_INTERVAL = 30
+
+    def __init__(self, path: str, max_size: int = 64 * 1024 * 1024, default_timeout: int = 300):
+        """初始化SQLite缓存"""
+        self.path = path
+        self.max_size = max_size
+        self.default_timeout = default_timeout
+        self._local = threading.local()
+        self._write_count = 0
+        self.available = True
+
+        try:
+            Path(os.path.dirname(os.path.abspath(path))).mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)")
+            conn.commit()
+        except Exception as e:
+            print(f"❌ 共享缓存初始化失败: {e}")
+            self.available = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA mmap_size=67108864")
+            self._local.conn = conn
+        return conn
+
+    def get_with_expiry(self, key: str):
+        """获取缓存值及其过期时间，未命中时返回(None, None)"""
+        if not self.available:
+            return None, None
+
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, None
+            blob, expires_at, accessed_at = row
+            if expires_at is not None and expires_at <= now:
+                return None, None
+            if now - accessed_at > self.TOUCH_INTERVAL:
+                conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            return pickle.loads(blob), expires_at
+        except Exception as e:
+            print(f"读取共享缓存失败: {e}")
+            return None, None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """获取缓存值"""
+        value, expires_at = self.get_with_expiry(key)
+        if value is None and expires_at is None:
+            return default
+        return value
+
+    def set(self, key: str, value: Any, timeout: Optional[float] = None, expires_at: Optional[float] = None):
+        """设置缓存值"""
+        if not self.available:
+            return
+
+        now = time.time()
+        if expires_at is None:
+            timeout = self.default_timeout if timeout is None else timeout
+            expires_at = now + timeout if timeout else None
+
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), expires_at, now)
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"写入共享缓存失败: {e}")
+            return
+
+        self._write_count += 1
+        if self._write_count % self.EVICT_CHECK_INTERVAL == 0 or len(blob) > self.max_size // 8:
+            self.evict()
+
+    def evict(self) -> int:
+        """清理过期条目，并按最近访问时间淘汰超出容量的条目"""
+        if not self.available:
+            return 0
+
+        try:
+            conn = self._connect()
+            removed = conn.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+            total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+            if total_size > self.max_size:
+                # 淘汰到容量的90%，避免每次写入都触发淘汰
+                target = total_size - int(self.max_size * 0.9)
+                freed = 0
+                victims = []
+                for key, size in conn.execute("SELECT key, size FROM cache ORDER BY accessed_at"):
+                    victims.append((key,))
+                    freed += size
+                    if freed >= target:
+                        break
+                conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+                removed += len(victims)
+
+            conn.commit()
+            return removed
+        except Exception as e:
+            print(f"共享缓存淘汰失败: {e}")
+            return 0
+
+    def delete(self, key: str):
+        """删除缓存值"""
+        if not self.available:
+            return
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            conn.commit()
+        except Exception as e:
+            print(f"删除共享缓存失败: {e}")
+
+    def delete_prefix(self, prefix: str) -> int:
+        """按键前缀批量失效"""
+        if not self.available:
+            return 0
+        try:
+            conn = self._connect()
+            removed = conn.execute(
+                "DELETE FROM cache WHERE key >= ? AND key < ?", (prefix, prefix + _PREFIX_UPPER)
+            ).rowcount
+            conn.commit()
+            return removed
+        except Exception as e:
+            print(f"删除共享缓存失败: {e}")
+            return 0
+
+    def clear(self):
+        """清空缓存"""
+        if not self.available:
+            return
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM cache")
+            conn.commit()
+        except Exception as e:
+            print(f"清空共享缓存失败: {e}")
+
+    def __len__(self):
+        if not self.available:
+            return 0
+        return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+class TieredCache:
+    """两级缓存：进程内LRU（L1）在前，共享SQLite缓存（L2）在后"""
+
+    def __init__(self, l1: LRUCache, l2: Optional[SQLiteCache] = None, l1_timeout: int = 60):
+        """初始化两级缓存
+
+        l1_timeout限制条目在L1中的最长停留时间，使其他进程的失效操作能在有限时间内生效。
+        """
+        self.l1 = l1
+        self.l2 = l2 if l2 is not None and l2.available else None
+        self.l1_timeout = l1_timeout
+        self.default_timeout = l1.default_timeout
+        self.hits = {'l1': 0, 'l2': 0, 'miss': 0}
+
+    def _l1_expiry(self, expires_at: Optional[float]) -> Optional[float]:
+        """计算条目在L1中的过期时间"""
+        if self.l2 is None or not self.l1_timeout:
+            return expires_at
+        l1_expires_at = time.time() + self.l1_timeout
+        return l1_expires_at if expires_at is None else min(expires_at, l1_expires_at)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """获取缓存值，L2命中时回填L1"""
+        value, expires_at = self.l1.get_with_expiry(key)
+        if value is not None or expires_at is not None:
+            self.hits['l1'] += 1
+            return value
+
+        if self.l2 is not None:
+            value, expires_at = self.l2.get_with_expiry(key)
+            if value is not None or expires_at is not None:
+                self.hits['l2'] += 1
+                self.l1.set(key, value, expires_at=self._l1_expiry(expires_at))
+                return value
+
+        self.hits['miss'] += 1
+        return default
+
+    def set(self, key: str, value: Any, timeout: Optional[float] = None):
+        """同时写入两级缓存"""
+        timeout = self.default_timeout if timeout is None else timeout
+        expires_at = time.time() + timeout if timeout else None
+        self.l1.set(key, value, expires_at=self._l1_expiry(expires_at))
+        if self.l2 is not None:
+            self.l2.set(key, value, expires_at=expires_at)
+
+    def get_or_set(self, key: str, func: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """获取缓存值，未命中时调用func计算并写入"""
+        value = self.get(key)
+        if value is None:
+            value = func()
+            if value is not None:
+                self.set(key, value, timeout)
+        return value
+
+    def delete(self, key: str):
+        """删除缓存值"""
+        self.l1.delete(key)
+        if self.l2 is not None:
+            self.l2.delete(key)
+
+    def delete_prefix(self, prefix: str) -> int:
+        """按键前缀批量失效"""
+        removed = self.l1.delete_prefix(prefix)
+        if self.l2 is not None:
+            removed = max(removed, self.l2.delete_prefix(prefix))
+        return removed
+
+    def clear(self):
+        """清空两级缓存"""
+        self.l1.clear()
+        if self.l2 is not None:
+            self.l2.clear()
+
+    def get_stats(self):
+        """获取缓存统计信息"""
+        total = sum(self.hits.values())
+        return {
+            'l1_entries': len(self.l1),
+            'l2_enabled': self.l2 is not None,
+            'hits': dict(self.hits),
+            'hit_rate': round((self.hits['l1'] + self.hits['l2']) / total, 3) if total else 0.0
+        }
+
+def create_cache(cache_config=None) -> TieredCache:
+    """根据配置创建缓存实例"""
+    if cache_config is None:
+        from .config import get_config
+        cache_config = get_config()
+
+    l1 = LRUCache(cache_config.CACHE_MAX_ENTRIES, cache_config.CACHE_DEFAULT_TIMEOUT)
+    l2 = None
+    if cache_config.CACHE_TYPE in ('tiered', 'sqlite'):
+        l2 = SQLiteCache(cache_config.CACHE_FILE, cache_config.CACHE_MAX_SIZE,
+                         cache_config.CACHE_DEFAULT_TIMEOUT)
+    return TieredCache(l1, l2, cache_config.CACHE_L1_TIMEOUT)
+
+# 全局缓存实例（延迟创建）
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> TieredCache:
+    """获取缓存实例"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache()
+    return _cache
+
+def create_llm_cache(cache_config=None) -> TieredCache:
+    """创建LLM响应缓存
+
+    LLM响应生成成本高、体积大，始终使用独立的SQLite文件落盘，不与通用缓存争用容量。
+    """
+    if cache_config is None:
+        from .config import get_config
+        cache_config = get_config()
+
+    l1 = LRUCache(cache_config.LLM_CACHE_MAX_ENTRIES, cache_config.LLM_CACHE_TTL)
+    l2 = SQLiteCache(cache_config.LLM_CACHE_FILE, cache_config.LLM_CACHE_MAX_SIZE,
+                     cache_config.LLM_CACHE_TTL)
+    return TieredCache(l1, l2, cache_config.CACHE_L1_TIMEOUT)
+
+# 全局LLM响应缓存实例（延迟创建）
+_llm_cache = None
+
+def get_llm_cache() -> TieredCache:
+    """获取LLM响应缓存实例"""
+    global _llm_cache
+    if _llm_cache is None:
+        with _cache_lock:
+            if _llm_cache is None:
+                _llm_cache = create_llm_cache()
+    return _llm_cache
@@ -28,13 +28,50 @@ class Config:
         
         # AI模型配置
         self.OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+        # OpenAI兼容服务地址（自建网关、本地模拟服务等），为空时使用官方地址
+        self.OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
         self.OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
         self.OPENAI_MAX_TOKENS = int(os.getenv('OPENAI_MAX_TOKENS', '2000'))
         self.OPENAI_TEMPERATURE = float(os.getenv('OPENAI_TEMPERATURE', '0.8'))
+        # 单次调用的输出token上限（模型允许的最大输出），合并生成多篇文章时的预算不超过此值
+        self.LLM_MAX_OUTPUT_TOKENS = int(os.getenv('LLM_MAX_OUTPUT_TOKENS', '4096'))
+        # 提示词token预算：原文压缩后的上限、关键点/实体列表各自的上限
+        self.PROMPT_SOURCE_TOKENS = int(os.getenv('PROMPT_SOURCE_TOKENS', '600'))
+        self.PROMPT_LIST_TOKENS = int(os.getenv('PROMPT_LIST_TOKENS', '150'))
+        # 单个撰写器内并发LLM调用的线程数
+        self.LLM_MAX_WORKERS = int(os.getenv('LLM_MAX_WORKERS', '8'))
+        # 分章节并发生成的文章类型（先规划提纲，再并发生成各章节），留空则全部整篇生成
+        self.SECTIONED_ARTICLE_TYPES = self._parse_list(os.getenv('SECTIONED_ARTICLE_TYPES', 'analysis,feature'))
+        # LLM调用限流：每分钟请求数/token数（0表示不限制），自适应并发范围，延迟目标（秒，0表示只按429调整）
+        self.LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '0'))
+        self.LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', '0'))
+        self.LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+        self.LLM_MIN_CONCURRENCY = int(os.getenv('LLM_MIN_CONCURRENCY', '1'))
+        self.LLM_LATENCY_TARGET = float(os.getenv('LLM_LATENCY_TARGET', '0'))
+        self.LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '4'))
+        # process: 进程内限流；host: 同机多进程通过SQLite文件共享配额
+        self.LLM_RATE_LIMIT_SCOPE = os.getenv('LLM_RATE_LIMIT_SCOPE', 'process')
+        self.LLM_RATE_LIMIT_FILE = os.getenv('LLM_RATE_LIMIT_FILE', 'data/rate_limit.db')
+        # LLM HTTP连接池（进程内共享）：最大连接数（0表示按LLM_MAX_CONCURRENCY/LLM_MAX_WORKERS取较大值）、
+        # 保持的空闲连接数（0表示与最大连接数相同）、空闲连接保持时间、连接/读取超时（读取超时0表示使用REQUEST_TIMEOUT）
+        self.LLM_HTTP_MAX_CONNECTIONS = int(os.getenv('LLM_HTTP_MAX_CONNECTIONS', '0'))
+        self.LLM_HTTP_MAX_KEEPALIVE = int(os.getenv('LLM_HTTP_MAX_KEEPALIVE', '0'))
+        self.LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv('LLM_HTTP_KEEPALIVE_EXPIRY', '30'))
+        self.LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '5'))
+        self.LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', '0'))
         
         # 其他AI模型
         self.CLAUDE_API_KEY = os.getenv('CLAUDE_API_KEY')
+        self.CLAUDE_MODEL = os.getenv('CLAUDE_MODEL', 'claude-3-5-haiku-latest')
+        self.CLAUDE_BASE_URL = os.getenv('CLAUDE_BASE_URL', 'https://api.anthropic.com')
         self.GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+        self.GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+        self.GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com')
+        # 对冲请求：主服务商超过其延迟分位数（样本不足时为固定秒数）仍未返回，则同时请求下一个服务商
+        self.LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'True').lower() == 'true'
+        self.LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '95'))
+        self.LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+        self.LLM_HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', '10'))
         
         # Flask配置
         self.SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -53,6 +90,10 @@ class Config:
         self.NEWS_CACHE_DURATION = int(os.getenv('NEWS_CACHE_DURATION', '1800'))
         self.MAX_NEWS_PER_SOURCE = int(os.getenv('MAX_NEWS_PER_SOURCE', '20'))
         self.NEWS_MAX_AGE_DAYS = int(os.getenv('NEWS_MAX_AGE_DAYS', '3'))
+        self.NEWS_SNAPSHOT_FILE = os.getenv('NEWS_SNAPSHOT_FILE', 'data/news_snapshot.bin')
+        self.NEWS_SNAPSHOT_INTERVAL = int(os.getenv('NEWS_SNAPSHOT_INTERVAL', '300'))
+        # 扩展关键词词典（JSON，{词典名: [词, ...]}），修改后自动热加载
+        self.KEYWORD_DICT_FILE = os.getenv('KEYWORD_DICT_FILE', 'data/keywords.json')
         
         # 文章配置
         self.ARTICLES_DIR = os.getenv('ARTICLES_DIR', 'articles')
@@ -61,6 +102,30 @@ class Config:
         self.ARTICLE_MIN_LENGTH = int(os.getenv('ARTICLE_MIN_LENGTH', '500'))
         self.ARTICLE_MAX_LENGTH = int(os.getenv('ARTICLE_MAX_LENGTH', '2000'))
         self.AI_FALLBACK_ENABLED = os.getenv('AI_FALLBACK_ENABLED', 'True').lower() == 'true'
+        # 后台文章生成任务：工作线程数、队列长度、结果保留时间（秒）
+        self.JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+        self.JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '100'))
+        self.JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', '3600'))
+        self.JOB_WEBHOOK_TIMEOUT = int(os.getenv('JOB_WEBHOOK_TIMEOUT', '10'))
+        # 回调主机允许列表（逗号分隔），为空时允许任意公网主机；列表中的主机可以是内网地址
+        self.JOB_WEBHOOK_ALLOWED_HOSTS = self._parse_list(os.getenv('JOB_WEBHOOK_ALLOWED_HOSTS', ''))
+        # 批量撰写：并发文章数上限、单次请求最多生成的文章数
+        self.BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', '4'))
+        self.BATCH_MAX_ARTICLES = int(os.getenv('BATCH_MAX_ARTICLES', '100'))
+        # 多来源综述：单个事件最多使用的来源数、每个来源摘要的长度、归为同一事件的标题词重合度阈值
+        self.DIGEST_MAX_SOURCES = int(os.getenv('DIGEST_MAX_SOURCES', '5'))
+        self.DIGEST_SUMMARY_TOKENS = int(os.getenv('DIGEST_SUMMARY_TOKENS', '200'))
+        self.DIGEST_GROUP_THRESHOLD = float(os.getenv('DIGEST_GROUP_THRESHOLD', '0.3'))
+        # 单篇撰写的默认截止时间（毫秒），超时先返回模板文章并在后台升级，0表示不限制
+        self.WRITE_ARTICLE_DEADLINE_MS = int(os.getenv('WRITE_ARTICLE_DEADLINE_MS', '0'))
+        # 自动驾驶：定时为前N条热点新闻预生成草稿，单轮并发数和预估token预算（0表示不限制）
+        self.AUTOPILOT_ENABLED = os.getenv('AUTOPILOT_ENABLED', 'False').lower() == 'true'
+        self.AUTOPILOT_INTERVAL_MINUTES = float(os.getenv('AUTOPILOT_INTERVAL_MINUTES', '30'))
+        self.AUTOPILOT_TOP_N = int(os.getenv('AUTOPILOT_TOP_N', '5'))
+        self.AUTOPILOT_ARTICLE_TYPES = self._parse_list(os.getenv('AUTOPILOT_ARTICLE_TYPES', 'breaking_news'))
+        self.AUTOPILOT_STYLES = self._parse_list(os.getenv('AUTOPILOT_STYLES', 'professional'))
+        self.AUTOPILOT_MAX_WORKERS = int(os.getenv('AUTOPILOT_MAX_WORKERS', '2'))
+        self.AUTOPILOT_TOKEN_BUDGET = int(os.getenv('AUTOPILOT_TOKEN_BUDGET', '0'))
         
         # Web服务配置
         self.WEB_HOST = os.getenv('WEB_HOST', '0.0.0.0')
@@ -68,8 +133,22 @@ class Config:
         self.WEB_THREADS = int(os.getenv('WEB_THREADS', '4'))
         
         # 缓存配置
-        self.CACHE_TYPE = os.getenv('CACHE_TYPE', 'simple')
+        # simple: 仅进程内LRU；tiered: 进程内LRU + 同机共享的SQLite缓存
+        self.CACHE_TYPE = os.getenv('CACHE_TYPE', 'tiered')
         self.CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', '300'))
+        self.CACHE_FILE = os.getenv('CACHE_FILE', 'data/cache.db')
+        self.CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1024'))
+        self.CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE', '67108864'))
+        self.CACHE_L1_TIMEOUT = int(os.getenv('CACHE_L1_TIMEOUT', '60'))
+        # LLM用量账本：记录每次调用的token用量、延迟、重试和结果，按批写入数据库
+        self.LLM_USAGE_LEDGER_ENABLED = os.getenv('LLM_USAGE_LEDGER_ENABLED', 'True').lower() == 'true'
+        self.LLM_USAGE_BATCH_SIZE = int(os.getenv('LLM_USAGE_BATCH_SIZE', '50'))
+        # LLM响应缓存：相同(模型, 温度, 提示词)直接返回已生成的内容
+        self.LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+        self.LLM_CACHE_FILE = os.getenv('LLM_CACHE_FILE', 'data/llm_cache.db')
+        self.LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', '604800'))
+        self.LLM_CACHE_MAX_SIZE = int(os.getenv('LLM_CACHE_MAX_SIZE', '268435456'))
+        self.LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '256'))
         
         # 日志配置
         self.LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -98,7 +177,8 @@ class Config:
         """确保必要的目录存在"""
         directories = [
             self.ARTICLES_DIR,
-            os.path.dirname(self.LOG_FILE) if self.LOG_FILE else 'logs'
+            os.path.dirname(self.LOG_FILE) if self.LOG_FILE else 'logs',
+            os.path.dirname(self.NEWS_SNAPSHOT_FILE) if self.NEWS_SNAPSHOT_FILE else None
         ]
         
         for directory in directories:
@@ -5,17 +5,23 @@
 """
 
 import os
+import json
 from datetime import datetime
 from typing import List, Dict, Optional
 
 try:
-    from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, Boolean
+    from sqlalchemy import create_engine, inspect, text, case, func, Column, Integer, String, Text, DateTime, Float, \
+        Boolean
+    from sqlalchemy.exc import IntegrityError
     from sqlalchemy.ext.declarative import declarative_base
     from sqlalchemy.orm import sessionmaker, Session
     SQLALCHEMY_AVAILABLE = True
 except ImportError:
     SQLALCHEMY_AVAILABLE = False
 
+class IdempotencyConflict(Exception):
+    """同一幂等键的文章已被其他请求保存"""
+
 if SQLALCHEMY_AVAILABLE:
     Base = declarative_base()
     
@@ -38,6 +44,15 @@ if SQLALCHEMY_AVAILABLE:
         created_at = Column(DateTime, default=datetime.utcnow)
         updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
         is_deleted = Column(Boolean, default=False)
+        # 幂等键：同一(新闻, 类型, 风格, 提示词版本)只保留一篇文章；删除或重新生成时清空
+        idempotency_key = Column(String(64), unique=True, index=True)
+        filename = Column(String(255))
+        # published: 已发布；pending: 自动预生成、等待编辑处理的草稿
+        status = Column(String(20), default='published')
+        # ai: AI生成；template: 模板生成（含AI失败后的退回）
+        generation_mode = Column(String(20))
+        # 综述文章的各来源及摘要（JSON）
+        digest_sources = Column(Text)
     
     class NewsSource(Base):
         """新闻源模型"""
@@ -68,6 +83,26 @@ if SQLALCHEMY_AVAILABLE:
         user_agent = Column(String(500))
         ip_address = Column(String(50))
     
+    class LLMCall(Base):
+        """LLM调用记录（只追加）"""
+        __tablename__ = 'llm_calls'
+
+        id = Column(Integer, primary_key=True)
+        created_at = Column(DateTime, default=datetime.utcnow, index=True)
+        kind = Column(String(20))
+        article_type = Column(String(50))
+        provider = Column(String(20))
+        model = Column(String(100))
+        prompt_tokens = Column(Integer, default=0)
+        completion_tokens = Column(Integer, default=0)
+        # 服务商未返回用量时按字符估算
+        tokens_estimated = Column(Boolean, default=False)
+        latency_ms = Column(Integer, default=0)
+        retries = Column(Integer, default=0)
+        cache_hit = Column(Boolean, default=False)
+        # ok: 成功；error: 失败；cancelled: 流式调用被提前中止
+        outcome = Column(String(10), default='ok')
+    
     class SystemStats(Base):
         """系统统计模型"""
         __tablename__ = 'system_stats'
@@ -102,12 +137,60 @@ class DatabaseManager:
             
             # 创建表
             Base.metadata.create_all(bind=self.engine)
+            self._migrate()
             print("✅ 数据库初始化成功")
             
         except Exception as e:
             print(f"❌ 数据库初始化失败: {e}")
             self.available = False
     
+    # 已有数据库需要补充的列：(表, 列, 列定义)
+    MIGRATIONS = [
+        ('articles', 'idempotency_key', 'VARCHAR(64)'),
+        ('articles', 'filename', 'VARCHAR(255)'),
+        ('articles', 'status', "VARCHAR(20) DEFAULT 'published'"),
+        ('articles', 'generation_mode', 'VARCHAR(20)'),
+        ('articles', 'digest_sources', 'TEXT'),
+    ]
+
+    def _migrate(self):
+        """为旧版本创建的数据库补充新增的列和索引（create_all不会修改已存在的表）"""
+        inspector = inspect(self.engine)
+        with self.engine.begin() as conn:
+            for table, column, definition in self.MIGRATIONS:
+                columns = {info['name'] for info in inspector.get_columns(table)}
+                if column not in columns:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+                    print(f"✅ 数据库迁移：{table}.{column}")
+            indexes = {info['name'] for info in inspector.get_indexes('articles')}
+            if 'ix_articles_idempotency_key' not in indexes:
+                conn.execute(text(
+                    "CREATE UNIQUE INDEX ix_articles_idempotency_key ON articles (idempotency_key)"
+                ))
+
+    @staticmethod
+    def _new_article(article_data: Dict) -> 'Article':
+        """根据字典构建文章对象"""
+        return Article(
+            title=article_data.get('title', ''),
+            content=article_data.get('content', ''),
+            summary=article_data.get('summary', ''),
+            article_type=article_data.get('article_type', 'breaking_news'),
+            writing_style=article_data.get('writing_style', 'professional'),
+            source_news_id=str(article_data.get('source_news_id', '')),
+            source_news_title=article_data.get('source_news_title', ''),
+            source_news_url=article_data.get('source_news_url', ''),
+            quality_score=article_data.get('quality_score', 0.0),
+            quality_grade=article_data.get('quality_grade', 'C'),
+            word_count=len(article_data.get('content', '')),
+            idempotency_key=article_data.get('idempotency_key'),
+            filename=article_data.get('filename'),
+            status=article_data.get('status', 'published'),
+            generation_mode=article_data.get('mode'),
+            digest_sources=json.dumps(article_data['sources'], ensure_ascii=False, default=str)
+            if article_data.get('sources') else None
+        )
+
     def get_session(self) -> Optional[Session]:
         """获取数据库会话"""
         if not self.available:
@@ -119,8 +202,12 @@ class DatabaseManager:
             print(f"获取数据库会话失败: {e}")
             return None
     
-    def save_article(self, article_data: Dict) -> Optional[int]:
-        """保存文章到数据库"""
+    def save_article(self, article_data: Dict, replace_key: bool = False) -> Optional[int]:
+        """保存文章到数据库
+
+        replace_key为True时在同一事务中把幂等键从旧文章移到新文章；
+        幂等键已被其他请求占用时抛出IdempotencyConflict。
+        """
         if not self.available:
             return None
         
@@ -128,20 +215,14 @@ class DatabaseManager:
         if not session:
             return None
         
+        idempotency_key = article_data.get('idempotency_key')
         try:
-            article = Article(
-                title=article_data.get('title', ''),
-                content=article_data.get('content', ''),
-                summary=article_data.get('summary', ''),
-                article_type=article_data.get('article_type', 'breaking_news'),
-                writing_style=article_data.get('writing_style', 'professional'),
-                source_news_id=str(article_data.get('source_news_id', '')),
-                source_news_title=article_data.get('source_news_title', ''),
-                source_news_url=article_data.get('source_news_url', ''),
-                quality_score=article_data.get('quality_score', 0.0),
-                quality_grade=article_data.get('quality_grade', 'C'),
-                word_count=len(article_data.get('content', ''))
-            )
+            if replace_key and idempotency_key:
+                session.query(Article)\
+                    .filter(Article.idempotency_key == idempotency_key)\
+                    .update({Article.idempotency_key: None}, synchronize_session=False)
+
+            article = self._new_article(article_data)
             
             session.add(article)
             session.commit()
@@ -150,14 +231,47 @@ class DatabaseManager:
             
             return article_id
             
+        except IntegrityError as e:
+            session.rollback()
+            session.close()
+            if idempotency_key:
+                # 其他请求已用同一幂等键保存了文章，交给调用方处理，不能冒用那篇文章的ID
+                raise IdempotencyConflict(f"幂等键已被占用: {idempotency_key}") from e
+            print(f"保存文章失败: {e}")
+            return None
         except Exception as e:
             print(f"保存文章失败: {e}")
             session.rollback()
             session.close()
             return None
     
-    def get_articles(self, limit: int = 50, offset: int = 0) -> List[Dict]:
-        """获取文章列表"""
+    def save_articles(self, articles_data: List[Dict]) -> List[Optional[int]]:
+        """批量保存文章到数据库（一个事务），返回与输入顺序一致的文章ID列表"""
+        if not self.available or not articles_data:
+            return [None] * len(articles_data)
+        
+        session = self.get_session()
+        if not session:
+            return [None] * len(articles_data)
+        
+        try:
+            articles = [self._new_article(article_data) for article_data in articles_data]
+            
+            session.add_all(articles)
+            session.commit()
+            article_ids = [article.id for article in articles]
+            session.close()
+            
+            return article_ids
+            
+        except Exception as e:
+            print(f"批量保存文章失败: {e}")
+            session.rollback()
+            session.close()
+            return [None] * len(articles_data)
+    
+    def get_articles(self, limit: int = 50, offset: int = 0, status: Optional[str] = None) -> List[Dict]:
+        """获取文章列表（可按状态筛选）"""
         if not self.available:
             return []
         
@@ -166,8 +280,10 @@ class DatabaseManager:
             return []
         
         try:
-            articles = session.query(Article)\
-                .filter(Article.is_deleted == False)\
+            query = session.query(Article).filter(Article.is_deleted == False)
+            if status:
+                query = query.filter(Article.status == status)
+            articles = query\
                 .order_by(Article.created_at.desc())\
                 .limit(limit)\
                 .offset(offset)\
@@ -185,6 +301,8 @@ class DatabaseManager:
                     'quality_score': article.quality_score,
                     'quality_grade': article.quality_grade,
                     'word_count': article.word_count,
+                    'status': article.status,
+                    'filename': article.filename,
                     'created_at': article.created_at.isoformat(),
                     'updated_at': article.updated_at.isoformat()
                 })
@@ -225,6 +343,8 @@ class DatabaseManager:
                 'quality_score': article.quality_score,
                 'quality_grade': article.quality_grade,
                 'word_count': article.word_count,
+                'status': article.status,
+                'filename': article.filename,
                 'created_at': article.created_at.isoformat(),
                 'updated_at': article.updated_at.isoformat()
             }
@@ -237,6 +357,45 @@ class DatabaseManager:
             session.close()
             return None
     
+    def get_article_by_idempotency_key(self, idempotency_key: str) -> Optional[Dict]:
+        """根据幂等键获取文章（包含文件名）"""
+        if not self.available or not idempotency_key:
+            return None
+        
+        session = self.get_session()
+        if not session:
+            return None
+        
+        try:
+            article = session.query(Article)\
+                .filter(Article.idempotency_key == idempotency_key, Article.is_deleted == False)\
+                .first()
+            
+            result = None
+            if article:
+                result = {
+                    'id': article.id,
+                    'title': article.title,
+                    'content': article.content,
+                    'article_type': article.article_type,
+                    'writing_style': article.writing_style,
+                    'quality_score': article.quality_score,
+                    'quality_grade': article.quality_grade,
+                    'filename': article.filename,
+                    'status': article.status,
+                    'mode': article.generation_mode,
+                    'sources': json.loads(article.digest_sources) if article.digest_sources else None,
+                    'created_at': article.created_at.isoformat()
+                }
+            
+            session.close()
+            return result
+            
+        except Exception as e:
+            print(f"获取文章失败: {e}")
+            session.close()
+            return None
+    
     def update_article(self, article_id: int, update_data: Dict) -> bool:
         """更新文章"""
         if not self.available:
@@ -295,6 +454,7 @@ class DatabaseManager:
                 return False
             
             article.is_deleted = True
+            article.idempotency_key = None  # 删除后同样的请求可以重新生成
             article.updated_at = datetime.utcnow()
             
             session.commit()
@@ -307,6 +467,109 @@ class DatabaseManager:
             session.close()
             return False
     
+    def save_llm_calls(self, calls: List[Dict]) -> int:
+        """批量追加LLM调用记录，返回写入条数"""
+        if not self.available or not calls:
+            return 0
+        
+        session = self.get_session()
+        if not session:
+            return 0
+        
+        try:
+            session.add_all([LLMCall(**call) for call in calls])
+            session.commit()
+            session.close()
+            return len(calls)
+            
+        except Exception as e:
+            print(f"保存LLM调用记录失败: {e}")
+            session.rollback()
+            session.close()
+            return 0
+    
+    def get_llm_usage(self, since: Optional[datetime] = None, group_by: Optional[str] = None) -> List[Dict]:
+        """在数据库中汇总LLM调用的次数、错误、缓存命中、重试和token用量，since为UTC时间
+
+        group_by为day（UTC日期）、article_type、kind或model时每组一行（name为分组值），为None时只返回总计一行。
+        """
+        if not self.available:
+            return []
+        
+        session = self.get_session()
+        if not session:
+            return []
+        
+        try:
+            groups = {
+                'day': func.date(LLMCall.created_at),
+                'article_type': LLMCall.article_type,
+                'kind': LLMCall.kind,
+                'model': LLMCall.model
+            }
+            group = groups[group_by] if group_by else None
+            columns = [
+                func.count(LLMCall.id).label('calls'),
+                func.sum(case((LLMCall.outcome != 'ok', 1), else_=0)).label('errors'),
+                func.sum(case((LLMCall.cache_hit == True, 1), else_=0)).label('cache_hits'),
+                func.sum(LLMCall.retries).label('retries'),
+                func.sum(LLMCall.prompt_tokens).label('prompt_tokens'),
+                func.sum(LLMCall.completion_tokens).label('completion_tokens')
+            ]
+            if group is not None:
+                columns.insert(0, group.label('name'))
+            query = session.query(*columns)
+            if since is not None:
+                query = query.filter(LLMCall.created_at >= since)
+            if group is not None:
+                query = query.group_by(group)
+            rows = [{
+                'name': str(row.name) if group is not None and row.name is not None else None,
+                'calls': row.calls or 0,
+                'errors': int(row.errors or 0),
+                'cache_hits': int(row.cache_hits or 0),
+                'retries': int(row.retries or 0),
+                'prompt_tokens': int(row.prompt_tokens or 0),
+                'completion_tokens': int(row.completion_tokens or 0)
+            } for row in query.all()]
+            session.close()
+            return rows
+            
+        except Exception as e:
+            print(f"汇总LLM调用记录失败: {e}")
+            session.close()
+            return []
+    
+    def get_llm_latencies(self, since: Optional[datetime] = None) -> List[Dict]:
+        """获取真正请求了服务商的成功调用的延迟（用于计算分位数），since为UTC时间"""
+        if not self.available:
+            return []
+        
+        session = self.get_session()
+        if not session:
+            return []
+        
+        try:
+            query = session.query(LLMCall.created_at, LLMCall.article_type, LLMCall.kind, LLMCall.model,
+                                  LLMCall.latency_ms)\
+                .filter(LLMCall.outcome == 'ok', LLMCall.cache_hit == False)
+            if since is not None:
+                query = query.filter(LLMCall.created_at >= since)
+            latencies = [{
+                'day': row.created_at.strftime('%Y-%m-%d'),
+                'article_type': row.article_type,
+                'kind': row.kind,
+                'model': row.model,
+                'latency_ms': row.latency_ms or 0
+            } for row in query.all()]
+            session.close()
+            return latencies
+            
+        except Exception as e:
+            print(f"获取LLM调用延迟失败: {e}")
+            session.close()
+            return []
+    
     def get_statistics(self) -> Dict:
         """获取统计数据"""
         if not self.available:
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多来源综述模块
+把不同来源报道同一事件的新闻归为一个事件（story），并合并为综述文章使用的新闻数据
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, List
+
+def _story_words(news_data: Dict) -> frozenset:
+    """标题分词（去掉单字和标点），用于判断两条新闻是否报道同一事件"""
+    import jieba
+    return frozenset(word for word in jieba.cut(news_data.get('title', '')) if len(word.strip()) > 1)
+
+def _similarity(words_a: frozenset, words_b: frozenset) -> float:
+    if not (words_a | words_b):
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+def group_stories(news_list: List[Dict], threshold: float = 0.3, max_sources: int = 5) -> List[List[Dict]]:
+    """把新闻按事件分组，返回按来源数从多到少排列的事件列表
+
+    新闻与事件中任一条新闻的标题词重合度（Jaccard）不低于threshold时归入该事件；
+    每个事件最多保留max_sources条，同一来源只取第一条。
+    """
+    stories = []
+    for news_data in news_list:
+        words = _story_words(news_data)
+        for story in stories:
+            if any(_similarity(words, member_words) >= threshold for member_words in story['words']):
+                if len(story['items']) < max_sources and \
+                        news_data.get('source') not in {item.get('source') for item in story['items']}:
+                    story['items'].append(news_data)
+                    story['words'].append(words)
+                break
+        else:
+            stories.append({'items': [news_data], 'words': [words]})
+
+    # 稳定排序：来源数相同的事件保持原有（热度）顺序
+    return [story['items'] for story in sorted(stories, key=lambda story: -len(story['items']))]
+
+def story_id(items: List[Dict]) -> str:
+    """事件ID：由各来源新闻ID决定，与顺序无关"""
+    ids = sorted(str(item.get('id') or item.get('link') or item.get('title', '')) for item in items)
+    return 'digest-' + hashlib.sha1('\n'.join(ids).encode('utf-8')).hexdigest()[:16]
+
+def merge_story(items: List[Dict], summaries: List[str]) -> Dict:
+    """把事件中的新闻和各来源摘要合并为一条新闻数据，首条新闻作为主报道"""
+    lead = items[0]
+    sources = list(dict.fromkeys(item.get('source', '未知来源') for item in items))
+    publish_times = [item['publish_time'] for item in items if item.get('publish_time')]
+    return {
+        'id': story_id(items),
+        'title': lead['title'],
+        'content': '\n\n'.join(f"【{item.get('source', '未知来源')}】{summary}"
+                               for item, summary in zip(items, summaries)),
+        'summary': lead.get('summary', ''),
+        'source': '、'.join(sources),
+        'link': lead.get('link', ''),
+        'publish_time': max(publish_times) if publish_times else datetime.now(),
+        'digest_sources': [{
+            'id': item.get('id'),
+            'title': item.get('title', ''),
+            'source': item.get('source', ''),
+            'link': item.get('link', ''),
+            'summary': summary
+        } for item, summary in zip(items, summaries)]
+    }
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务模块
+文章生成等耗时操作放入有界队列，由固定数量的工作线程执行，调用方轮询状态或注册回调
+"""
+
+import time
+import uuid
+import queue
+import socket
+import ipaddress
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+class JobQueueFull(Exception):
+    """任务队列已满"""
+
+class InvalidWebhook(Exception):
+    """回调地址不允许使用"""
+
+def check_webhook_url(url: str, allowed_hosts: Iterable[str] = ()) -> str:
+    """校验回调地址，不合法时抛出InvalidWebhook
+
+    只允许http/https；配置了allowed_hosts时主机必须在列表中。
+    主机解析到内网、回环、链路本地等地址时拒绝，除非该主机显式出现在allowed_hosts中。
+    """
+    parts = urlsplit(str(url))
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise InvalidWebhook('回调地址必须是http或https URL')
+
+    host = parts.hostname.lower()
+    allowed = {item.strip().lower() for item in allowed_hosts if item.strip()}
+    if allowed and host not in allowed:
+        raise InvalidWebhook(f'回调主机不在允许列表中: {host}')
+    if host in allowed:
+        return url
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or None)}
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise InvalidWebhook(f'无法解析回调主机: {host}')
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if not ip.is_global or ip.is_multicast:
+            raise InvalidWebhook(f'回调地址不能指向内网或本机: {host}')
+    return url
+
+class Job:
+    """一个后台任务"""
+
+    def __init__(self, payload: Dict, webhook: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.webhook = webhook
+        self.status = 'queued'  # queued -> running -> succeeded / failed
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.timings: Dict[str, float] = {}
+        self.webhook_status = None
+
+    def to_dict(self, include_result: bool = True) -> Dict:
+        """转换为可序列化的字典"""
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'timings': dict(self.timings),
+            'error': self.error
+        }
+        if self.webhook:
+            data['webhook_status'] = self.webhook_status
+        if include_result:
+            data['result'] = self.result
+        return data
+
+class JobManager:
+    """有界队列 + 工作线程池
+
+    handler接收任务payload并返回结果字典；结果中的timings会合并到任务的阶段耗时里。
+    """
+
+    def __init__(self, handler: Callable[[Dict], Any], workers: int = 2, queue_size: int = 100,
+                 result_ttl: int = 3600, webhook_timeout: int = 10,
+                 webhook_allowed_hosts: Iterable[str] = ()):
+        """初始化任务管理器"""
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.result_ttl = result_ttl
+        self.webhook_timeout = webhook_timeout
+        self.webhook_allowed_hosts = list(webhook_allowed_hosts)
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """启动工作线程（重复调用无副作用）"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, wait: bool = True):
+        """停止工作线程，已在队列中的任务会先执行完"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def submit(self, payload: Dict, webhook: Optional[str] = None) -> Job:
+        """提交任务；回调地址不合法时抛出InvalidWebhook，队列已满时抛出JobQueueFull"""
+        if webhook:
+            self.check_webhook(webhook)
+        self.start()
+        self._prune()
+        job = Job(payload, webhook)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise JobQueueFull(f"任务队列已满（{self._queue.maxsize}）")
+        return job
+
+    def check_webhook(self, url: str) -> str:
+        """按配置的允许列表校验回调地址"""
+        return check_webhook_url(url, self.webhook_allowed_hosts)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """获取任务"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_stats(self) -> Dict:
+        """获取队列统计信息"""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            'workers': self.workers,
+            'queue_size': self._queue.qsize(),
+            'queue_limit': self._queue.maxsize,
+            'queued': statuses.count('queued'),
+            'running': statuses.count('running'),
+            'succeeded': statuses.count('succeeded'),
+            'failed': statuses.count('failed')
+        }
+
+    def _worker(self):
+        """工作线程主循环"""
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job):
+        """执行单个任务并记录阶段耗时"""
+        job.started_at = time.time()
+        job.status = 'running'
+        job.timings['queued'] = round(job.started_at - job.created_at, 3)
+
+        try:
+            result = self.handler(job.payload)
+            if isinstance(result, dict):
+                job.timings.update(result.get('timings') or {})
+                if result.get('success') is False:
+                    raise Exception(result.get('error') or '任务执行失败')
+            job.result = result
+            job.status = 'succeeded'
+        except Exception as e:
+            print(f"后台任务 {job.id} 执行失败: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            job.timings['run'] = round(job.finished_at - job.started_at, 3)
+
+        if job.webhook:
+            self._notify(job)
+
+    def _notify(self, job: Job):
+        """向回调地址POST任务结果"""
+        try:
+            import requests
+            # 发送前重新解析校验，且不跟随重定向，防止借DNS变化或跳转访问内网
+            self.check_webhook(job.webhook)
+            response = requests.post(job.webhook, json=job.to_dict(), timeout=self.webhook_timeout,
+                                     allow_redirects=False)
+            job.webhook_status = response.status_code
+        except Exception as e:
+            print(f"任务回调失败 ({job.webhook}): {e}")
+            job.webhook_status = 'error'
+
+    def _prune(self):
+        """清理超过保留时间的已完成任务"""
+        if self.result_ttl <= 0:
+            return
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词匹配模块
+基于Aho-Corasick自动机，一次扫描文本即可得到所有词典的命中情况
+"""
+
+import os
+import json
+import hashlib
+import time
+import threading
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional
+
+# 默认词典：分类、紧急程度、情感、质量评估共用
+DEFAULT_DICTIONARIES = {
+    'category:经济': ['经济', '金融', '股市', '投资', 'GDP', '通胀', '贸易'],
+    'category:科技': ['科技', '人工智能', '互联网', '5G', '芯片', '创新'],
+    'category:政治': ['政府', '政策', '法律', '外交', '会议', '领导'],
+    'category:社会': ['社会', '民生', '教育', '医疗', '环境', '文化'],
+    'category:体育': ['体育', '奥运', '世界杯', '比赛', '运动员'],
+    'category:娱乐': ['娱乐', '明星', '电影', '音乐', '综艺'],
+    'urgent': ['突发', '紧急', '重大', '严重', '危机', '事故'],
+    'positive': ['好', '优秀', '成功', '增长', '提升', '改善', '突破', '创新'],
+    'negative': ['坏', '失败', '下降', '问题', '危机', '困难', '风险', '担忧'],
+    'quality': [
+        '分析', '研究', '数据', '专家', '观点', '影响', '发展', '趋势',
+        '政策', '市场', '技术', '创新', '改革', '合作', '建设'
+    ],
+    'connector': ['因此', '然而', '此外', '同时', '另外', '总之', '综上'],
+}
+
+CATEGORY_PREFIX = 'category:'
+
+class _Automaton:
+    """不可变的Aho-Corasick自动机"""
+
+    def __init__(self, dictionaries: Dict[str, List[str]]):
+        self.dictionaries = {name: frozenset(terms) for name, terms in dictionaries.items()}
+        # 词典内容指纹，词典变化后据此让依赖词典的缓存结果失效
+        canonical = json.dumps({name: sorted(terms) for name, terms in self.dictionaries.items()},
+                               ensure_ascii=False, sort_keys=True)
+        self.fingerprint = hashlib.md5(canonical.encode('utf-8')).hexdigest()[:8]
+
+        # 每个词对应的词典列表
+        term_dicts = {}
+        for name, terms in dictionaries.items():
+            for term in terms:
+                if term:
+                    term_dicts.setdefault(term, []).append(name)
+        self.terms = list(term_dicts)
+        self.term_dicts = [tuple(term_dicts[term]) for term in self.terms]
+
+        # 构建trie
+        goto = [{}]
+        outputs = [[]]
+        for term_id, term in enumerate(self.terms):
+            state = 0
+            for char in term:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(term_id)
+
+        # 广度优先构建失败指针，并把失败链上的输出合并到当前节点
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+
+        self.goto = goto
+        self.fail = fail
+        self.outputs = [tuple(output) for output in outputs]
+
+    def iter_matches(self, text: str):
+        """遍历文本中所有命中的词ID（允许重叠）"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                yield from outputs[state]
+
+class KeywordMatcher:
+    """多词典关键词匹配器，支持热加载"""
+
+    def __init__(self, dictionaries: Optional[Dict[str, Iterable[str]]] = None,
+                 dictionary_file: Optional[str] = None, check_interval: float = 5.0):
+        """初始化匹配器
+
+        dictionary_file为JSON文件（{词典名: [词, ...]}），其中的词会合并到默认词典中，
+        文件修改后会自动重新加载。
+        """
+        self.base_dictionaries = {
+            name: list(terms) for name, terms in (dictionaries or DEFAULT_DICTIONARIES).items()
+        }
+        self.dictionary_file = dictionary_file
+        self.check_interval = check_interval
+        self._file_mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._automaton = _Automaton(self._merged_dictionaries())
+
+    def _merged_dictionaries(self) -> Dict[str, List[str]]:
+        """合并默认词典和词典文件"""
+        merged = {name: list(terms) for name, terms in self.base_dictionaries.items()}
+        if not self.dictionary_file or not os.path.exists(self.dictionary_file):
+            self._file_mtime = None
+            return merged
+
+        try:
+            self._file_mtime = os.path.getmtime(self.dictionary_file)
+            with open(self.dictionary_file, 'r', encoding='utf-8') as f:
+                extra = json.load(f)
+            for name, terms in extra.items():
+                existing = merged.setdefault(name, [])
+                existing.extend(term for term in terms if term not in existing)
+        except Exception as e:
+            print(f"加载关键词词典失败: {e}")
+        return merged
+
+    def reload(self, dictionaries: Optional[Dict[str, Iterable[str]]] = None):
+        """重新构建自动机；传入dictionaries时替换默认词典"""
+        with self._lock:
+            if dictionaries is not None:
+                self.base_dictionaries = {name: list(terms) for name, terms in dictionaries.items()}
+            # 新自动机构建完成后整体替换，扫描中的线程不受影响
+            self._automaton = _Automaton(self._merged_dictionaries())
+
+    def reload_if_changed(self) -> bool:
+        """词典文件有变化时重新加载"""
+        if not self.dictionary_file:
+            return False
+
+        now = time.time()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        mtime = os.path.getmtime(self.dictionary_file) if os.path.exists(self.dictionary_file) else None
+        if mtime == self._file_mtime:
+            return False
+        self.reload()
+        return True
+
+    def scan(self, text: str) -> Dict[str, Counter]:
+        """单遍扫描文本，返回每个词典中各个词的命中次数"""
+        self.reload_if_changed()
+        automaton = self._automaton
+        hits = {}
+        for term_id in automaton.iter_matches(text or ''):
+            term = automaton.terms[term_id]
+            for name in automaton.term_dicts[term_id]:
+                hits.setdefault(name, Counter())[term] += 1
+        return hits
+
+    def count(self, text: str) -> Dict[str, int]:
+        """返回每个词典的命中总次数"""
+        return {name: sum(counter.values()) for name, counter in self.scan(text).items()}
+
+    def distinct(self, text: str) -> Dict[str, int]:
+        """返回每个词典命中的不同词数量"""
+        return {name: len(counter) for name, counter in self.scan(text).items()}
+
+    @property
+    def fingerprint(self) -> str:
+        """当前词典内容的指纹（词典文件有变化时先重新加载）"""
+        self.reload_if_changed()
+        return self._automaton.fingerprint
+
+    def terms(self, name: str) -> frozenset:
+        """获取指定词典的全部词"""
+        return self._automaton.dictionaries.get(name, frozenset())
+
+    def categories(self) -> List[str]:
+        """按定义顺序返回分类名称"""
+        return [name[len(CATEGORY_PREFIX):] for name in self._automaton.dictionaries
+                if name.startswith(CATEGORY_PREFIX)]
+
+    def categorize(self, text: str, default: str = '综合') -> str:
+        """返回文本命中的第一个分类（按分类定义顺序）"""
+        hits = self.scan(text)
+        for category in self.categories():
+            if CATEGORY_PREFIX + category in hits:
+                return category
+        return default
+
+# 全局匹配器实例（延迟创建）
+_matcher = None
+_matcher_lock = threading.Lock()
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """获取关键词匹配器实例"""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                from .config import get_config
+                _matcher = KeywordMatcher(dictionary_file=get_config().KEYWORD_DICT_FILE)
+    return _matcher
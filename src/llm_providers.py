@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM服务商模块
+统一OpenAI兼容、Claude、Gemini的调用接口，按延迟选择服务商，主服务商过慢时向备选服务商发送对冲请求；
+所有服务商共用按并发数配置的HTTP连接池
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterator, List, Optional, Tuple
+
+class LLMProviderError(Exception):
+    """服务商返回错误，status_code和response供限流器判断是否重试"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+def create_http_session(max_connections: int = 16, pool_block: bool = True):
+    """创建带连接池的requests会话
+
+    pool_block为True时连接用尽的请求等待空闲连接，而不是临时新建连接、用完即丢弃。
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, max_connections),
+                          pool_block=pool_block, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def create_openai_http_client(max_connections: int = 16, max_keepalive: Optional[int] = None,
+                              keepalive_expiry: float = 30.0, timeout: Tuple[float, float] = (5.0, 60.0)):
+    """创建openai客户端使用的HTTP连接池
+
+    通过openai包导出的类型构建，与其依赖的HTTP库版本保持一致（DefaultHttpxClient需要openai>=1.17.0）。
+    """
+    import openai
+
+    connect_timeout, read_timeout = timeout
+    limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=max(1, max_connections),
+        max_keepalive_connections=max_keepalive or max(1, max_connections),
+        keepalive_expiry=keepalive_expiry
+    )
+    return openai.DefaultHttpxClient(limits=limits, timeout=openai.Timeout(read_timeout, connect=connect_timeout))
+
+class HTTPPoolSettings:
+    """LLM HTTP连接池配置"""
+
+    def __init__(self, pool_config=None):
+        """从配置读取连接池参数；最大连接数为0时按LLM并发上限确定"""
+        if pool_config is None:
+            from .config import get_config
+            pool_config = get_config()
+
+        self.max_connections = pool_config.LLM_HTTP_MAX_CONNECTIONS or max(
+            pool_config.LLM_MAX_CONCURRENCY, pool_config.LLM_MAX_WORKERS)
+        self.max_keepalive = pool_config.LLM_HTTP_MAX_KEEPALIVE or self.max_connections
+        self.keepalive_expiry = pool_config.LLM_HTTP_KEEPALIVE_EXPIRY
+        self.timeout = (pool_config.LLM_CONNECT_TIMEOUT,
+                        pool_config.LLM_READ_TIMEOUT or pool_config.REQUEST_TIMEOUT)
+
+# 进程内共享的连接池（延迟创建），同一进程内所有撰写器和服务商共用
+_http_session = None
+_openai_http_client = None
+_pool_lock = threading.Lock()
+
+def get_http_session():
+    """获取共享的requests会话（Claude、Gemini等HTTP服务商使用）"""
+    global _http_session
+    if _http_session is None:
+        with _pool_lock:
+            if _http_session is None:
+                _http_session = create_http_session(HTTPPoolSettings().max_connections)
+    return _http_session
+
+def get_openai_http_client():
+    """获取共享的httpx客户端（openai客户端使用）"""
+    global _openai_http_client
+    if _openai_http_client is None:
+        with _pool_lock:
+            if _openai_http_client is None:
+                settings = HTTPPoolSettings()
+                _openai_http_client = create_openai_http_client(
+                    settings.max_connections, settings.max_keepalive,
+                    settings.keepalive_expiry, settings.timeout)
+    return _openai_http_client
+
+class LLMResult:
+    """一次调用的结果：回复文本、服务商返回的token用量（未返回时为None）和实际应答的服务商"""
+
+    def __init__(self, text: str, prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None,
+                 provider: Optional[str] = None, model: Optional[str] = None):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.provider = provider
+        self.model = model
+
+    @property
+    def total_tokens(self) -> Optional[int]:
+        """提示词与生成的token总数，服务商未返回用量时为None（限流器据此校正token桶）"""
+        if self.prompt_tokens is None and self.completion_tokens is None:
+            return None
+        return (self.prompt_tokens or 0) + (self.completion_tokens or 0)
+
+class CallTrace:
+    """一次请求的调用记录：各服务商的尝试次数之和（含限流重试、对冲和故障切换）及应答的服务商"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.provider = None
+        self.model = None
+        self._lock = threading.Lock()
+
+    def attempt(self):
+        with self._lock:
+            self.attempts += 1
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+class LLMProvider:
+    """服务商基类"""
+
+    def __init__(self, name: str, model: str, rate_limiter=None, window: int = 200):
+        """初始化服务商
+
+        window为用于计算延迟分位数的最近样本数。
+        """
+        self.name = name
+        self.model = model
+        self.rate_limiter = rate_limiter
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.last_failure = 0.0
+
+    def generate(self, prompt: str, max_tokens: int, temperature: float) -> LLMResult:
+        """生成完整回复及token用量"""
+        raise NotImplementedError
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """生成完整回复"""
+        return self.generate(prompt, max_tokens, temperature).text
+
+    def stream(self, prompt: str, max_tokens: int, temperature: float) -> Iterator[str]:
+        """流式生成回复，默认一次性返回完整内容"""
+        yield self.complete(prompt, max_tokens, temperature)
+
+    def invoke(self, prompt: str, max_tokens: int, temperature: float,
+               trace: Optional[CallTrace] = None) -> LLMResult:
+        """经限流器调用并记录延迟和失败，每次尝试（含重试）计入trace"""
+        def attempt():
+            if trace is not None:
+                trace.attempt()
+            return self.generate(prompt, max_tokens, temperature)
+
+        start = time.monotonic()
+        try:
+            if self.rate_limiter is not None:
+                result = self.rate_limiter.call(attempt, estimated_tokens=len(prompt) + max_tokens)
+            else:
+                result = attempt()
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_latency(time.monotonic() - start)
+        result.provider, result.model = self.name, self.model
+        return result
+
+    def call(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """经限流器调用并记录延迟和失败"""
+        return self.invoke(prompt, max_tokens, temperature).text
+
+    def record_latency(self, latency: float):
+        """记录一次成功调用的延迟"""
+        with self._lock:
+            self._latencies.append(latency)
+
+    def record_failure(self):
+        """记录一次失败"""
+        with self._lock:
+            self.failures += 1
+            self.last_failure = time.monotonic()
+
+    def sample_count(self) -> int:
+        """已记录的延迟样本数"""
+        with self._lock:
+            return len(self._latencies)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """最近调用延迟的分位数，没有样本时返回None"""
+        with self._lock:
+            ordered = sorted(self._latencies)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+        return ordered[index]
+
+    def get_stats(self) -> Dict:
+        """获取服务商统计信息"""
+        return {
+            'model': self.model,
+            'samples': self.sample_count(),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'failures': self.failures
+        }
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI及兼容服务（使用openai客户端）"""
+
+    def __init__(self, client, model: str, name: str = 'openai', rate_limiter=None):
+        super().__init__(name, model, rate_limiter)
+        self.client = client
+
+    def generate(self, prompt: str, max_tokens: int, temperature: float) -> LLMResult:
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        usage = getattr(response, 'usage', None)
+        return LLMResult(response.choices[0].message.content.strip(),
+                         getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None))
+
+    def stream(self, prompt: str, max_tokens: int, temperature: float) -> Iterator[str]:
+        create = self.client.chat.completions.create
+        kwargs = dict(model=self.model, messages=[{"role": "user", "content": prompt}],
+                      max_tokens=max_tokens, temperature=temperature, stream=True)
+        # 限流覆盖建立流式连接（429等错误在此阶段返回），之后的读取不占用并发槽位
+        if self.rate_limiter is not None:
+            stream = self.rate_limiter.call(create, estimated_tokens=len(prompt) + max_tokens, **kwargs)
+        else:
+            stream = create(**kwargs)
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+
+class _HTTPProvider(LLMProvider):
+    """基于requests的HTTP服务商"""
+
+    def __init__(self, name: str, model: str, api_key: str, base_url: str, timeout=60,
+                 rate_limiter=None, session=None):
+        """timeout可以是总超时秒数，也可以是(连接超时, 读取超时)；session默认使用进程内共享的连接池"""
+        super().__init__(name, model, rate_limiter)
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = session if session is not None else get_http_session()
+
+    def _post(self, url: str, payload: Dict, headers: Optional[Dict] = None, params: Optional[Dict] = None) -> Dict:
+        """发送请求，非2xx响应转换为LLMProviderError"""
+        response = self.session.post(url, json=payload, headers=headers, params=params, timeout=self.timeout)
+        if response.status_code >= 400:
+            raise LLMProviderError(f"{self.name} 返回 {response.status_code}: {response.text[:200]}",
+                                   status_code=response.status_code, response=response)
+        return response.json()
+
+class ClaudeProvider(_HTTPProvider):
+    """Anthropic Claude（Messages API）"""
+
+    def __init__(self, api_key: str, model: str, base_url: str = 'https://api.anthropic.com', **kwargs):
+        super().__init__('claude', model, api_key, base_url, **kwargs)
+
+    def generate(self, prompt: str, max_tokens: int, temperature: float) -> LLMResult:
+        data = self._post(
+            f'{self.base_url}/v1/messages',
+            {
+                'model': self.model,
+                'max_tokens': max_tokens,
+                'temperature': temperature,
+                'messages': [{'role': 'user', 'content': prompt}]
+            },
+            headers={'x-api-key': self.api_key, 'anthropic-version': '2023-06-01'}
+        )
+        usage = data.get('usage') or {}
+        text = ''.join(block.get('text', '') for block in data.get('content', [])
+                       if block.get('type') == 'text').strip()
+        return LLMResult(text, usage.get('input_tokens'), usage.get('output_tokens'))
+
+class GeminiProvider(_HTTPProvider):
+    """Google Gemini（generateContent API）"""
+
+    def __init__(self, api_key: str, model: str,
+                 base_url: str = 'https://generativelanguage.googleapis.com', **kwargs):
+        super().__init__('gemini', model, api_key, base_url, **kwargs)
+
+    def generate(self, prompt: str, max_tokens: int, temperature: float) -> LLMResult:
+        data = self._post(
+            f'{self.base_url}/v1beta/models/{self.model}:generateContent',
+            {
+                'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+                'generationConfig': {'maxOutputTokens': max_tokens, 'temperature': temperature}
+            },
+            params={'key': self.api_key}
+        )
+        candidates = data.get('candidates') or []
+        if not candidates:
+            raise LLMProviderError("gemini 未返回候选结果")
+        parts = candidates[0].get('content', {}).get('parts', [])
+        usage = data.get('usageMetadata') or {}
+        return LLMResult(''.join(part.get('text', '') for part in parts).strip(),
+                         usage.get('promptTokenCount'), usage.get('candidatesTokenCount'))
+
+class LLMRouter:
+    """按延迟选择服务商，并对慢请求发送对冲请求"""
+
+    def __init__(self, providers: List[LLMProvider], hedge_enabled: bool = True,
+                 hedge_percentile: float = 95, hedge_min_samples: int = 20, hedge_delay: float = 10.0,
+                 failure_cooldown: float = 30.0, max_workers: int = 16,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        """初始化路由器
+
+        主服务商延迟样本不少于hedge_min_samples时，等待时间为其hedge_percentile分位延迟，
+        否则使用固定的hedge_delay；超过等待时间仍未返回则向下一个服务商发送同样的请求，先返回者胜出。
+        failure_cooldown内失败过的服务商排到后面。
+        传入executor时与其他路由器共用该线程池，否则按max_workers创建自己的线程池。
+        """
+        self.providers = list(providers)
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_delay = hedge_delay
+        self.failure_cooldown = failure_cooldown
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-route')
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'failovers': 0}
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def ranked(self) -> List[LLMProvider]:
+        """按(近期是否失败, 中位延迟, 配置顺序)排序服务商；没有样本的排在有样本的之后"""
+        now = time.monotonic()
+
+        def key(item):
+            order, provider = item
+            recently_failed = provider.last_failure and now - provider.last_failure < self.failure_cooldown
+            p50 = provider.percentile(50)
+            return (bool(recently_failed), p50 is None, p50 or 0.0, order)
+
+        return [provider for _, provider in sorted(enumerate(self.providers), key=key)]
+
+    def _hedge_after(self, provider: LLMProvider) -> float:
+        """主服务商的对冲等待时间"""
+        if provider.sample_count() >= self.hedge_min_samples:
+            return provider.percentile(self.hedge_percentile)
+        return self.hedge_delay
+
+    def complete(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """生成完整回复"""
+        return self.generate(prompt, max_tokens, temperature).text
+
+    def generate(self, prompt: str, max_tokens: int, temperature: float,
+                 trace: Optional[CallTrace] = None) -> LLMResult:
+        """生成完整回复及用量：主服务商过慢时对冲，失败时依次切换到其他服务商"""
+        if not self.providers:
+            raise LLMProviderError("没有可用的AI模型")
+        self._count('requests')
+
+        candidates = self.ranked()
+        primary = candidates[0]
+        pending = {}
+        hedged = False
+        last_error = None
+
+        def launch(provider):
+            future = self.executor.submit(provider.invoke, prompt, max_tokens, temperature, trace)
+            pending[future] = provider
+
+        launch(candidates.pop(0))
+        hedge_timeout = self._hedge_after(primary)
+        if not (self.hedge_enabled and candidates):
+            hedge_timeout = None
+
+        while pending:
+            done, _ = wait(pending, timeout=hedge_timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # 主服务商超过对冲等待时间仍未返回
+                self._count('hedged')
+                hedged = True
+                launch(candidates.pop(0))
+                hedge_timeout = None
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"LLM服务商 {provider.name} 调用失败: {e}")
+                    last_error = e
+                    continue
+                if hedged and provider is not primary:
+                    self._count('hedge_wins')
+                if trace is not None:
+                    trace.provider, trace.model = provider.name, provider.model
+                # 未完成的请求在后台继续执行，其延迟仍会被记录
+                return result
+
+            if not pending and candidates:
+                self._count('failovers')
+                launch(candidates.pop(0))
+
+        raise last_error or LLMProviderError("没有可用的AI模型")
+
+    def stream(self, prompt: str, max_tokens: int, temperature: float,
+               trace: Optional[CallTrace] = None) -> Iterator[str]:
+        """流式生成回复；在输出第一段内容前失败时切换到下一个服务商"""
+        last_error = None
+        for provider in self.ranked():
+            received = False
+            if trace is not None:
+                trace.attempt()
+                trace.provider, trace.model = provider.name, provider.model
+            try:
+                for text in provider.stream(prompt, max_tokens, temperature):
+                    received = True
+                    yield text
+                return
+            except Exception as e:
+                provider.record_failure()
+                if received:
+                    raise
+                print(f"LLM服务商 {provider.name} 流式调用失败: {e}")
+                last_error = e
+                self._count('failovers')
+        raise last_error or LLMProviderError("没有可用的AI模型")
+
+    def get_stats(self) -> Dict:
+        """获取路由统计信息"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['providers'] = {provider.name: provider.get_stats() for provider in self.providers}
+        return stats
@@ -13,6 +13,11 @@ from datetime import datetime, timedelta
 from newspaper import Article
 import json
 import time
+import hashlib
+import threading
+from .singleflight import SingleFlight
+from . import text_analysis
+from .keyword_matcher import get_keyword_matcher
 
 class NewsAnalyzer:
     """新闻分析器类"""
@@ -21,9 +26,11 @@ class NewsAnalyzer:
         """初始化新闻分析器"""
         from .news_sources import get_news_sources
         from .config import get_config
+        from .cache import get_cache
 
         self.news_sources = self._convert_sources_format(get_news_sources())
         self.config = get_config()
+        self.cache = get_cache()
 
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -39,6 +46,24 @@ class NewsAnalyzer:
         self.max_retries = self.config.NEWS_FETCH_RETRY
         self.max_sources = 6  # 增加处理源数量
         self.max_age_days = self.config.NEWS_MAX_AGE_DAYS
+        self.cache_duration = self.config.NEWS_CACHE_DURATION
+
+        # 新闻缓存、去重索引和话题计数（可快照到磁盘用于热重启）
+        self._lock = threading.RLock()
+        self._news_cache = []
+        self._cache_time = 0.0
+        self._cache_limit = 0
+        self._dedupe_index = {}
+        self._topic_counter = Counter()
+        self._refreshing = False
+        self._flight = SingleFlight()
+
+        # 快照配置
+        self.snapshot_file = self.config.NEWS_SNAPSHOT_FILE
+        self.snapshot_interval = self.config.NEWS_SNAPSHOT_INTERVAL
+        self._snapshot_thread = None
+        self._snapshot_stop = threading.Event()
+        self._load_snapshot()
 
     def _convert_sources_format(self, sources):
         """转换新闻源格式以兼容现有代码"""
@@ -59,7 +84,100 @@ class NewsAnalyzer:
         return converted
 
     def get_trending_news(self, limit=20):
-        """获取热点新闻"""
+        """获取热点新闻（优先使用缓存，过期时返回旧数据并在后台刷新）"""
+        cached, cache_age, covers_limit = self._cache_state(limit)
+
+        # 本进程缓存不可用时，先看其他工作进程是否已经刷新过共享缓存
+        if not (cached and covers_limit and cache_age < self.cache_duration):
+            if self._adopt_shared_cache():
+                cached, cache_age, covers_limit = self._cache_state(limit)
+
+        if cached and covers_limit:
+            if cache_age >= self.cache_duration:
+                self._refresh_in_background(limit)
+            return [dict(news) for news in cached[:limit]]
+
+        trending_news = self._coalesced_refresh(limit)
+        return [dict(news) for news in trending_news[:limit]]
+
+    def _coalesced_refresh(self, limit):
+        """合并并发的刷新请求：同一时刻只有一个线程真正获取新闻"""
+        trending_news = self._flight.do('trending', self._refresh_news, max(limit, self._cache_limit))
+
+        # 进行中的刷新如果数量不够（领头请求的limit更小），再发起一次
+        if len(trending_news) < limit and self._cache_limit < limit:
+            trending_news = self._flight.do('trending', self._refresh_news, limit)
+        return trending_news
+
+    def _cache_state(self, limit):
+        """返回(缓存列表, 缓存年龄, 是否覆盖所需数量)"""
+        with self._lock:
+            return self._news_cache, time.time() - self._cache_time, self._cache_limit >= limit
+
+    def _adopt_shared_cache(self):
+        """采用共享缓存中比本进程更新的新闻数据"""
+        shared = self.cache.get('news:trending')
+        if not shared:
+            return False
+
+        with self._lock:
+            if shared['cache_time'] <= self._cache_time:
+                return False
+            self._news_cache = shared['news']
+            self._cache_time = shared['cache_time']
+            self._cache_limit = shared['cache_limit']
+            self._topic_counter = Counter(dict(self.cache.get('topics:trending') or []))
+        return True
+
+    def _refresh_news(self, limit):
+        """重新获取新闻并更新缓存"""
+        trending_news = self._fetch_trending_news(limit)
+
+        with self._lock:
+            self._news_cache = trending_news
+            self._cache_time = time.time()
+            self._cache_limit = limit
+            self._topic_counter = Counter(dict(self.analyze_trending_topics(trending_news)))
+            # 只保留当前缓存中仍然存在的标题，防止索引无限增长
+            titles = {news['title'] for news in trending_news}
+            self._dedupe_index = {
+                title: words for title, words in self._dedupe_index.items() if title in titles
+            }
+            shared = {
+                'news': trending_news,
+                'cache_time': self._cache_time,
+                'cache_limit': limit
+            }
+            topics = self._topic_counter.most_common(50)
+
+        # 写入共享缓存，让同机的其他工作进程直接复用
+        if trending_news:
+            self.cache.set('news:trending', shared, timeout=self.cache_duration)
+            self.cache.set('topics:trending', topics, timeout=self.cache_duration)
+
+        self._ensure_snapshot_thread()
+        return trending_news
+
+    def _refresh_in_background(self, limit):
+        """在后台线程中刷新新闻缓存"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            try:
+                self._coalesced_refresh(limit)
+            except Exception as e:
+                print(f"后台刷新新闻失败: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=refresh, name='news-refresh', daemon=True).start()
+
+    def _fetch_trending_news(self, limit):
+        """从各新闻源获取热点新闻"""
         all_news = []
         processed_sources = 0
 
@@ -89,9 +207,119 @@ class NewsAnalyzer:
 
         # 按时间排序并去重
         unique_news = self._deduplicate_news(filtered_news)
-        trending_news = sorted(unique_news, key=lambda x: x['publish_time'], reverse=True)
+        trending_news = sorted(unique_news, key=lambda x: x['publish_time'], reverse=True)[:limit]
+
+        # 入库时一次性完成文本分析，撰写文章时直接复用
+        with self._lock:
+            cached_news = {news['id']: news for news in self._news_cache}
+        for news in trending_news:
+            self._precompute_analysis(news, cached_news.get(news['id']))
+
+        return trending_news
 
-        return trending_news[:limit]
+    def _precompute_analysis(self, news, previous=None):
+        """为新闻条目预先计算分析结果（沿用缓存中同一新闻已有的结果）"""
+        if previous and text_analysis.get_precomputed_analysis(previous) is not None:
+            for key in ('summary_text', 'analysis', 'analysis_version'):
+                news[key] = previous[key]
+            return news
+
+        try:
+            text_analysis.precompute_analysis(news)
+        except Exception as e:
+            print(f"预计算新闻分析失败: {e}")
+        return news
+
+    def get_trending_topics(self, limit=10):
+        """获取缓存的热点话题计数"""
+        with self._lock:
+            return self._topic_counter.most_common(limit)
+
+    def save_snapshot(self):
+        """将新闻缓存、去重索引和话题计数写入快照文件"""
+        from .snapshot import write_snapshot
+
+        if not self.snapshot_file:
+            return None
+
+        with self._lock:
+            if not self._news_cache:
+                return None
+            news = []
+            for item in self._news_cache:
+                item = dict(item)
+                if isinstance(item.get('publish_time'), datetime):
+                    item['publish_time'] = item['publish_time'].isoformat()
+                news.append(item)
+            data = {
+                'version': 1,
+                'saved_at': time.time(),
+                'cache_time': self._cache_time,
+                'cache_limit': self._cache_limit,
+                'news': news,
+                'dedupe_index': {title: list(words) for title, words in self._dedupe_index.items()},
+                'topics': dict(self._topic_counter)
+            }
+
+        try:
+            return write_snapshot(self.snapshot_file, data)
+        except Exception as e:
+            print(f"保存新闻快照失败: {e}")
+            return None
+
+    def _load_snapshot(self):
+        """启动时从快照文件恢复新闻缓存"""
+        from .snapshot import read_snapshot
+
+        data = read_snapshot(self.snapshot_file)
+        if not data or data.get('version') != 1:
+            return False
+
+        news_list = []
+        for item in data.get('news', []):
+            try:
+                item['publish_time'] = datetime.fromisoformat(item['publish_time'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            news_list.append(item)
+
+        with self._lock:
+            self._news_cache = news_list
+            self._cache_time = float(data.get('cache_time', 0.0))
+            self._cache_limit = int(data.get('cache_limit', len(news_list)))
+            self._dedupe_index = {
+                title: frozenset(words) for title, words in data.get('dedupe_index', {}).items()
+            }
+            self._topic_counter = Counter(data.get('topics', {}))
+
+        print(f"✅ 已从快照恢复 {len(news_list)} 条新闻")
+        return True
+
+    def _ensure_snapshot_thread(self):
+        """启动定期快照线程"""
+        if self.snapshot_interval <= 0 or not self.snapshot_file:
+            return
+
+        with self._lock:
+            if self._snapshot_thread and self._snapshot_thread.is_alive():
+                return
+
+            def snapshot_loop():
+                while not self._snapshot_stop.wait(self.snapshot_interval):
+                    self.save_snapshot()
+
+            self._snapshot_thread = threading.Thread(
+                target=snapshot_loop, name='news-snapshot', daemon=True
+            )
+            self._snapshot_thread.start()
+
+        # 首次获取后立即写一次，保证重启时有可用快照
+        self.save_snapshot()
+
+    def stop_snapshots(self):
+        """停止定期快照并写入最后一次快照"""
+        self._snapshot_stop.set()
+        self.save_snapshot()
 
     def _extract_content(self, url, fallback_content):
         """提取文章内容"""
@@ -176,7 +404,7 @@ class NewsAnalyzer:
                         publish_time = datetime.now()
 
                     news_item = {
-                        'id': abs(hash(entry.title + entry.link)),
+                        'id': self._stable_news_id(entry.title, entry.link),
                         'title': entry.title.strip(),
                         'link': entry.link,
                         'summary': getattr(entry, 'summary', '').strip(),
@@ -200,6 +428,13 @@ class NewsAnalyzer:
             print(f"解析RSS源 {source_name} 失败: {e}")
             return []
     
+    @staticmethod
+    def _stable_news_id(title, link):
+        """生成跨进程稳定的新闻ID（内置hash每个进程随机，重启后会变化）"""
+        digest = hashlib.md5(f"{title}{link}".encode('utf-8')).hexdigest()
+        # 取52位以内，保证前端JavaScript数字精度不丢失
+        return int(digest[:13], 16)
+
     def _parse_api_feed(self, api_url, source_name):
         """解析API源（示例实现）"""
         # 这里是示例实现，实际需要根据具体API调整
@@ -245,11 +480,13 @@ class NewsAnalyzer:
 
         for news in news_list:
             # 简单的标题相似度去重
-            title_words = set(jieba.cut(news['title']))
+            title_words = self._title_words(news['title'])
             is_duplicate = False
 
             for seen_title in seen_titles:
-                seen_words = set(jieba.cut(seen_title))
+                seen_words = self._title_words(seen_title)
+                if not (title_words | seen_words):
+                    continue
                 similarity = len(title_words & seen_words) / len(title_words | seen_words)
                 if similarity > 0.7:  # 相似度阈值
                     is_duplicate = True
@@ -260,6 +497,16 @@ class NewsAnalyzer:
                 unique_news.append(news)
 
         return unique_news
+
+    def _title_words(self, title):
+        """获取标题分词结果（缓存在去重索引中，索引只在锁内读写，快照线程会遍历它）"""
+        with self._lock:
+            words = self._dedupe_index.get(title)
+        if words is None:
+            words = frozenset(jieba.cut(title))
+            with self._lock:
+                self._dedupe_index[title] = words
+        return words
     
     def analyze_trending_topics(self, news_list):
         """分析热点话题"""
@@ -279,12 +526,16 @@ class NewsAnalyzer:
     
     def get_news_sentiment(self, news_content):
         """分析新闻情感倾向（简单实现）"""
-        positive_words = ['好', '优秀', '成功', '增长', '提升', '改善', '突破']
-        negative_words = ['坏', '失败', '下降', '问题', '危机', '困难', '风险']
-        
-        words = jieba.cut(news_content)
-        positive_count = sum(1 for word in words if word in positive_words)
-        negative_count = sum(1 for word in words if word in negative_words)
+        # 与文章撰写共用情感词典；按分词结果整词匹配，避免"好"命中"好像"之类的子串
+        matcher = get_keyword_matcher()
+        positive_words = matcher.terms('positive')
+        negative_words = matcher.terms('negative')
+        positive_count = negative_count = 0
+        for word in jieba.cut(news_content):
+            if word in positive_words:
+                positive_count += 1
+            elif word in negative_words:
+                negative_count += 1
         
         if positive_count > negative_count:
             return 'positive'
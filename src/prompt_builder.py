@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词构建模块
+按模型计算token数（有tiktoken时精确计算，否则按字符估算），用TextRank抽取关键句把原文压缩到token预算内
+"""
+
+import re
+import math
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# 句子切分：保留句末标点
+_SENTENCE_RE = re.compile(r'[^。！？!?；;\n]+[。！？!?；;]*')
+# 中日韩字符按一个token估算，其余连续字母数字约4个字符一个token
+_CJK_RE = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+_WORD_RE = re.compile(r'[A-Za-z0-9_]+')
+_OTHER_RE = re.compile(r'[^\sA-Za-z0-9_\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+@lru_cache(maxsize=16)
+def _get_encoding(model: str):
+    """获取模型对应的tiktoken编码，tiktoken不可用时返回None"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+def estimate_tokens(text: str) -> int:
+    """不依赖分词器的token数估算"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    words = sum(math.ceil(len(word) / 4) for word in _WORD_RE.findall(text))
+    others = len(_OTHER_RE.findall(text))
+    return cjk + words + others
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """计算文本在指定模型下的token数"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model) if model else None
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text))
+
+def split_sentences(text: str) -> List[str]:
+    """切分句子，去掉空白句"""
+    return [sentence.strip() for sentence in _SENTENCE_RE.findall(text or '') if sentence.strip()]
+
+def _sentence_words(sentence: str) -> set:
+    """句子的词集合（去掉单字和标点）"""
+    import jieba
+    return {word for word in jieba.cut(sentence) if len(word.strip()) > 1}
+
+def textrank(sentences: List[str], damping: float = 0.85, iterations: int = 30,
+             tolerance: float = 1e-4) -> List[float]:
+    """TextRank句子得分：以词重叠度为边权的PageRank"""
+    count = len(sentences)
+    if count <= 2:
+        return [1.0] * count
+
+    words = [_sentence_words(sentence) for sentence in sentences]
+    weights = [[0.0] * count for _ in range(count)]
+    for i in range(count):
+        for j in range(i + 1, count):
+            common = len(words[i] & words[j])
+            if not common or len(words[i]) < 2 or len(words[j]) < 2:
+                continue
+            similarity = common / (math.log(len(words[i])) + math.log(len(words[j])))
+            weights[i][j] = weights[j][i] = similarity
+
+    totals = [sum(row) for row in weights]
+    scores = [1.0] * count
+    for _ in range(iterations):
+        updated = [
+            (1 - damping) + damping * sum(weights[j][i] / totals[j] * scores[j]
+                                          for j in range(count) if weights[j][i])
+            for i in range(count)
+        ]
+        delta = max(abs(a - b) for a, b in zip(updated, scores))
+        scores = updated
+        if delta < tolerance:
+            break
+    return scores
+
+class PromptBuilder:
+    """按token预算组织提示词中的新闻素材，并统计提示词token数"""
+
+    def __init__(self, model: Optional[str] = None, source_budget: int = 600, list_budget: int = 150,
+                 max_sentences: int = 200, cache_size: int = 256):
+        """初始化提示词构建器
+
+        source_budget为原文压缩后的token上限；list_budget为关键点、实体等列表各自的token上限；
+        max_sentences为参与TextRank的最多句子数（超出部分按原文顺序截断）。
+        """
+        self.model = model
+        self.source_budget = source_budget
+        self.list_budget = list_budget
+        self.max_sentences = max_sentences
+        self.cache_size = cache_size
+        self._compressed = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def count(self, text: str) -> int:
+        """计算token数"""
+        return count_tokens(text, self.model)
+
+    def compress(self, text: str, budget: Optional[int] = None) -> str:
+        """把文本压缩到budget个token以内：选取TextRank得分最高的句子，按原文顺序拼接"""
+        budget = self.source_budget if budget is None else budget
+        text = (text or '').strip()
+        if not text or self.count(text) <= budget:
+            return text
+
+        key = (text, budget)
+        with self._lock:
+            if key in self._compressed:
+                self._compressed.move_to_end(key)
+                return self._compressed[key]
+
+        # 去掉重复句，转载拼接的原文里常有整句重复
+        sentences = list(OrderedDict.fromkeys(split_sentences(text)))[:self.max_sentences]
+        costs = [self.count(sentence) for sentence in sentences]
+        scores = textrank(sentences)
+
+        chosen, used = set(), 0
+        for index in sorted(range(len(sentences)), key=lambda i: (-scores[i], i)):
+            if used + costs[index] <= budget:
+                chosen.add(index)
+                used += costs[index]
+        if not chosen:
+            # 单句就超出预算时保留得分最高的句子的前半部分
+            best = max(range(len(sentences)), key=lambda i: scores[i])
+            result = self._truncate(sentences[best], budget)
+        else:
+            result = ''.join(sentences[i] for i in sorted(chosen))
+
+        with self._lock:
+            self._compressed[key] = result
+            while len(self._compressed) > self.cache_size:
+                self._compressed.popitem(last=False)
+        return result
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """按token预算截断单段文本"""
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count(text[:middle]) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low]
+
+    def fit_list(self, items: List[str], budget: Optional[int] = None, separator: str = ', ') -> str:
+        """按顺序拼接列表项，直到达到token预算"""
+        budget = self.list_budget if budget is None else budget
+        kept, used = [], 0
+        for item in items:
+            cost = self.count(item) + (self.count(separator) if kept else 0)
+            if used + cost > budget:
+                break
+            kept.append(item)
+            used += cost
+        return separator.join(kept)
+
+    def record(self, kind: str, prompt: str) -> int:
+        """记录一次提示词的token数，返回该数值"""
+        tokens = self.count(prompt)
+        with self._lock:
+            stats = self.stats.setdefault(kind, {'prompts': 0, 'tokens': 0, 'max_tokens': 0})
+            stats['prompts'] += 1
+            stats['tokens'] += tokens
+            stats['max_tokens'] = max(stats['max_tokens'], tokens)
+        return tokens
+
+    def get_stats(self) -> Dict:
+        """按提示词类型汇总的token统计"""
+        with self._lock:
+            return {
+                kind: dict(stats, avg_tokens=round(stats['tokens'] / stats['prompts'], 1))
+                for kind, stats in self.stats.items()
+            }
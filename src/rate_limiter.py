@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM调用限流模块
+令牌桶限制每分钟请求数和token数，AIMD根据延迟和429动态调整并发数，失败时按Retry-After或抖动退避重试
+"""
+
+import os
+import time
+import random
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+class TokenBucket:
+    """进程内令牌桶"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """初始化令牌桶
+
+        rate_per_minute为每分钟补充的令牌数；capacity为桶容量（允许的突发量），默认等于一分钟的配额。
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, amount: float) -> float:
+        """尝试取出令牌，返回还需等待的秒数（0表示已取出）"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """阻塞直到取出指定数量的令牌，返回等待时间"""
+        amount = min(amount, self.capacity)
+        start = time.monotonic()
+        while True:
+            wait = self._take(amount)
+            if wait <= 0:
+                return time.monotonic() - start
+            time.sleep(min(wait, 1.0))
+
+    def consume(self, amount: float):
+        """事后扣除（或退还）令牌，用于按实际用量校正预估值，允许透支"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+class SQLiteTokenBucket(TokenBucket):
+    """同机多进程共享的令牌桶，状态保存在SQLite文件中"""
+
+    def __init__(self, path: str, name: str, rate_per_minute: float, capacity: Optional[float] = None):
+        """初始化共享令牌桶"""
+        super().__init__(rate_per_minute, capacity)
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+        Path(os.path.dirname(os.path.abspath(path))).mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL, updated_at REAL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+            (name, self.capacity, time.time())
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _take(self, amount: float) -> float:
+        """在一个写事务中补充并取出令牌（多进程之间使用墙钟时间）"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated_at = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            now = time.time()
+            tokens = min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+            wait = 0.0
+            if tokens >= amount:
+                tokens -= amount
+            else:
+                wait = (amount - tokens) / self.rate
+            conn.execute("UPDATE buckets SET tokens = ?, updated_at = ? WHERE name = ?",
+                         (tokens, now, self.name))
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def consume(self, amount: float):
+        """事后扣除（或退还）令牌"""
+        conn = self._connect()
+        conn.execute("UPDATE buckets SET tokens = MIN(?, tokens - ?) WHERE name = ?",
+                     (self.capacity, amount, self.name))
+
+class AIMDLimiter:
+    """AIMD自适应并发限制：正常时每轮加1，出现429或延迟超标时减半"""
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32,
+                 latency_target: float = 0.0, backoff: float = 0.5, cooldown: float = 1.0):
+        """初始化并发限制
+
+        latency_target为0时只根据429调整；cooldown内最多减半一次，避免同一批失败把并发压到最低。
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """等待空闲的并发槽位"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False):
+        """释放槽位，并根据本次调用结果调整并发上限"""
+        with self._cond:
+            self.in_flight -= 1
+            overloaded = throttled or (
+                self.latency_target and latency is not None and latency > self.latency_target)
+            if overloaded:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self._last_decrease = now
+            elif latency is not None:
+                # 每完成约limit次调用（一轮）上限加1
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """从错误响应头中读取Retry-After（秒）"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000.0
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def _is_retryable(error: Exception) -> bool:
+    """判断错误是否值得重试：限流、服务端错误、超时和连接错误"""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError)) or \
+        type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+class LLMRateLimiter:
+    """LLM调用限流器：请求数/token数令牌桶 + AIMD并发 + 抖动退避重试"""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 max_concurrency: int = 16, min_concurrency: int = 1, latency_target: float = 0.0,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 shared_file: Optional[str] = None, name: Optional[str] = None):
+        """初始化限流器
+
+        requests_per_minute/tokens_per_minute为0表示不限制；设置shared_file时令牌桶在同机多进程间共享，
+        name用于区分同一文件中不同服务商的令牌桶。
+        """
+        prefix = f'{name}.' if name else ''
+        self.request_bucket = self._make_bucket(f'{prefix}requests', requests_per_minute, shared_file)
+        self.token_bucket = self._make_bucket(f'{prefix}tokens', tokens_per_minute, shared_file)
+        self.concurrency = AIMDLimiter(max_concurrency, min_concurrency, max_concurrency, latency_target)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._stats_lock = threading.Lock()
+        self.stats = {'calls': 0, 'retries': 0, 'throttled': 0, 'failures': 0, 'wait_time': 0.0}
+
+    @staticmethod
+    def _make_bucket(name: str, rate: float, shared_file: Optional[str]):
+        """创建令牌桶，rate为0时返回None"""
+        if not rate:
+            return None
+        if shared_file:
+            return SQLiteTokenBucket(shared_file, name, rate)
+        return TokenBucket(rate)
+
+    def _count(self, key: str, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """计算重试等待时间：优先使用Retry-After，否则使用全抖动指数退避"""
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, func: Callable[..., Any], *args, estimated_tokens: int = 0, **kwargs) -> Any:
+        """在限流下调用func，可重试的错误按退避策略重试
+
+        estimated_tokens为本次调用预估消耗的token数（提示词 + 最大生成长度），
+        返回值带有total_tokens（LLMResult）或usage.total_tokens（openai响应）时按实际用量校正token桶。
+        """
+        attempt = 0
+        while True:
+            wait = 0.0
+            if self.request_bucket:
+                wait += self.request_bucket.acquire(1)
+            if self.token_bucket and estimated_tokens:
+                wait += self.token_bucket.acquire(estimated_tokens)
+            if wait:
+                self._count('wait_time', wait)
+
+            self.concurrency.acquire()
+            start = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                throttled = getattr(e, 'status_code', None) == 429
+                self.concurrency.release(time.monotonic() - start, throttled=throttled)
+                if throttled:
+                    self._count('throttled')
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    self._count('failures')
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                self._count('retries')
+                time.sleep(delay)
+                continue
+
+            self.concurrency.release(time.monotonic() - start)
+            self._count('calls')
+
+            total_tokens = getattr(result, 'total_tokens', None)
+            if total_tokens is None:
+                total_tokens = getattr(getattr(result, 'usage', None), 'total_tokens', None)
+            if self.token_bucket and estimated_tokens and isinstance(total_tokens, int):
+                self.token_bucket.consume(total_tokens - min(estimated_tokens, self.token_bucket.capacity))
+            return result
+
+    def get_stats(self) -> Dict:
+        """获取限流统计信息"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['concurrency_limit'] = round(self.concurrency.limit, 2)
+        stats['in_flight'] = self.concurrency.in_flight
+        return stats
+
+def create_rate_limiter(limiter_config=None, name: Optional[str] = None) -> LLMRateLimiter:
+    """根据配置创建限流器，name为服务商名称（各服务商配额独立，令牌桶互不共用）"""
+    if limiter_config is None:
+        from .config import get_config
+        limiter_config = get_config()
+
+    shared_file = limiter_config.LLM_RATE_LIMIT_FILE if limiter_config.LLM_RATE_LIMIT_SCOPE == 'host' else None
+    return LLMRateLimiter(
+        requests_per_minute=limiter_config.LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute=limiter_config.LLM_TOKENS_PER_MINUTE,
+        max_concurrency=limiter_config.LLM_MAX_CONCURRENCY,
+        min_concurrency=limiter_config.LLM_MIN_CONCURRENCY,
+        latency_target=limiter_config.LLM_LATENCY_TARGET,
+        max_retries=limiter_config.LLM_MAX_RETRIES,
+        shared_file=shared_file,
+        name=name
+    )
+
+# 各服务商的限流器实例（延迟创建），同一进程内所有撰写器和任务共用
+_limiters = {}
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter(provider: str = 'openai') -> LLMRateLimiter:
+    """获取服务商的限流器实例"""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        with _limiter_lock:
+            limiter = _limiters.get(provider)
+            if limiter is None:
+                # OpenAI沿用不带前缀的令牌桶名称，已有的共享限流文件继续有效
+                limiter = create_rate_limiter(name=None if provider == 'openai' else provider)
+                _limiters[provider] = limiter
+    return limiter
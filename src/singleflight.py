@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并模块
+相同键的并发调用只执行一次，其余调用方等待并共享同一结果
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+class _Call:
+    """一次进行中的调用"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """单飞（single-flight）请求合并器"""
+
+    def __init__(self):
+        """初始化合并器"""
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {'executed': 0, 'shared': 0}
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """执行func；若相同key已有调用在进行中，则等待并返回其结果
+
+        领头调用抛出的异常会同样抛给所有等待者。
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats['shared'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.stats['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self, key: Hashable) -> bool:
+        """检查指定key是否有调用在进行中"""
+        with self._lock:
+            return key in self._calls
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+状态快照模块
+负责将运行时状态以紧凑的二进制格式原子地写入磁盘并读回
+"""
+
+import os
+import json
+import zlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# 文件头魔数，用于区分编码格式
+MAGIC_MSGPACK = b'AWS1M'
+MAGIC_ZJSON = b'AWS1Z'
+
+def encode_snapshot(data: Dict) -> bytes:
+    """将快照数据编码为二进制（优先msgpack，否则使用压缩JSON）"""
+    if MSGPACK_AVAILABLE:
+        return MAGIC_MSGPACK + msgpack.packb(data, use_bin_type=True)
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return MAGIC_ZJSON + zlib.compress(payload, 6)
+
+def decode_snapshot(blob: bytes) -> Dict:
+    """解码二进制快照数据"""
+    header, body = blob[:len(MAGIC_MSGPACK)], blob[len(MAGIC_MSGPACK):]
+    if header == MAGIC_MSGPACK:
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("快照使用msgpack编码，但msgpack未安装")
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    if header == MAGIC_ZJSON:
+        return json.loads(zlib.decompress(body).decode('utf-8'))
+    raise ValueError("无法识别的快照格式")
+
+def write_snapshot(path: str, data: Dict) -> int:
+    """原子写入快照文件，返回写入的字节数"""
+    blob = encode_snapshot(data)
+    directory = os.path.dirname(os.path.abspath(path))
+    Path(directory).mkdir(parents=True, exist_ok=True)
+
+    # 先写临时文件再重命名，保证读者永远看不到写了一半的文件
+    fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return len(blob)
+
+def read_snapshot(path: str) -> Optional[Dict]:
+    """读取快照文件，文件不存在或损坏时返回None"""
+    if not path or not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'rb') as f:
+            return decode_snapshot(f.read())
+    except Exception as e:
+        print(f"读取快照失败: {e}")
+        return None
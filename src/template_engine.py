@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量模板渲染引擎
+把每种文章类型的章节结构预编译为渲染计划，用进程池分块并行渲染大批新闻，按输入顺序流式输出结果
+"""
+
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .article_templates import ArticleTemplateManager, template_manager
+
+def compile_plan(article_type: str, manager: Optional[ArticleTemplateManager] = None) -> Tuple:
+    """把文章类型的章节结构编译为(章节标题前缀, 生成方法)元组，渲染时不再逐章查表"""
+    manager = manager or template_manager
+    plan = []
+    for section_info in manager.get_template(article_type)['structure']:
+        section = section_info['section']
+        generator = getattr(manager, manager.SECTION_GENERATORS.get(section, '_generate_default_content'))
+        plan.append((f"## {section}\n\n", generator))
+    return tuple(plan)
+
+class TemplateEngine:
+    """按预编译计划渲染模板文章，输出与generate_structure_content一致"""
+
+    def __init__(self, manager: Optional[ArticleTemplateManager] = None):
+        """初始化渲染引擎，为所有文章类型预编译渲染计划"""
+        self.manager = manager or template_manager
+        self.plans = {article_type: compile_plan(article_type, self.manager)
+                      for article_type in self.manager.get_available_types()}
+
+    def _plan(self, article_type: str) -> Tuple:
+        plan = self.plans.get(article_type)
+        if plan is None:
+            # 未知类型与get_template一样回退到突发新闻
+            plan = self.plans['breaking_news']
+        return plan
+
+    def render_content(self, article_type: str, news_data: Dict, analysis: Dict) -> str:
+        """渲染文章正文"""
+        parts = []
+        for heading, generator in self._plan(article_type):
+            content = generator(news_data, analysis, article_type)
+            if content:
+                parts.append(f"{heading}{content}\n")
+        return '\n'.join(parts)
+
+    def render_title(self, article_type: str, analysis: Dict) -> str:
+        """渲染文章标题（主题和关键点的取法与ArticleWriter的模板标题一致）"""
+        entities = analysis.get('entities') or []
+        key_points = analysis.get('key_points') or []
+        topic = entities[0] if entities else '重要事件'
+        key_point = key_points[0] if key_points else '最新进展'
+        return self.manager.generate_title(article_type, topic, key_point=key_point)
+
+    def render(self, news_data: Dict, analysis: Optional[Dict] = None,
+               article_type: str = 'breaking_news') -> Dict:
+        """渲染一篇模板文章；未提供analysis时现场分析"""
+        if analysis is None:
+            from . import text_analysis
+            analysis = text_analysis.analyze_news(news_data)
+        return {
+            'news_id': news_data.get('id'),
+            'article_type': article_type,
+            'title': self.render_title(article_type, analysis),
+            'content': self.render_content(article_type, news_data, analysis)
+        }
+
+    def render_chunk(self, chunk: List[Tuple]) -> List[Dict]:
+        """渲染一组(news_data, analysis, article_type)，单条失败只影响该条"""
+        results = []
+        for news_data, analysis, article_type in chunk:
+            try:
+                results.append(self.render(news_data, analysis, article_type))
+            except Exception as e:
+                results.append({'news_id': news_data.get('id'), 'article_type': article_type, 'error': str(e)})
+        return results
+
+# 工作进程内的渲染引擎，由进程池初始化函数创建
+_worker_engine = None
+
+def _init_worker():
+    global _worker_engine
+    _worker_engine = TemplateEngine()
+
+def _render_chunk_in_worker(chunk: List[Tuple]) -> List[Dict]:
+    return _worker_engine.render_chunk(chunk)
+
+def _normalize(items: Iterable, article_type: str) -> Iterator[Tuple]:
+    """把输入统一为(news_data, analysis, article_type)，支持新闻字典或(新闻, 分析[, 类型])元组"""
+    for item in items:
+        if isinstance(item, dict):
+            yield item, None, article_type
+        elif len(item) == 2:
+            yield item[0], item[1], article_type
+        else:
+            yield item[0], item[1], item[2] or article_type
+
+def _chunks(items: Iterator, size: int) -> Iterator[List]:
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+def render_many(items: Iterable, article_type: str = 'breaking_news', processes: Optional[int] = None,
+                chunk_size: int = 200, max_pending: Optional[int] = None) -> Iterator[Dict]:
+    """批量渲染模板文章，按输入顺序逐篇产出
+
+    processes为工作进程数（None为CPU核数，0或1在当前进程渲染）；输入按chunk_size分块提交，
+    同时在途的块数不超过max_pending（默认进程数的2倍），因此可以流式处理任意长的输入。
+    """
+    chunks = _chunks(_normalize(items, article_type), max(1, chunk_size))
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes <= 1:
+        engine = TemplateEngine()
+        for chunk in chunks:
+            yield from engine.render_chunk(chunk)
+        return
+
+    max_pending = max_pending or processes * 2
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_render_chunk_in_worker, chunk))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def write_jsonl(results: Iterable[Dict], stream) -> int:
+    """把渲染结果逐行写成JSON Lines，返回写入条数"""
+    count = 0
+    for result in results:
+        stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口：从JSON Lines读取新闻，渲染结果以JSON Lines写到标准输出"""
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description='批量渲染模板文章')
+    parser.add_argument('input', nargs='?', default='-', help='新闻JSON Lines文件，默认读取标准输入')
+    parser.add_argument('--type', default='breaking_news', help='文章类型')
+    parser.add_argument('--processes', type=int, default=None, help='工作进程数，默认CPU核数')
+    parser.add_argument('--chunk-size', type=int, default=200, help='每个任务块的新闻数')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    try:
+        news_items = (json.loads(line) for line in source if line.strip())
+        results = render_many(news_items, article_type=args.type, processes=args.processes,
+                              chunk_size=args.chunk_size)
+        count = write_jsonl(results, sys.stdout)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    print(f"✅ 已渲染 {count} 篇模板文章", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+新闻文本分析模块
+提供关键点、实体、情感、分类等分析功能，供新闻入库和文章撰写共用
+"""
+
+import re
+import html
+from datetime import datetime
+from typing import Dict, List
+from .keyword_matcher import get_keyword_matcher
+
+# 分析结果版本号，算法变化时递增，使旧的预计算结果失效
+ANALYSIS_VERSION = 2
+
+_SCRIPT_STYLE_RE = re.compile(r'<(script|style)[^>]*>.*?</\1>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+# 句子切分
+_SENTENCE_SPLIT_RE = re.compile(r'[。！？]')
+
+# 关键点模式：包含数字或重要词汇的句子（所有模式合并为一个正则）
+_KEY_POINT_RE = re.compile(r'\d+[%万亿年月]|宣布|发布|启动|完成|增长|下降')
+
+# 实体词性：人名、地名、机构名
+ENTITY_FLAGS = frozenset(['nr', 'ns', 'nt'])
+
+def strip_html(text: str) -> str:
+    """去除HTML标签和实体，返回纯文本"""
+    if not text or '<' not in text and '&' not in text:
+        return (text or '').strip()
+    text = _SCRIPT_STYLE_RE.sub(' ', text)
+    text = _TAG_RE.sub(' ', text)
+    text = html.unescape(text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+def extract_key_points(content: str) -> List[str]:
+    """提取关键点"""
+    # 简单实现：提取包含数字或重要词汇的句子
+    key_points = []
+    for sentence in _SENTENCE_SPLIT_RE.split(content):
+        if _KEY_POINT_RE.search(sentence):
+            key_points.append(sentence.strip())
+            if len(key_points) >= 5:
+                break
+    return key_points
+
+def _scan_tokens(content: str):
+    """分词和词性标注一次，同时收集实体和正负面情感词数量"""
+    import jieba.posseg as pseg
+
+    # 情感词来自共享词典，分词结果直接按集合查找，无需再扫描一遍文本
+    matcher = get_keyword_matcher()
+    positive_words = matcher.terms('positive')
+    negative_words = matcher.terms('negative')
+
+    entities = {}
+    positive_count = negative_count = 0
+    for word, flag in pseg.cut(content):
+        if flag in ENTITY_FLAGS and len(word) > 1:
+            entities.setdefault(word, None)
+        if word in positive_words:
+            positive_count += 1
+        elif word in negative_words:
+            negative_count += 1
+
+    return list(entities)[:10], positive_count, negative_count
+
+def _sentiment_label(positive_count: int, negative_count: int) -> str:
+    """根据正负面词数量给出情感倾向"""
+    if positive_count > negative_count:
+        return 'positive'
+    elif negative_count > positive_count:
+        return 'negative'
+    else:
+        return 'neutral'
+
+def extract_entities(content: str) -> List[str]:
+    """提取实体（简单实现）"""
+    # 这里可以使用更复杂的NER模型
+    return _scan_tokens(content)[0]
+
+def analyze_sentiment(content: str) -> str:
+    """分析情感"""
+    _, positive_count, negative_count = _scan_tokens(content)
+    return _sentiment_label(positive_count, negative_count)
+
+def categorize_news(title: str) -> str:
+    """新闻分类"""
+    return get_keyword_matcher().categorize(title, default='综合')
+
+def assess_urgency(news_data: Dict) -> str:
+    """评估紧急程度（与当前时间相关，不应预先计算）"""
+    if 'urgent' in get_keyword_matcher().scan(news_data['title']):
+        return 'high'
+    elif (datetime.now() - news_data['publish_time']).total_seconds() < 3600:  # 1小时内
+        return 'medium'
+    else:
+        return 'low'
+
+def analyze_text(content: str, title: str = '') -> Dict:
+    """单遍分析流水线：一次切句、一次分词和词性标注，同时得到关键点、实体、情感和分类"""
+    entities, positive_count, negative_count = _scan_tokens(content)
+    return {
+        'key_points': extract_key_points(content),
+        'entities': entities,
+        'sentiment': _sentiment_label(positive_count, negative_count),
+        'category': categorize_news(title)
+    }
+
+def analysis_version() -> str:
+    """分析结果的有效版本：算法版本号加关键词词典指纹，词典热加载后旧结果同样失效"""
+    return f"{ANALYSIS_VERSION}-{get_keyword_matcher().fingerprint}"
+
+def analyze_news(news_data: Dict) -> Dict:
+    """分析新闻内容（不含紧急程度），结果可随新闻条目一起存储复用"""
+    content = strip_html(news_data.get('content') or news_data.get('summary') or '')
+    return analyze_text(content, news_data['title'])
+
+def precompute_analysis(news_data: Dict) -> Dict:
+    """在新闻入库时预先计算分析结果和纯文本摘要，直接写入新闻条目"""
+    news_data['summary_text'] = strip_html(news_data.get('summary', ''))
+    news_data['analysis'] = analyze_news(news_data)
+    news_data['analysis_version'] = analysis_version()
+    return news_data
+
+def summary_text(news_data: Dict) -> str:
+    """新闻摘要的纯文本，优先使用入库时预计算的结果"""
+    if news_data.get('summary_text') is not None:
+        return news_data['summary_text']
+    return strip_html(news_data.get('summary') or '')
+
+def get_precomputed_analysis(news_data: Dict):
+    """获取新闻条目上仍然有效的预计算分析结果，没有时返回None"""
+    if news_data.get('analysis_version') != analysis_version():
+        return None
+    return news_data.get('analysis')
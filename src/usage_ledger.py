@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM用量账本模块
+记录每次LLM调用的模型、token用量、延迟、重试次数、缓存命中和结果，批量追加写入数据库，并按天/文章类型等维度汇总
+"""
+
+import math
+import atexit
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """最近秩法分位数，没有样本时返回None"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+# 汇总维度：(结果字段, 分组列, 分组值为空时使用的名称)
+DIMENSIONS = (
+    ('by_day', 'day', 'unknown'),
+    ('by_article_type', 'article_type', 'other'),
+    ('by_kind', 'kind', 'other'),
+    ('by_model', 'model', 'unknown')
+)
+
+def _group_stats(counts: Dict, latencies: List[int]) -> Dict:
+    """一组调用的汇总：计数和求和来自数据库，延迟分位数只统计真正请求了服务商的成功调用"""
+    calls = counts.get('calls', 0)
+    cache_hits = counts.get('cache_hits', 0)
+    return {
+        'calls': calls,
+        'errors': counts.get('errors', 0),
+        'cache_hits': cache_hits,
+        'cache_hit_rate': round(cache_hits / calls, 3) if calls else 0.0,
+        'retries': counts.get('retries', 0),
+        'prompt_tokens': counts.get('prompt_tokens', 0),
+        'completion_tokens': counts.get('completion_tokens', 0),
+        'latency_p50_ms': percentile(latencies, 50),
+        'latency_p95_ms': percentile(latencies, 95)
+    }
+
+def summarize(db_manager, since: Optional[datetime] = None) -> Dict:
+    """按天、文章类型、提示词类型和模型汇总调用记录
+
+    计数和token求和由数据库GROUP BY完成，只有延迟分位数在Python中计算。
+    """
+    latencies = db_manager.get_llm_latencies(since)
+    totals = db_manager.get_llm_usage(since)
+    summary = {'totals': _group_stats(totals[0] if totals else {},
+                                      [call['latency_ms'] for call in latencies])}
+    for field, group_by, default in DIMENSIONS:
+        grouped_latencies = {}
+        for call in latencies:
+            grouped_latencies.setdefault(call[group_by] or default, []).append(call['latency_ms'])
+        groups = {}
+        for row in db_manager.get_llm_usage(since, group_by=group_by):
+            name = row['name'] or default
+            if name in groups:
+                # 空值和默认名称归为同一组
+                row = {key: groups[name][key] + row[key] for key in row if key != 'name'}
+            groups[name] = row
+        summary[field] = {name: _group_stats(counts, grouped_latencies.get(name, []))
+                          for name, counts in sorted(groups.items())}
+    return summary
+
+class UsageLedger:
+    """LLM调用账本：内存缓冲，由后台线程每flush_interval秒或缓冲达到batch_size条时批量写入数据库"""
+
+    def __init__(self, db_manager=None, batch_size: int = 50, flush_interval: float = 5.0, enabled: bool = True):
+        """初始化账本，db_manager默认使用全局数据库管理器"""
+        if db_manager is None:
+            from .database import get_database_manager
+            db_manager = get_database_manager()
+        self.db_manager = db_manager
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.enabled = enabled and db_manager.available
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._stopped = False
+        self._thread = None
+        if self.enabled:
+            atexit.register(self.close)
+
+    def record(self, kind: str, model: Optional[str], prompt_tokens: int = 0, completion_tokens: int = 0,
+               latency: float = 0.0, retries: int = 0, cache_hit: bool = False, outcome: str = 'ok',
+               article_type: Optional[str] = None, provider: Optional[str] = None,
+               tokens_estimated: bool = False):
+        """追加一条调用记录，latency单位为秒；写入数据库由后台线程完成，不阻塞调用方"""
+        if not self.enabled:
+            return
+        call = {
+            'created_at': datetime.utcnow(),
+            'kind': kind,
+            'article_type': article_type,
+            'provider': provider,
+            'model': model,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'tokens_estimated': tokens_estimated,
+            'latency_ms': int(round(latency * 1000)),
+            'retries': retries,
+            'cache_hit': cache_hit,
+            'outcome': outcome
+        }
+        with self._lock:
+            self._buffer.append(call)
+            if self._thread is None and not self._stopped:
+                # 首次记录时才启动后台线程，未发生LLM调用的撰写器不占用线程
+                self._thread = threading.Thread(target=self._flush_loop, name='usage-ledger', daemon=True)
+                self._thread.start()
+            if len(self._buffer) >= self.batch_size:
+                self._flush_requested.set()
+
+    def _flush_loop(self):
+        """后台定时写入，缓冲达到batch_size条时提前写入"""
+        while not self._stopped:
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """把缓冲的记录写入数据库，返回写入条数"""
+        with self._lock:
+            calls, self._buffer = self._buffer, []
+        if not calls:
+            return 0
+        return self.db_manager.save_llm_calls(calls)
+
+    def close(self):
+        """停止后台线程并写入剩余记录"""
+        self._stopped = True
+        self._flush_requested.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def summary(self, days: int = 7) -> Dict:
+        """最近days天（按UTC日期）的用量汇总"""
+        self.flush()
+        since = datetime.utcnow() - timedelta(days=days)
+        summary = summarize(self.db_manager, since)
+        summary['days'] = days
+        return summary
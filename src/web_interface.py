@@ -5,12 +5,15 @@ Web界面模块
 提供用户友好的Web界面
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 import os
 import json
 from datetime import datetime
 from .news_analyzer import NewsAnalyzer
 from .article_writer import ArticleWriter
+from .config import get_config
+from .jobs import InvalidWebhook, JobManager, JobQueueFull
+from .autopilot import Autopilot
 
 def create_app():
     """创建Flask应用"""
@@ -26,7 +29,38 @@ def create_app():
     # 初始化组件
     news_analyzer = NewsAnalyzer()
     article_writer = ArticleWriter()
+
+    # 后台文章生成任务，吞吐量由工作线程数决定，请求线程只负责入队
+    config = get_config()
+    job_manager = JobManager(
+        lambda payload: article_writer.write_article(
+            payload['news'],
+            article_type=payload['article_type'],
+            style=payload['style'],
+            fresh=payload.get('fresh', False),
+            regenerate=payload.get('regenerate', False)
+        ),
+        workers=config.JOB_WORKERS,
+        queue_size=config.JOB_QUEUE_SIZE,
+        result_ttl=config.JOB_RESULT_TTL,
+        webhook_timeout=config.JOB_WEBHOOK_TIMEOUT,
+        webhook_allowed_hosts=config.JOB_WEBHOOK_ALLOWED_HOSTS
+    )
+    app.job_manager = job_manager
+
+    # 自动驾驶：定时预生成热点新闻草稿
+    autopilot = Autopilot.from_config(news_analyzer, article_writer, config)
+    if config.AUTOPILOT_ENABLED:
+        autopilot.start()
+    app.autopilot = autopilot
     
+    def find_news(news_id):
+        """按ID查找热点新闻"""
+        for news in news_analyzer.get_trending_news(100):  # 获取更多新闻
+            if str(news.get('id')) == str(news_id):
+                return news
+        return None
+
     @app.route('/')
     def index():
         """主页"""
@@ -75,7 +109,7 @@ def create_app():
         """获取热点话题API"""
         try:
             news_list = news_analyzer.get_trending_news(50)
-            topics = news_analyzer.analyze_trending_topics(news_list)
+            topics = news_analyzer.get_trending_topics() or news_analyzer.analyze_trending_topics(news_list)
             
             return jsonify({
                 'success': True,
@@ -107,7 +141,7 @@ def create_app():
                 pass
 
             # 如果数据库不可用，从文件系统获取
-            articles_dir = "articles"
+            articles_dir = config.ARTICLES_DIR
             if not os.path.exists(articles_dir):
                 return jsonify({
                     'success': True,
@@ -153,7 +187,7 @@ def create_app():
     def get_article(filename):
         """获取文章内容"""
         try:
-            filepath = os.path.join("articles", filename)
+            filepath = os.path.join(config.ARTICLES_DIR, filename)
             if not os.path.exists(filepath):
                 return jsonify({
                     'success': False,
@@ -181,7 +215,7 @@ def create_app():
     def download_article(filename):
         """下载文章"""
         try:
-            filepath = os.path.join("articles", filename)
+            filepath = os.path.join(config.ARTICLES_DIR, filename)
             if not os.path.exists(filepath):
                 return "文件不存在", 404
 
@@ -217,7 +251,7 @@ def create_app():
                 pass
 
             # 尝试从文件系统删除
-            filepath = os.path.join("articles", identifier)
+            filepath = os.path.join(config.ARTICLES_DIR, identifier)
             if not os.path.exists(filepath):
                 return jsonify({
                     'success': False,
@@ -250,7 +284,7 @@ def create_app():
                     'error': '内容不能为空'
                 }), 400
 
-            filepath = os.path.join("articles", filename)
+            filepath = os.path.join(config.ARTICLES_DIR, filename)
             if not os.path.exists(filepath):
                 return jsonify({
                     'success': False,
@@ -294,13 +328,7 @@ def create_app():
                 }), 400
 
             # 获取新闻数据
-            news_list = news_analyzer.get_trending_news(100)  # 获取更多新闻
-            selected_news = None
-
-            for news in news_list:
-                if str(news.get('id')) == str(news_id):
-                    selected_news = news
-                    break
+            selected_news = find_news(news_id)
 
             if not selected_news:
                 return jsonify({
@@ -308,11 +336,24 @@ def create_app():
                     'error': f'未找到指定新闻 (ID: {news_id})'
                 }), 404
 
+            # 截止时间：请求未指定时使用配置的默认值，0表示不限制
+            deadline_ms = data.get('deadline_ms', config.WRITE_ARTICLE_DEADLINE_MS)
+            try:
+                deadline_ms = int(deadline_ms) if deadline_ms else None
+            except (TypeError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'error': 'deadline_ms必须是整数'
+                }), 400
+
             # 生成文章
             result = article_writer.write_article(
                 selected_news,
                 article_type=article_type,
-                style=writing_style
+                style=writing_style,
+                fresh=bool(data.get('fresh', False)),
+                deadline_ms=deadline_ms,
+                regenerate=bool(data.get('regenerate', False))
             )
 
             if isinstance(result, dict):
@@ -326,7 +367,12 @@ def create_app():
                         'filename': result.get('filename', ''),
                         'article_id': result.get('article_id'),
                         'quality': result.get('quality', {}),
-                        'analysis': result.get('analysis', {})
+                        'analysis': result.get('analysis', {}),
+                        'timings': result.get('timings', {}),
+                        'prompt_tokens': result.get('prompt_tokens', {}),
+                        'mode': result.get('mode'),
+                        'upgrade_pending': result.get('upgrade_pending', False),
+                        'reused': result.get('reused', False)
                     }
                 })
             else:
@@ -348,11 +394,429 @@ def create_app():
                 'error': f'文章生成失败: {str(e)}'
             }), 500
 
+    def find_stories():
+        """把热点新闻按事件分组"""
+        from .digest import group_stories
+        return group_stories(news_analyzer.get_trending_news(100),
+                             threshold=config.DIGEST_GROUP_THRESHOLD,
+                             max_sources=config.DIGEST_MAX_SOURCES)
+
+    @app.route('/api/stories')
+    def get_stories():
+        """获取多来源事件列表API（只返回有两个及以上来源的事件）"""
+        try:
+            stories = [story for story in find_stories() if len(story) > 1]
+            return jsonify({
+                'success': True,
+                'data': [{
+                    'index': index,
+                    'title': story[0]['title'],
+                    'news_ids': [news.get('id') for news in story],
+                    'sources': [news.get('source', '') for news in story]
+                } for index, story in enumerate(stories)],
+                'total': len(stories)
+            })
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+
+    @app.route('/api/write_digest', methods=['POST'])
+    def write_digest():
+        """撰写多来源综述文章API：指定news_ids，或按/api/stories中的index选择事件"""
+        try:
+            # 请求体可以为空（默认撰写第一个事件），但不能是无法解析的JSON或非对象
+            data = request.get_json(silent=True)
+            if data is None and request.get_data():
+                return jsonify({
+                    'success': False,
+                    'error': '请求数据不是有效的JSON'
+                }), 400
+            data = data or {}
+            if not isinstance(data, dict):
+                return jsonify({
+                    'success': False,
+                    'error': '请求数据必须是JSON对象'
+                }), 400
+            article_type = data.get('article_type', 'analysis')
+            writing_style = data.get('style', data.get('writing_style', 'professional'))
+
+            news_ids = data.get('news_ids')
+            if news_ids:
+                items = [find_news(news_id) for news_id in news_ids]
+                missing = [news_id for news_id, news in zip(news_ids, items) if news is None]
+                if missing:
+                    return jsonify({
+                        'success': False,
+                        'error': f'未找到指定新闻 (ID: {", ".join(map(str, missing))})'
+                    }), 404
+            else:
+                try:
+                    index = int(data.get('story_index', 0))
+                except (TypeError, ValueError):
+                    return jsonify({
+                        'success': False,
+                        'error': 'story_index必须是整数'
+                    }), 400
+                stories = [story for story in find_stories() if len(story) > 1]
+                if not 0 <= index < len(stories):
+                    return jsonify({
+                        'success': False,
+                        'error': '未找到多来源事件'
+                    }), 404
+                items = stories[index]
+
+            result = article_writer.write_digest(items, article_type=article_type, style=writing_style,
+                                                 fresh=bool(data.get('fresh', False)),
+                                                 regenerate=bool(data.get('regenerate', False)))
+            return jsonify({
+                'success': True,
+                'data': {
+                    'title': result.get('title', ''),
+                    'content': result.get('content', ''),
+                    'article': result.get('article', ''),
+                    'filename': result.get('filename', ''),
+                    'article_id': result.get('article_id'),
+                    'quality': result.get('quality', {}),
+                    'timings': result.get('timings', {}),
+                    'sources': result.get('sources', []),
+                    'mode': result.get('mode'),
+                    'reused': result.get('reused', False)
+                }
+            })
+
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'综述生成失败: {str(e)}'
+            }), 500
+
+    @app.route('/api/write_article/stream', methods=['POST'])
+    def write_article_stream():
+        """流式撰写文章API（Server-Sent Events）"""
+        data = request.get_json(silent=True)
+
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': '请求数据为空'
+            }), 400
+
+        news_id = data.get('news_id')
+        article_type = data.get('article_type', 'breaking_news')
+        writing_style = data.get('style', data.get('writing_style', 'professional'))
+
+        if not news_id:
+            return jsonify({
+                'success': False,
+                'error': '缺少新闻ID'
+            }), 400
+
+        try:
+            selected_news = find_news(news_id)
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'获取新闻失败: {str(e)}'
+            }), 500
+
+        if not selected_news:
+            return jsonify({
+                'success': False,
+                'error': f'未找到指定新闻 (ID: {news_id})'
+            }), 404
+
+        def generate():
+            for event in article_writer.stream_article(
+                selected_news,
+                article_type=article_type,
+                style=writing_style,
+                fresh=bool(data.get('fresh', False))
+            ):
+                payload = json.dumps(event['data'], ensure_ascii=False, default=str)
+                yield f"event: {event['event']}\ndata: {payload}\n\n"
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
+    @app.route('/api/write_articles/batch', methods=['POST'])
+    def write_articles_batch():
+        """批量撰写文章API
+
+        news_ids为空时使用前limit条热点新闻；stream为true时以NDJSON逐行返回每篇文章的结果；
+        combined为true时同一条新闻的各类型/风格在一次LLM调用中生成。
+        """
+        data = request.get_json(silent=True) or {}
+
+        article_types = data.get('article_types') or [data.get('article_type', 'breaking_news')]
+        styles = data.get('styles') or [data.get('style', data.get('writing_style', 'professional'))]
+
+        try:
+            # 并发数和新闻条数限制在配置上限之内
+            limit = min(max(1, int(data.get('limit', 20))), config.BATCH_MAX_ARTICLES)
+            max_workers = data.get('max_workers')
+            max_workers = min(max(1, int(max_workers)), config.BATCH_MAX_WORKERS) \
+                if max_workers is not None else config.BATCH_MAX_WORKERS
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'limit和max_workers必须是整数'
+            }), 400
+
+        try:
+            # 新闻只获取一次，所有文章共用
+            news_ids = data.get('news_ids')
+            if news_ids:
+                news_by_id = {str(news.get('id')): news for news in news_analyzer.get_trending_news(100)}
+                missing = [news_id for news_id in news_ids if str(news_id) not in news_by_id]
+                if missing:
+                    return jsonify({
+                        'success': False,
+                        'error': f'未找到指定新闻 (ID: {", ".join(map(str, missing))})'
+                    }), 404
+                items = [news_by_id[str(news_id)] for news_id in news_ids]
+            else:
+                items = news_analyzer.get_trending_news(limit)[:limit]
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'获取新闻失败: {str(e)}'
+            }), 500
+
+        total = len(items) * len(article_types) * len(styles)
+        if total == 0:
+            return jsonify({
+                'success': False,
+                'error': '没有需要撰写的文章'
+            }), 400
+        if total > config.BATCH_MAX_ARTICLES:
+            return jsonify({
+                'success': False,
+                'error': f'单次最多撰写 {config.BATCH_MAX_ARTICLES} 篇文章（本次请求 {total} 篇）'
+            }), 400
+
+        results = article_writer.write_articles(items, article_types, styles, max_workers=max_workers,
+                                                fresh=bool(data.get('fresh', False)),
+                                                combined=bool(data.get('combined', False)))
+
+        if data.get('stream'):
+            def generate():
+                for result in results:
+                    yield json.dumps(result, ensure_ascii=False, default=str) + '\n'
+
+            return Response(
+                stream_with_context(generate()),
+                mimetype='application/x-ndjson',
+                headers={
+                    'Cache-Control': 'no-cache',
+                    'X-Accel-Buffering': 'no'
+                }
+            )
+
+        try:
+            results = list(results)
+            succeeded = sum(1 for result in results if result['success'])
+            return jsonify({
+                'success': True,
+                'data': {
+                    'results': results,
+                    'total': total,
+                    'succeeded': succeeded,
+                    'failed': total - succeeded
+                }
+            })
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'批量撰写失败: {str(e)}'
+            }), 500
+
+    @app.route('/api/jobs', methods=['POST'])
+    def submit_job():
+        """提交后台文章生成任务API"""
+        data = request.get_json(silent=True)
+
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': '请求数据为空'
+            }), 400
+
+        news_id = data.get('news_id')
+        webhook = data.get('webhook')
+
+        if not news_id:
+            return jsonify({
+                'success': False,
+                'error': '缺少新闻ID'
+            }), 400
+
+        if webhook:
+            try:
+                job_manager.check_webhook(webhook)
+            except InvalidWebhook as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+
+        try:
+            selected_news = find_news(news_id)
+            if not selected_news:
+                return jsonify({
+                    'success': False,
+                    'error': f'未找到指定新闻 (ID: {news_id})'
+                }), 404
+
+            job = job_manager.submit({
+                'news': selected_news,
+                'article_type': data.get('article_type', 'breaking_news'),
+                'style': data.get('style', data.get('writing_style', 'professional')),
+                'fresh': bool(data.get('fresh', False)),
+                'regenerate': bool(data.get('regenerate', False))
+            }, webhook=webhook)
+
+            return jsonify({
+                'success': True,
+                'data': {
+                    'job_id': job.id,
+                    'status': job.status,
+                    'status_url': f'/api/jobs/{job.id}'
+                }
+            }), 202
+
+        except JobQueueFull as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 503
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'任务提交失败: {str(e)}'
+            }), 500
+
+    @app.route('/api/jobs/<job_id>')
+    def get_job(job_id):
+        """查询后台任务状态和结果API"""
+        job = job_manager.get(job_id)
+        if not job:
+            return jsonify({
+                'success': False,
+                'error': f'未找到指定任务 (ID: {job_id})'
+            }), 404
+
+        return jsonify({
+            'success': True,
+            'data': job.to_dict()
+        })
+
+    @app.route('/api/jobs')
+    def get_job_stats():
+        """获取后台任务队列统计API"""
+        return jsonify({
+            'success': True,
+            'data': job_manager.get_stats()
+        })
+
+    @app.route('/api/autopilot')
+    def get_autopilot_status():
+        """获取自动驾驶状态API"""
+        return jsonify({
+            'success': True,
+            'data': autopilot.get_stats()
+        })
+
+    @app.route('/api/autopilot/run', methods=['POST'])
+    def run_autopilot():
+        """立即执行一轮自动驾驶API"""
+        if not autopilot.trigger():
+            return jsonify({
+                'success': False,
+                'error': '自动驾驶正在执行中'
+            }), 409
+
+        return jsonify({
+            'success': True,
+            'data': autopilot.get_stats()
+        }), 202
+
+    @app.route('/api/drafts')
+    def get_drafts():
+        """获取待处理草稿列表API"""
+        try:
+            from .database import get_database_manager
+            limit = int(request.args.get('limit', 50))
+            drafts = get_database_manager().get_articles(limit=limit, status='pending')
+            return jsonify({
+                'success': True,
+                'data': drafts,
+                'total': len(drafts)
+            })
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+
+    @app.route('/api/drafts/<int:article_id>/publish', methods=['POST'])
+    def publish_draft(article_id):
+        """发布草稿API"""
+        from .database import get_database_manager
+        db_manager = get_database_manager()
+        article = db_manager.get_article_by_id(article_id)
+        if not article:
+            return jsonify({
+                'success': False,
+                'error': f'未找到草稿 (ID: {article_id})'
+            }), 404
+
+        # 只有待审核的草稿可以发布，已发布或其他状态的文章不被改写
+        if article['status'] != 'pending':
+            return jsonify({
+                'success': False,
+                'error': f"文章不是待审核草稿 (ID: {article_id}, 状态: {article['status']})"
+            }), 409
+
+        if not db_manager.update_article(article_id, {'status': 'published'}):
+            return jsonify({
+                'success': False,
+                'error': f'发布草稿失败 (ID: {article_id})'
+            }), 500
+
+        return jsonify({
+            'success': True,
+            'data': {'article_id': article_id, 'status': 'published'}
+        })
+
+    @app.route('/api/llm/usage')
+    def get_llm_usage():
+        """获取LLM用量汇总API（按天、文章类型、提示词类型和模型）"""
+        try:
+            days = int(request.args.get('days', 7))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'days必须是整数'
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'data': article_writer.usage_ledger.summary(days=days)
+        })
+
     @app.route('/api/analytics/stats')
     def get_analytics_stats():
         """获取分析统计数据"""
         try:
-            articles_dir = "articles"
+            articles_dir = config.ARTICLES_DIR
             if not os.path.exists(articles_dir):
                 return jsonify({
                     'success': True,
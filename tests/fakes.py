@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试用的模拟对象
+"""
+
+import time
+from types import SimpleNamespace
+
+class FakeChatClient:
+    """模拟openai客户端，每次调用固定延迟后返回指定内容
+
+    stream=True时把内容按chunk_size切片逐个返回，每片之间间隔chunk_delay；
+    指定responder时按提示词生成回复。
+    """
+
+    def __init__(self, delay=0.2, content='## 导语\n\n模拟生成的内容。', chunk_size=8, chunk_delay=0.0,
+                 responder=None):
+        self.delay = delay
+        self.content = content
+        self.responder = responder
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        time.sleep(self.delay)
+        content = self.responder(kwargs['messages'][-1]['content']) if self.responder else self.content
+        if kwargs.get('stream'):
+            return self._stream(content)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream(self, content):
+        for i in range(0, len(content), self.chunk_size):
+            if i and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            delta = SimpleNamespace(content=content[i:i + self.chunk_size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
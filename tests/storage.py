@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试用的临时存储
+把数据库（DATABASE_URL和全局数据库管理器）和文章目录指向临时目录，
+测试之间不共享已保存的文章，重复运行测试时也不会复用上一次的结果
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+from src.config import get_config
+from src.database import DatabaseManager
+
+@contextmanager
+def isolated_storage():
+    """在临时目录中使用独立的数据库、文章目录和缓存文件，退出时删除
+
+    unittest中在setUp里调用 self.enterContext(isolated_storage())。
+    """
+    config = get_config()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = 'sqlite:///' + os.path.join(tmp_dir, 'articles.db')
+        db_manager = DatabaseManager(database_url)
+        try:
+            # 缓存是延迟创建的全局实例：置空后在临时目录中重新创建，退出时恢复原实例
+            with mock.patch.dict(os.environ, {'DATABASE_URL': database_url}), \
+                    mock.patch('src.database.db_manager', db_manager), \
+                    mock.patch.object(config, 'ARTICLES_DIR', os.path.join(tmp_dir, 'articles')), \
+                    mock.patch.object(config, 'CACHE_FILE', os.path.join(tmp_dir, 'cache.db')), \
+                    mock.patch.object(config, 'LLM_CACHE_FILE', os.path.join(tmp_dir, 'llm_cache.db')), \
+                    mock.patch('src.cache._cache', None), \
+                    mock.patch('src.cache._llm_cache', None):
+                yield tmp_dir
+        finally:
+            # 仍持有该管理器的对象（如用量账本、后台升级任务）之后不再写入已删除的数据库
+            db_manager.available = False
+            if db_manager.engine is not None:
+                db_manager.engine.dispose()
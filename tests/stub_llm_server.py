@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地OpenAI兼容模拟服务
+实现 /v1/chat/completions（含流式输出），可配置延迟、生成速度、429/500错误注入和固定回复，
+用于在离线环境下测试和压测AI撰写流程；同时提供Claude（/v1/messages）和
+Gemini（/v1beta/models/<model>:generateContent）格式的接口，用于测试多服务商路由
+
+命令行启动：python -m tests.stub_llm_server --port 8001 --latency 0.5 --tokens-per-second 50
+然后设置 OPENAI_BASE_URL=http://127.0.0.1:8001/v1 和任意 OPENAI_API_KEY
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+DEFAULT_SECTIONS = ['导语', '事件详情', '背景分析', '影响评估', '专家观点', '结语']
+
+def default_response(prompt: str) -> str:
+    """根据提示词生成一段看起来合理的回复：标题请求返回标题，其余按文章结构返回Markdown正文"""
+    title_match = re.search(r'原标题：(.+)', prompt)
+    topic = title_match.group(1).strip() if title_match else '最新动态'
+
+    if '请只返回标题' in prompt:
+        return f'{topic[:18]}：独家深度观察'
+
+    structure_match = re.search(r'文章结构：(.+)', prompt)
+    sections = [s.strip() for s in structure_match.group(1).split('->')] if structure_match else DEFAULT_SECTIONS
+
+    paragraphs = []
+    for section in sections:
+        paragraphs.append(
+            f'## {section}\n\n'
+            f'围绕“{topic}”，专家分析认为，相关数据显示市场正在发生变化。'
+            f'因此，行业需要关注政策和技术趋势带来的影响。此外，多方合作与改革创新将推动长期发展，'
+            f'同时也应警惕潜在风险。'
+        )
+    return '\n\n'.join(paragraphs)
+
+class StubLLMServer:
+    """OpenAI兼容模拟服务"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 tokens_per_second: float = 0.0, chunk_size: int = 4, error_rate_429: float = 0.0,
+                 error_rate_500: float = 0.0, fail_first: int = 0, retry_after: float = 1.0,
+                 responses: Optional[Dict[str, str]] = None, seed: Optional[int] = None):
+        """初始化模拟服务
+
+        latency为首字节前的固定延迟（秒）；tokens_per_second为生成速度（按字符近似token，0表示不限速）；
+        error_rate_429/error_rate_500为随机注入错误的概率；fail_first表示前N个请求固定返回429；
+        responses为{提示词中包含的文本: 固定回复}。
+        """
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.chunk_size = max(1, chunk_size)
+        self.error_rate_429 = error_rate_429
+        self.error_rate_500 = error_rate_500
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.responses = responses or {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'streams': 0, 'errors_429': 0, 'errors_500': 0, 'completion_tokens': 0}
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """服务根地址（Claude、Gemini服务商使用）"""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def url(self) -> str:
+        """OpenAI客户端使用的base_url"""
+        return f'{self.base_url}/v1'
+
+    def start(self) -> 'StubLLMServer':
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _pick_error(self) -> Optional[int]:
+        """决定本次请求是否注入错误"""
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.stats['requests'] <= self.fail_first:
+                return 429
+            roll = self._random.random()
+        if roll < self.error_rate_429:
+            return 429
+        if roll < self.error_rate_429 + self.error_rate_500:
+            return 500
+        return None
+
+    def _reply_for(self, prompt: str) -> str:
+        """查找固定回复，没有时使用默认回复"""
+        for marker, reply in self.responses.items():
+            if marker in prompt:
+                return reply
+        return default_response(prompt)
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip('/') == '/v1/models':
+                    self._send_json(200, {'object': 'list', 'data': [{'id': 'stub-model', 'object': 'model'}]})
+                else:
+                    self._send_json(404, {'error': {'message': 'not found'}})
+
+            def do_POST(self):
+                path = self.path.split('?', 1)[0].rstrip('/')
+                if path == '/v1/chat/completions':
+                    api = 'openai'
+                elif path == '/v1/messages':
+                    api = 'claude'
+                elif re.fullmatch(r'/v1beta/models/[^/]+:generateContent', path):
+                    api = 'gemini'
+                else:
+                    self._send_json(404, {'error': {'message': 'not found'}})
+                    return
+
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+
+                error = stub._pick_error()
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if error == 429:
+                    with stub._lock:
+                        stub.stats['errors_429'] += 1
+                    self._send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_error'}},
+                                    headers={'Retry-After': str(stub.retry_after)})
+                    return
+                if error == 500:
+                    with stub._lock:
+                        stub.stats['errors_500'] += 1
+                    self._send_json(500, {'error': {'message': 'Internal server error', 'type': 'server_error'}})
+                    return
+
+                if api == 'gemini':
+                    prompt = '\n'.join(part.get('text', '') for content in request.get('contents') or []
+                                       for part in content.get('parts') or [])
+                    max_tokens = (request.get('generationConfig') or {}).get('maxOutputTokens')
+                else:
+                    messages = request.get('messages') or []
+                    prompt = '\n'.join(str(message.get('content', '')) for message in messages)
+                    max_tokens = request.get('max_tokens')
+                reply = stub._reply_for(prompt)
+                if max_tokens:
+                    reply = reply[:max_tokens * 2]  # 中文按每token约两个字符近似
+                with stub._lock:
+                    stub.stats['completion_tokens'] += len(reply)
+
+                if api != 'openai':
+                    if stub.tokens_per_second:
+                        time.sleep(len(reply) / stub.tokens_per_second)
+                    self._send_json(200, self._native_response(api, request, prompt, reply))
+                elif request.get('stream'):
+                    self._stream(request, reply)
+                else:
+                    if stub.tokens_per_second:
+                        time.sleep(len(reply) / stub.tokens_per_second)
+                    self._send_json(200, {
+                        'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+                        'object': 'chat.completion',
+                        'created': int(time.time()),
+                        'model': request.get('model', 'stub-model'),
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': reply},
+                            'finish_reason': 'stop'
+                        }],
+                        'usage': {
+                            'prompt_tokens': len(prompt),
+                            'completion_tokens': len(reply),
+                            'total_tokens': len(prompt) + len(reply)
+                        }
+                    })
+
+            def _native_response(self, api, request, prompt, reply):
+                """Claude / Gemini格式的响应"""
+                if api == 'claude':
+                    return {
+                        'id': f'msg_{uuid.uuid4().hex[:12]}',
+                        'type': 'message',
+                        'role': 'assistant',
+                        'model': request.get('model', 'stub-model'),
+                        'content': [{'type': 'text', 'text': reply}],
+                        'stop_reason': 'end_turn',
+                        'usage': {'input_tokens': len(prompt), 'output_tokens': len(reply)}
+                    }
+                return {
+                    'candidates': [{
+                        'content': {'role': 'model', 'parts': [{'text': reply}]},
+                        'finishReason': 'STOP'
+                    }],
+                    'usageMetadata': {
+                        'promptTokenCount': len(prompt),
+                        'candidatesTokenCount': len(reply),
+                        'totalTokenCount': len(prompt) + len(reply)
+                    }
+                }
+
+            def _stream(self, request, reply):
+                with stub._lock:
+                    stub.stats['streams'] += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+                completion_id = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+                delay = stub.chunk_size / stub.tokens_per_second if stub.tokens_per_second else 0
+
+                def send(delta, finish_reason=None):
+                    chunk = {
+                        'id': completion_id,
+                        'object': 'chat.completion.chunk',
+                        'created': int(time.time()),
+                        'model': request.get('model', 'stub-model'),
+                        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+                    }
+                    self.wfile.write(f'data: {json.dumps(chunk, ensure_ascii=False)}\n\n'.encode('utf-8'))
+                    self.wfile.flush()
+
+                send({'role': 'assistant', 'content': ''})
+                for i in range(0, len(reply), stub.chunk_size):
+                    if delay:
+                        time.sleep(delay)
+                    send({'content': reply[i:i + stub.chunk_size]})
+                send({}, 'stop')
+                self.wfile.write(b'data: [DONE]\n\n')
+                self.wfile.flush()
+
+        return Handler
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='本地OpenAI兼容模拟服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.5, help='首字节延迟（秒）')
+    parser.add_argument('--tokens-per-second', type=float, default=50, help='生成速度，0表示不限速')
+    parser.add_argument('--error-rate-429', type=float, default=0.0)
+    parser.add_argument('--error-rate-500', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--responses', help='固定回复JSON文件（{提示词中包含的文本: 回复}）')
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+
+    server = StubLLMServer(args.host, args.port, latency=args.latency,
+                           tokens_per_second=args.tokens_per_second,
+                           error_rate_429=args.error_rate_429, error_rate_500=args.error_rate_500,
+                           retry_after=args.retry_after, responses=responses)
+    print(f"🚀 模拟LLM服务已启动: {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自动驾驶测试
+"""
+
+import time
+import uuid
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+import schedule
+
+from src.article_writer import ArticleWriter
+from src.autopilot import Autopilot
+from src.database import get_database_manager
+from tests.fakes import FakeChatClient
+from tests.storage import isolated_storage
+
+def _sample_news(count):
+    batch = uuid.uuid4().hex[:8]
+    return [{
+        'id': f'{batch}-{i}',
+        'title': f'自动驾驶测试新闻{i}',
+        'content': f'某公司宣布完成第{i}轮融资，金额达10亿元。',
+        'summary': f'自动驾驶测试摘要{i}',
+        'source': '测试来源',
+        'link': f'http://test.com/autopilot/{batch}/{i}',
+        'publish_time': datetime.now()
+    } for i in range(count)]
+
+class TestAutopilot(unittest.TestCase):
+    """自动驾驶测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+        if not get_database_manager().available:
+            self.skipTest("数据库不可用")
+
+    def test_run_generates_pending_drafts_once(self):
+        """测试一轮生成前N条新闻的草稿，已有文章的新闻在下一轮跳过"""
+        news = _sample_news(4)
+        analyzer = SimpleNamespace(get_trending_news=lambda limit: news[:limit])
+        writer = ArticleWriter()
+        writer.ai_clients = {}
+
+        autopilot = Autopilot(analyzer, writer, top_n=3, max_workers=2)
+        with mock.patch('src.database.DatabaseManager.update_article') as update_article:
+            summary = autopilot.run_once()
+        # 草稿在插入时即为待审核状态，不会先以已发布状态出现
+        update_article.assert_not_called()
+
+        self.assertEqual(summary['generated'], 3)
+        self.assertEqual(summary['skipped'], 0)
+        db_manager = get_database_manager()
+        statuses = {db_manager.get_article_by_id(article_id)['status'] for article_id in summary['article_ids']}
+        self.assertEqual(statuses, {'pending'})
+
+        again = autopilot.run_once()
+        self.assertEqual(again['generated'], 0)
+        self.assertEqual(again['skipped'], 3)
+        self.assertEqual(autopilot.get_stats()['totals']['runs'], 2)
+        print("✅ 自动驾驶草稿生成测试通过")
+
+    def test_token_budget_defers_remaining(self):
+        """测试超出token预算的新闻推迟到下一轮"""
+        news = _sample_news(3)
+        analyzer = SimpleNamespace(get_trending_news=lambda limit: news[:limit])
+        writer = ArticleWriter()
+        writer.ai_clients = {'openai': FakeChatClient(delay=0.01, content='## 导语\n\n自动驾驶生成的正文。' * 20)}
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+
+        per_article = writer.estimate_tokens(news[0])
+        autopilot = Autopilot(analyzer, writer, top_n=3, token_budget=int(per_article * 1.5))
+        summary = autopilot.run_once()
+
+        self.assertEqual(summary['generated'], 1)
+        self.assertEqual(summary['deferred'], 2)
+        self.assertLessEqual(summary['tokens'], autopilot.token_budget)
+        print(f"✅ 自动驾驶token预算测试通过 (每篇约 {per_article} tokens)")
+
+    def test_scheduler_start_stop(self):
+        """测试启动后按间隔注册定时任务，停止后清除"""
+        scheduler = schedule.Scheduler()
+        analyzer = SimpleNamespace(get_trending_news=lambda limit: [])
+        autopilot = Autopilot(analyzer, ArticleWriter(), interval_minutes=15, scheduler=scheduler)
+
+        autopilot.start(run_now=False)
+        self.assertTrue(autopilot.running)
+        self.assertEqual(len(scheduler.jobs), 1)
+        self.assertEqual(scheduler.jobs[0].interval, 15)
+        self.assertIsNotNone(autopilot.get_stats()['next_run'])
+
+        autopilot.stop()
+        self.assertFalse(autopilot.running)
+        self.assertEqual(scheduler.jobs, [])
+        print("✅ 自动驾驶调度测试通过")
+
+    def test_endpoints(self):
+        """测试自动驾驶和草稿接口"""
+        from src.web_interface import create_app
+
+        news = _sample_news(2)
+        with mock.patch('src.news_analyzer.NewsAnalyzer.get_trending_news', return_value=news), \
+                mock.patch.object(ArticleWriter, '_is_ai_available', return_value=False):
+            app = create_app()
+            client = app.test_client()
+
+            summary = app.autopilot.run_once()
+            self.assertEqual(client.get('/api/autopilot').get_json()['data']['last_run']['generated'], 2)
+
+            drafts = client.get('/api/drafts?limit=500').get_json()['data']
+            draft_ids = {draft['id'] for draft in drafts}
+            self.assertTrue(set(summary['article_ids']) <= draft_ids)
+
+            article_id = summary['article_ids'][0]
+            response = client.post(f'/api/drafts/{article_id}/publish')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(get_database_manager().get_article_by_id(article_id)['status'], 'published')
+            # 已发布的文章和非草稿文章不能再次发布
+            self.assertEqual(client.post(f'/api/drafts/{article_id}/publish').status_code, 409)
+            published = app.autopilot.article_writer.write_article(_sample_news(1)[0])
+            self.assertEqual(client.post(f"/api/drafts/{published['article_id']}/publish").status_code, 409)
+            self.assertEqual(client.post('/api/drafts/999999/publish').status_code, 404)
+            self.assertEqual(client.post('/api/autopilot/run').status_code, 202)
+            for _ in range(100):
+                if app.autopilot.get_stats()['totals']['runs'] == 2:
+                    break
+                time.sleep(0.05)
+            self.assertEqual(app.autopilot.last_run['skipped'], 2)
+            app.job_manager.stop()
+        print("✅ 自动驾驶接口测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -6,6 +6,17 @@
 
 import sys
 import os
+from contextlib import ExitStack
+
+_storage = ExitStack()
+
+def setup_function(function):
+    """每个测试使用临时数据库和文章目录"""
+    from tests.storage import isolated_storage
+    _storage.enter_context(isolated_storage())
+
+def teardown_function(function):
+    _storage.close()
 
 def test_imports():
     """测试基本导入"""
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量撰写测试
+"""
+
+import json
+import re
+import threading
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from src.article_writer import ArticleWriter
+from tests.storage import isolated_storage
+
+def _sample_news(count):
+    return [{
+        'id': 24680 + i,
+        'title': f'批量撰写测试新闻{i}',
+        'content': f'某公司宣布完成第{i}轮融资，金额达10亿元。',
+        'summary': f'批量撰写测试摘要{i}',
+        'source': '测试来源',
+        'link': f'http://test.com/batch/{i}',
+        'publish_time': datetime.now()
+    } for i in range(count)]
+
+class TestWriteArticles(unittest.TestCase):
+    """批量撰写测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def test_shared_analysis_and_bulk_save(self):
+        """测试分析结果在多种文章类型间共享，数据库批量写入"""
+        from src.database import get_database_manager
+
+        writer = ArticleWriter()
+        writer.ai_clients = {}
+        analyze = mock.Mock(wraps=writer._analyze_news_content)
+        writer._analyze_news_content = analyze
+        db_manager = get_database_manager()
+
+        # 6篇文章同时完成撰写，保证结果在同一轮中合并写入
+        barrier = threading.Barrier(6, timeout=10)
+        compose = writer._compose_article
+
+        def compose_together(*args):
+            barrier.wait()
+            return compose(*args)
+        writer._compose_article = compose_together
+
+        with mock.patch.object(db_manager, 'save_articles', wraps=db_manager.save_articles) as save_articles:
+            results = list(writer.write_articles(
+                _sample_news(3), types=['breaking_news', 'analysis'], max_workers=6))
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(analyze.call_count, 3)
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(len({result['filename'] for result in results}), 6)
+        self.assertEqual({(r['news_id'], r['article_type']) for r in results},
+                         {(24680 + i, t) for i in range(3) for t in ('breaking_news', 'analysis')})
+        self.assertNotIn('record', results[0])
+        if db_manager.available:
+            self.assertTrue(all(result['article_id'] for result in results))
+            rows_per_call = [len(call.args[0]) for call in save_articles.call_args_list]
+            self.assertEqual(sum(rows_per_call), 6)
+            self.assertLess(save_articles.call_count, 6)
+        print(f"✅ 批量撰写测试通过 (数据库写入 {save_articles.call_count} 次)")
+
+    def test_batch_endpoint_streams_ndjson(self):
+        """测试批量接口以NDJSON逐行返回结果"""
+        from src.config import get_config
+        from src.web_interface import create_app
+
+        news = _sample_news(2)
+        with mock.patch('src.news_analyzer.NewsAnalyzer.get_trending_news', return_value=news), \
+                mock.patch.object(ArticleWriter, '_is_ai_available', return_value=False):
+            app = create_app()
+            client = app.test_client()
+
+            response = client.post('/api/write_articles/batch', json={
+                'news_ids': [24680, 24681],
+                'article_types': ['breaking_news', 'feature'],
+                'stream': True
+            })
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+            missing = client.post('/api/write_articles/batch', json={'news_ids': [1]})
+            self.assertEqual(missing.status_code, 404)
+            for bad in ({'limit': 'abc'}, {'max_workers': 'many'}, {'max_workers': [4]}):
+                self.assertEqual(client.post('/api/write_articles/batch', json=bad).status_code, 400)
+
+            with mock.patch.object(ArticleWriter, 'write_articles', return_value=iter([])) as write_articles:
+                client.post('/api/write_articles/batch', json={'news_ids': [24680], 'max_workers': 10000})
+            self.assertEqual(write_articles.call_args.kwargs['max_workers'], get_config().BATCH_MAX_WORKERS)
+            app.job_manager.stop()
+
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(all(line['success'] for line in lines))
+        print("✅ 批量接口测试通过")
+
+    def test_combined_variants_single_call(self):
+        """测试多个文章类型在一次LLM调用中生成并拆分为独立结果"""
+        from tests.fakes import FakeChatClient
+
+        def responder(prompt):
+            if '"articles"' not in prompt:
+                return '单独生成的正文。' * 20
+            return '```json\n' + json.dumps({'articles': [
+                {'article_type': 'breaking_news', 'style': 'professional',
+                 'title': '快讯标题', 'content': '## 导语\n\n快讯正文内容。' * 20},
+                {'article_type': 'feature', 'style': 'professional',
+                 'title': '特稿标题', 'content': '## 开篇\n\n特稿正文内容。' * 20}
+            ]}, ensure_ascii=False) + '\n```'
+
+        writer = ArticleWriter()
+        client = FakeChatClient(responder=responder)
+        writer.ai_clients = {'openai': client}
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+        writer._review_article = lambda title, content, news, timings, use_cache=True, article_type=None: \
+            (content, writer._format_article(title, content, news), {'total_score': 0.8, 'grade': 'B'})
+
+        results = writer.write_article_variants(_sample_news(1)[0], types=['breaking_news', 'feature'])
+
+        self.assertEqual(len(client.calls), 1)
+        by_type = {result['article_type']: result for result in results}
+        self.assertEqual(by_type['breaking_news']['title'], '快讯标题')
+        self.assertIn('特稿正文内容', by_type['feature']['content'])
+        self.assertEqual(len({result['filename'] for result in results}), 2)
+        self.assertIn('combined', by_type['feature']['timings'])
+        print("✅ 多变体合并生成测试通过")
+
+    def test_combined_variants_split_by_output_limit(self):
+        """测试合并生成按模型输出上限分组：每次调用的预算都容得下所请求的全部文章，不会被截断"""
+        from tests.fakes import FakeChatClient
+
+        def responder(prompt):
+            requested = re.findall(r'article_type=(\w+)，style=(\w+)', prompt)
+            return json.dumps({'articles': [
+                {'article_type': article_type, 'style': style, 'title': f'{article_type}标题',
+                 'content': f'## 导语\n\n{article_type}正文。'} for article_type, style in requested
+            ]}, ensure_ascii=False)
+
+        writer = ArticleWriter()
+        client = FakeChatClient(delay=0, responder=responder)
+        writer.ai_clients = {'openai': client}
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+        variants = [(article_type, 'professional') for article_type in ('breaking_news', 'analysis', 'feature')]
+
+        with mock.patch.object(writer.config, 'OPENAI_MAX_TOKENS', 2000), \
+                mock.patch.object(writer.config, 'LLM_MAX_OUTPUT_TOKENS', 4096):
+            news = _sample_news(1)[0]
+            analysis = writer._analyze_news_content(news)
+            generated = writer._generate_combined_variants(news, analysis, variants)
+            single = writer._generate_combined_variants(news, analysis, variants[:1])
+
+        # 上限只容得下两篇：三篇拆成两次调用，每次的预算都是所含篇数 x 单篇预算
+        self.assertEqual(sorted(call['max_tokens'] for call in client.calls), [2000, 2000, 4000])
+        self.assertEqual(set(generated), set(variants))
+        self.assertEqual(generated[('feature', 'professional')][0], 'feature标题')
+        self.assertEqual(set(single), set(variants[:1]))
+        print("✅ 合并生成按输出上限分组测试通过")
+
+    def test_parse_variants_falls_back_to_order(self):
+        """测试解析时缺少类型字段按顺序对应，非JSON返回空结果"""
+        variants = [('breaking_news', 'professional'), ('analysis', 'casual')]
+        text = json.dumps({'articles': [{'title': 'A', 'content': '正文A'}, {'title': 'B', 'content': '正文B'}]})
+
+        parsed = ArticleWriter._parse_variants(text, variants)
+        self.assertEqual(parsed[('analysis', 'casual')], ('B', '正文B'))
+        self.assertEqual(ArticleWriter._parse_variants('不是JSON', variants), {})
+        print("✅ 多变体解析测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存模块测试
+"""
+
+import os
+import time
+import tempfile
+import unittest
+
+from src.cache import LRUCache, SQLiteCache, TieredCache
+from tests.storage import isolated_storage
+
+class TestLRUCache(unittest.TestCase):
+    """进程内LRU缓存测试"""
+
+    def test_lru_eviction(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        print("✅ LRU淘汰测试通过")
+
+    def test_ttl_and_prefix(self):
+        """测试TTL过期和按前缀失效"""
+        cache = LRUCache()
+        cache.set('news:1', 'x', timeout=0.01)
+        cache.set('news:2', 'y')
+        cache.set('topics:1', 'z')
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get('news:1'))
+        self.assertEqual(cache.delete_prefix('news:'), 1)
+        self.assertIsNone(cache.get('news:2'))
+        self.assertEqual(cache.get('topics:1'), 'z')
+        print("✅ LRU TTL与前缀失效测试通过")
+
+class TestSharedCache(unittest.TestCase):
+    """共享SQLite缓存测试"""
+
+    def setUp(self):
+        """设置测试环境"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'cache.db')
+
+    def tearDown(self):
+        """清理测试环境"""
+        self.tmp_dir.cleanup()
+
+    def test_shared_between_instances(self):
+        """测试不同实例（模拟不同工作进程）之间共享数据"""
+        worker_a = TieredCache(LRUCache(), SQLiteCache(self.path))
+        worker_b = TieredCache(LRUCache(), SQLiteCache(self.path))
+
+        worker_a.set('analysis:1', {'category': '科技'})
+        self.assertEqual(worker_b.get('analysis:1'), {'category': '科技'})
+        self.assertEqual(worker_b.hits['l2'], 1)
+
+        # 第二次读取命中L1
+        worker_b.get('analysis:1')
+        self.assertEqual(worker_b.hits['l1'], 1)
+
+        worker_a.delete_prefix('analysis:')
+        self.assertIsNone(worker_a.l2.get('analysis:1'))
+        print("✅ 共享缓存测试通过")
+
+    def test_size_based_eviction(self):
+        """测试按容量淘汰最久未访问的条目"""
+        cache = SQLiteCache(self.path, max_size=4096)
+        for i in range(10):
+            cache.set(f'key:{i}', b'x' * 1000)
+        cache.evict()
+
+        self.assertIsNone(cache.get('key:0'))
+        self.assertIsNotNone(cache.get('key:9'))
+        total = cache._connect().execute("SELECT SUM(size) FROM cache").fetchone()[0]
+        self.assertLessEqual(total, 4096)
+        print("✅ 共享缓存容量淘汰测试通过")
+
+class TestLLMCache(unittest.TestCase):
+    """LLM响应缓存测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def test_repeated_prompts_hit_cache(self):
+        """测试相同请求不再调用模型，fresh时强制重新生成"""
+        from datetime import datetime
+        from src.article_writer import ArticleWriter
+        from tests.fakes import FakeChatClient
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            client = FakeChatClient(delay=0.05)
+            writer = ArticleWriter()
+            writer.ai_clients['openai'] = client
+            writer.current_ai_model = 'openai'
+            writer.llm_cache = TieredCache(LRUCache(), SQLiteCache(os.path.join(tmp_dir, 'llm.db')))
+
+            news = {
+                'id': 97531,
+                'title': 'LLM缓存测试新闻',
+                'content': '某公司宣布完成新一轮融资，金额达10亿元。',
+                'summary': 'LLM缓存测试摘要',
+                'source': '测试来源',
+                'link': 'http://test.com/llm-cache',
+                'publish_time': datetime.now()
+            }
+
+            writer.write_article(news)
+            first_calls = len(client.calls)
+            self.assertGreaterEqual(first_calls, 2)
+
+            start = time.perf_counter()
+            cached_title = writer._generate_ai_title(news, writer._analyze_news_content(news), 'breaking_news')
+            self.assertLess(time.perf_counter() - start, 0.05)
+            self.assertEqual(cached_title, client.content)
+
+            writer.write_article(news)
+            self.assertEqual(len(client.calls), first_calls)
+
+            writer.write_article(news, fresh=True)
+            self.assertEqual(len(client.calls), first_calls * 2)
+
+            # 其他进程（新的缓存实例）可以从磁盘读取
+            other = TieredCache(LRUCache(), SQLiteCache(os.path.join(tmp_dir, 'llm.db')))
+            self.assertGreater(len(other.l2), 0)
+        print("✅ LLM响应缓存测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -11,6 +11,8 @@ import time
 import unittest
 from datetime import datetime
 
+from tests.storage import isolated_storage
+
 class TestEnvironmentSetup(unittest.TestCase):
     """环境配置测试"""
     
@@ -52,6 +54,7 @@ class TestNewsAnalyzer(unittest.TestCase):
     
     def setUp(self):
         """设置测试环境"""
+        self.enterContext(isolated_storage())
         from src.news_analyzer import NewsAnalyzer
         self.analyzer = NewsAnalyzer()
     
@@ -92,11 +95,71 @@ class TestNewsAnalyzer(unittest.TestCase):
         self.assertIsInstance(topics, list)
         print("✅ 热点话题分析测试通过")
 
+    def test_news_snapshot_roundtrip(self):
+        """测试新闻缓存快照的保存与恢复"""
+        import tempfile
+        from src.news_analyzer import NewsAnalyzer
+
+        mock_news = [{
+            'id': NewsAnalyzer._stable_news_id('快照测试新闻', 'http://test.com/snapshot'),
+            'title': '快照测试新闻',
+            'link': 'http://test.com/snapshot',
+            'summary': '快照测试摘要',
+            'content': '快照测试内容',
+            'source': '测试来源',
+            'publish_time': datetime.now()
+        }]
+
+        from src.cache import LRUCache, TieredCache
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.analyzer.cache = TieredCache(LRUCache())
+            self.analyzer.snapshot_file = os.path.join(tmp_dir, 'news_snapshot.bin')
+            self.analyzer.snapshot_interval = 0
+            self.analyzer._fetch_trending_news = lambda limit: list(mock_news)
+            self.analyzer.get_trending_news(10)
+            self.assertGreater(self.analyzer.save_snapshot(), 0)
+
+            restored = NewsAnalyzer()
+            restored.cache = TieredCache(LRUCache())
+            restored.snapshot_file = self.analyzer.snapshot_file
+            self.assertTrue(restored._load_snapshot())
+            restored._fetch_trending_news = lambda limit: self.fail("缓存命中时不应重新获取")
+
+            news_list = restored.get_trending_news(10)
+            self.assertEqual(news_list[0]['id'], mock_news[0]['id'])
+            self.assertIsInstance(news_list[0]['publish_time'], datetime)
+            self.assertEqual(restored.get_trending_topics(), self.analyzer.get_trending_topics())
+        print("✅ 新闻快照测试通过")
+
+    def test_snapshot_during_deduplication(self):
+        """测试去重索引增长时保存快照不会因字典变化而失败"""
+        import tempfile
+        import threading
+
+        news_list = [{'title': f'并发快照测试新闻第{i}条'} for i in range(3000)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.analyzer.snapshot_file = os.path.join(tmp_dir, 'news_snapshot.bin')
+            self.analyzer._news_cache = [{'id': 1, 'title': '占位', 'publish_time': datetime.now()}]
+            # 缩短线程切换间隔，让快照遍历更容易与索引写入交错
+            interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+            try:
+                worker = threading.Thread(target=self.analyzer._deduplicate_news, args=(news_list,))
+                worker.start()
+                while worker.is_alive():
+                    self.analyzer.save_snapshot()
+                worker.join()
+            finally:
+                sys.setswitchinterval(interval)
+        print("✅ 去重与快照并发测试通过")
+
 class TestArticleWriter(unittest.TestCase):
     """文章撰写器测试"""
     
     def setUp(self):
         """设置测试环境"""
+        self.enterContext(isolated_storage())
         from src.article_writer import ArticleWriter
         self.writer = ArticleWriter()
     
@@ -133,6 +196,43 @@ class TestArticleWriter(unittest.TestCase):
         self.assertGreater(len(article_content), 100)
         print("✅ 文章生成测试通过")
     
+    def test_precomputed_analysis_reused(self):
+        """测试撰写多种类型文章时复用入库时的预计算分析"""
+        from src import text_analysis
+
+        mock_news = {
+            'id': 12346,
+            'title': '科技企业发布新一代芯片',
+            'content': '<p>某科技公司今日<b>宣布</b>发布新一代芯片，性能提升30%。</p>',
+            'summary': '<p>某科技公司今日<b>宣布</b>发布新一代芯片，性能提升30%。</p>',
+            'source': '测试来源',
+            'link': 'http://test.com/chip',
+            'publish_time': datetime.now()
+        }
+        text_analysis.precompute_analysis(mock_news)
+        self.assertNotIn('<', mock_news['summary_text'])
+        self.assertEqual(mock_news['analysis']['category'], '科技')
+
+        calls = []
+        original = text_analysis.analyze_news
+        text_analysis.analyze_news = lambda news_data: calls.append(news_data) or original(news_data)
+        try:
+            for article_type in ['breaking_news', 'analysis', 'feature']:
+                result = self.writer.write_article(mock_news, article_type=article_type)
+                self.assertIsInstance(result, dict)
+                self.assertEqual(result['analysis']['key_points'], mock_news['analysis']['key_points'])
+        finally:
+            text_analysis.analyze_news = original
+
+        self.assertEqual(calls, [])
+        # 保存的摘要和备用文章使用纯文本摘要，不带原始HTML
+        from src.database import get_database_manager
+        saved = get_database_manager().get_article_by_id(result['article_id'])
+        self.assertEqual(saved['summary'], mock_news['summary_text'])
+        self.assertIn(mock_news['summary_text'], self.writer._generate_fallback_article(mock_news))
+        self.assertNotIn('<b>', self.writer._generate_fallback_article(mock_news))
+        print("✅ 预计算分析复用测试通过")
+
     def test_article_templates(self):
         """测试文章模板"""
         try:
@@ -147,6 +247,9 @@ class TestArticleWriter(unittest.TestCase):
 
 class TestArticleQuality(unittest.TestCase):
     """文章质量评估测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
     
     def test_quality_assessment(self):
         """测试质量评估"""
@@ -174,11 +277,55 @@ class TestArticleQuality(unittest.TestCase):
         except ImportError:
             print("⚠️  文章质量评估模块不可用，跳过测试")
 
+    def test_section_attribution(self):
+        """测试低分归因到具体章节，并只重写这些章节"""
+        from src.article_quality import assess_article_quality, split_sections
+        from src.article_writer import ArticleWriter
+        from tests.fakes import FakeChatClient
+
+        strong = ('据新华社报道，专家分析认为，2024年市场数据显示行业增长12%，投资规模达300亿元。'
+                  '因此，政策和技术创新将继续推动改革与合作。此外，多家机构的研究表明发展趋势向好。') * 2
+        content = f"## 开篇\n\n简短。\n\n## 核心内容\n\n{strong}\n\n## 结尾\n\n完。"
+        news = {
+            'id': 33445,
+            'title': '章节改进测试新闻',
+            'content': '某公司宣布完成新一轮融资。',
+            'summary': '章节改进测试摘要',
+            'source': '测试来源',
+            'link': 'http://test.com/sections',
+            'publish_time': datetime.now()
+        }
+
+        writer = ArticleWriter()
+        quality = assess_article_quality(writer._format_article('测试标题', content, news), news)
+        weak = [section['heading'] for section in quality['sections'] if section['weak']]
+        self.assertEqual(weak, ['开篇', '结尾'])
+
+        def responder(prompt):
+            heading = '开篇' if '“开篇”' in prompt else '结尾'
+            return f'## {heading}\n\n改写后的{heading}：{strong}'
+
+        client = FakeChatClient(delay=0, responder=responder)
+        writer.ai_clients['openai'] = client
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+
+        improved, headings = writer._improve_weak_sections('测试标题', content, quality)
+        sections = split_sections(improved)
+        self.assertEqual(headings, ['开篇', '结尾'])
+        self.assertEqual(len(client.calls), 2)
+        self.assertEqual([section['heading'] for section in sections], ['开篇', '核心内容', '结尾'])
+        self.assertTrue(sections[0]['body'].startswith('改写后的开篇'))
+        self.assertEqual(sections[1]['body'], strong)
+        self.assertTrue(sections[2]['body'].startswith('改写后的结尾'))
+        print("✅ 章节级改进测试通过")
+
 class TestDatabase(unittest.TestCase):
     """数据库功能测试"""
     
     def setUp(self):
         """设置测试环境"""
+        self.enterContext(isolated_storage())
         try:
             from src.database import get_database_manager
             self.db_manager = get_database_manager()
@@ -244,6 +391,9 @@ class TestDatabase(unittest.TestCase):
 
 class TestWebInterface(unittest.TestCase):
     """Web界面测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
     
     def test_web_app_creation(self):
         """测试Web应用创建"""
@@ -266,6 +416,9 @@ class TestWebInterface(unittest.TestCase):
 
 class TestIntegration(unittest.TestCase):
     """集成测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
     
     def test_end_to_end_workflow(self):
         """测试端到端工作流程"""
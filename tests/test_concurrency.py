@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发控制测试
+"""
+
+import time
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.singleflight import SingleFlight
+from tests.fakes import FakeChatClient
+from tests.storage import isolated_storage
+
+class TestSingleFlight(unittest.TestCase):
+    """请求合并测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def test_concurrent_calls_share_result(self):
+        """测试并发调用只执行一次并共享结果"""
+        flight = SingleFlight()
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return ['news']
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(flight.do, 'trending', slow_fetch) for _ in range(8)]
+            results = [future.result() for future in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == ['news'] for result in results))
+        self.assertEqual(flight.stats['shared'], 7)
+        self.assertFalse(flight.in_flight('trending'))
+        print("✅ 请求合并测试通过")
+
+    def test_error_propagates_to_waiters(self):
+        """测试领头调用的异常传递给所有等待者"""
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def failing_fetch():
+            started.set()
+            time.sleep(0.05)
+            raise RuntimeError("获取失败")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(flight.do, 'trending', failing_fetch)
+            started.wait()
+            follower = executor.submit(flight.do, 'trending', failing_fetch)
+            with self.assertRaises(RuntimeError):
+                leader.result()
+            with self.assertRaises(RuntimeError):
+                follower.result()
+        print("✅ 请求合并异常传递测试通过")
+
+    def test_news_analyzer_coalesces_refresh(self):
+        """测试NewsAnalyzer在缓存失效时只发起一次获取"""
+        from datetime import datetime
+        from src.news_analyzer import NewsAnalyzer
+        from src.cache import LRUCache, TieredCache
+
+        analyzer = NewsAnalyzer()
+        analyzer.cache = TieredCache(LRUCache())
+        analyzer.snapshot_interval = 0
+        analyzer._news_cache = []
+        analyzer._cache_limit = 0
+        fetches = []
+
+        def fake_fetch(limit):
+            fetches.append(limit)
+            time.sleep(0.1)
+            return [{'id': i, 'title': f'新闻{i}', 'summary': '', 'publish_time': datetime.now()}
+                    for i in range(limit)]
+
+        analyzer._fetch_trending_news = fake_fetch
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(lambda _: analyzer.get_trending_news(20), range(6)))
+
+        self.assertEqual(len(fetches), 1)
+        self.assertTrue(all(len(result) == 20 for result in results))
+        print("✅ 新闻刷新合并测试通过")
+
+class TestConcurrentGeneration(unittest.TestCase):
+    """并发生成测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def test_title_and_content_run_concurrently(self):
+        """测试标题和正文的LLM调用并发执行"""
+        from datetime import datetime
+        from src.article_writer import ArticleWriter
+
+        writer = ArticleWriter()
+        writer.ai_clients['openai'] = FakeChatClient(delay=0.3)
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+
+        news = {
+            'id': 54321,
+            'title': '并发生成测试新闻',
+            'content': '某公司宣布完成新一轮融资，金额达10亿元。',
+            'summary': '并发生成测试摘要',
+            'source': '测试来源',
+            'link': 'http://test.com/concurrent-generation',
+            'publish_time': datetime.now()
+        }
+        result = writer.write_article(news)
+        timings = result['timings']
+
+        self.assertGreaterEqual(timings['title'], 0.3)
+        self.assertGreaterEqual(timings['content'], 0.3)
+        generation_wall = timings['total'] - timings.get('improve', 0) - timings['quality'] \
+            - timings['save'] - timings['analysis']
+        self.assertLess(generation_wall, timings['title'] + timings['content'] - 0.15)
+        print(f"✅ 并发生成测试通过 (timings: {timings})")
+
+    def test_sections_generated_concurrently(self):
+        """测试分章节模式：提纲一次，各章节并发生成并按顺序拼接"""
+        from datetime import datetime
+        from src.article_writer import ArticleWriter
+        from src.article_quality import split_sections
+
+        def responder(prompt):
+            if '规划提纲' in prompt:
+                return '\n'.join(f'{i + 1}. {name}：{name}要点' for i, name in enumerate(structure))
+            if '请只撰写其中的' in prompt:
+                name = prompt.split('请只撰写其中的“', 1)[1].split('”', 1)[0]
+                return f'{name}正文，本部分要点已覆盖。这是一句重复的公共结论文字。'
+            return '分章节测试标题'
+
+        writer = ArticleWriter()
+        structure = writer.article_templates['analysis']['structure']
+        client = FakeChatClient(delay=0.2, responder=responder)
+        writer.ai_clients['openai'] = client
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+        writer.sectioned_types = {'analysis'}
+
+        news = {
+            'id': 44556,
+            'title': '分章节生成测试新闻',
+            'content': '某公司宣布完成新一轮融资，金额达10亿元。',
+            'summary': '分章节生成测试摘要',
+            'source': '测试来源',
+            'link': 'http://test.com/sectioned',
+            'publish_time': datetime.now()
+        }
+        analysis = writer._analyze_news_content(news)
+        start = time.perf_counter()
+        content = writer._generate_content(news, analysis, 'analysis', 'professional')
+        elapsed = time.perf_counter() - start
+
+        sections = split_sections(content)
+        self.assertEqual([section['heading'] for section in sections], structure)
+        self.assertTrue(sections[1]['body'].startswith(f'{structure[1]}正文'))
+        # 重复句只保留第一次出现
+        self.assertEqual(content.count('这是一句重复的公共结论文字。'), 1)
+        self.assertEqual(len(client.calls), len(structure) + 1)
+        prompts = [call['messages'][0]['content'] for call in client.calls]
+        self.assertTrue(any(f'本部分要点：{structure[2]}要点' in prompt for prompt in prompts))
+        # 提纲一次 + 各章节并发一次，远小于逐节串行
+        self.assertLess(elapsed, 0.2 * 3)
+        print(f"✅ 分章节并发生成测试通过 ({elapsed:.2f}s)")
+
+    def test_shared_writer_is_thread_safe(self):
+        """测试多个线程共享一个撰写器：共用同一个路由器，同一新闻的多篇文章不会互相覆盖"""
+        from datetime import datetime
+        from src.article_writer import ArticleWriter
+
+        writer = ArticleWriter()
+        writer.ai_clients = {'openai': FakeChatClient(delay=0.05)}
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+        news = {
+            'id': 13579,
+            'title': '共享撰写器测试新闻',
+            'content': '某公司宣布完成新一轮融资，金额达10亿元。',
+            'summary': '共享撰写器测试摘要',
+            'source': '测试来源',
+            'link': 'http://test.com/shared-writer',
+            'publish_time': datetime.now()
+        }
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            routers = list(executor.map(lambda _: writer._get_router(), range(16)))
+            variants = [(article_type, style) for article_type in ('breaking_news', 'analysis', 'feature')
+                        for style in ('professional', 'casual')]
+            results = list(executor.map(lambda variant: writer.write_article(news, *variant), variants))
+
+        self.assertTrue(all(router is routers[0] for router in routers))
+        filenames = [result['filename'] for result in results]
+        self.assertEqual(len(set(filenames)), 6)
+
+        writer.ai_clients['backup'] = FakeChatClient(delay=0.05)
+        writer.set_ai_model('backup')
+        self.assertEqual(writer._get_router().providers[0].name, 'backup')
+        with self.assertRaises(ValueError):
+            writer.set_ai_model('missing')
+        print("✅ 共享撰写器线程安全测试通过")
+
+class TestDeadlineGeneration(unittest.TestCase):
+    """截止时间模式测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def _make_writer(self, delay):
+        from src.article_writer import ArticleWriter
+
+        writer = ArticleWriter()
+        writer.ai_clients['openai'] = FakeChatClient(delay=delay, content='AI升级后的正文内容。' * 30)
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+        return writer
+
+    def _news(self, news_id):
+        from datetime import datetime
+        return {
+            'id': news_id,
+            'title': f'截止时间测试新闻{news_id}',
+            'content': '某公司宣布完成新一轮融资，金额达10亿元。',
+            'summary': '截止时间测试摘要',
+            'source': '测试来源',
+            'link': f'http://test.com/deadline-{news_id}',
+            'publish_time': datetime.now()
+        }
+
+    def test_template_returned_then_upgraded(self):
+        """测试AI超时时先返回模板文章，AI完成后升级已保存的文件"""
+        import os
+
+        writer = self._make_writer(delay=0.5)
+        start = time.perf_counter()
+        result = writer.write_article(self._news(77001), deadline_ms=100)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(result['mode'], 'template')
+        self.assertTrue(result['upgrade_pending'])
+        self.assertLess(elapsed, 0.45)
+        self.assertNotIn('AI升级后的正文内容', result['article'])
+
+        filepath = os.path.join(writer.config.ARTICLES_DIR, result['filename'])
+        upgraded = False
+        for _ in range(50):
+            time.sleep(0.1)
+            with open(filepath, 'r', encoding='utf-8') as f:
+                if 'AI升级后的正文内容' in f.read():
+                    upgraded = True
+                    break
+        self.assertTrue(upgraded)
+        print(f"✅ 截止时间模板先行测试通过 ({elapsed:.2f}s)")
+
+    def test_ai_result_within_deadline(self):
+        """测试AI在截止时间内完成时直接返回AI文章"""
+        writer = self._make_writer(delay=0.05)
+        result = writer.write_article(self._news(77002), deadline_ms=5000)
+
+        self.assertEqual(result['mode'], 'ai')
+        self.assertFalse(result['upgrade_pending'])
+        self.assertIn('AI升级后的正文内容', result['article'])
+        self.assertIn('template', result['timings'])
+        print("✅ 截止时间内AI完成测试通过")
+
+    def test_upgrade_when_ai_finishes_during_save(self):
+        """测试超时后AI在保存模板文章期间完成，仍然升级文章"""
+        import os
+
+        writer = self._make_writer(delay=0.2)
+        save = writer._save_article_to_file
+        saves = []
+
+        def slow_first_save(*args, **kwargs):
+            saves.append(kwargs.get('filename'))
+            if len(saves) == 1:
+                time.sleep(0.6)
+            return save(*args, **kwargs)
+        writer._save_article_to_file = slow_first_save
+
+        result = writer.write_article(self._news(77003), deadline_ms=50)
+
+        self.assertEqual(result['mode'], 'template')
+        self.assertTrue(result['upgrade_pending'])
+        for _ in range(50):
+            if len(saves) > 1:
+                break
+            time.sleep(0.1)
+        with open(os.path.join(writer.config.ARTICLES_DIR, result['filename']), 'r', encoding='utf-8') as f:
+            self.assertIn('AI升级后的正文内容', f.read())
+        print("✅ 保存期间AI完成的升级测试通过")
+
+    def test_mode_reports_template_fallback(self):
+        """测试AI生成正文失败退回模板时，结果中的模式为template"""
+        def fail(prompt):
+            raise RuntimeError('服务不可用')
+
+        writer = self._make_writer(delay=0)
+        writer.ai_clients['openai'] = FakeChatClient(delay=0, responder=fail)
+
+        self.assertEqual(writer.write_article(self._news(77004))['mode'], 'template')
+        result = writer.write_article(self._news(77005), deadline_ms=5000)
+        self.assertEqual(result['mode'], 'template')
+        self.assertFalse(result['upgrade_pending'])
+        print("✅ 模板退回模式测试通过")
+
+class TestIdempotentGeneration(unittest.TestCase):
+    """幂等生成测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+        from src.database import get_database_manager
+        if not get_database_manager().available:
+            self.skipTest("数据库不可用")
+
+    def _make_writer(self):
+        from src.article_writer import ArticleWriter
+
+        writer = ArticleWriter()
+        self.client = FakeChatClient(delay=0.2)
+        writer.ai_clients = {'openai': self.client}
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+        return writer
+
+    def _news(self):
+        import uuid
+        from datetime import datetime
+        news_id = uuid.uuid4().hex
+        return {
+            'id': news_id,
+            'title': '幂等生成测试新闻',
+            'content': '某公司宣布完成新一轮融资，金额达10亿元。',
+            'summary': '幂等生成测试摘要',
+            'source': '测试来源',
+            'link': f'http://test.com/idempotent/{news_id}',
+            'publish_time': datetime.now()
+        }
+
+    def test_duplicates_reuse_article(self):
+        """测试并发的重复请求只生成一次，之后的请求直接复用"""
+        writer = self._make_writer()
+        news = self._news()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: writer.write_article(news), range(4)))
+        generation_calls = len(self.client.calls)
+
+        ids = {result['article_id'] for result in results}
+        self.assertEqual(len(ids), 1)
+        self.assertEqual(len({result['filename'] for result in results}), 1)
+        self.assertEqual(writer._inflight.stats['executed'], 1)
+
+        start = time.perf_counter()
+        again = writer.write_article(news)
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertTrue(again['reused'])
+        self.assertEqual(again['article_id'], results[0]['article_id'])
+        self.assertEqual(again['article'], results[0]['article'])
+        self.assertEqual(len(self.client.calls), generation_calls)
+
+        # 其他文章类型不受影响
+        other = writer.write_article(news, article_type='analysis')
+        self.assertFalse(other['reused'])
+        print("✅ 幂等复用测试通过")
+
+    def test_regenerate_replaces_article(self):
+        """测试regenerate生成新文章，之后的请求复用新文章；删除后重新生成"""
+        from src.database import get_database_manager
+
+        writer = self._make_writer()
+        news = self._news()
+        first = writer.write_article(news)
+        regenerated = writer.write_article(news, regenerate=True)
+        self.assertFalse(regenerated['reused'])
+        self.assertNotEqual(regenerated['article_id'], first['article_id'])
+
+        reused = writer.write_article(news)
+        self.assertEqual(reused['article_id'], regenerated['article_id'])
+
+        get_database_manager().delete_article(regenerated['article_id'])
+        after_delete = writer.write_article(news)
+        self.assertFalse(after_delete['reused'])
+        print("✅ 重新生成测试通过")
+
+    def test_concurrent_regenerate_is_atomic(self):
+        """测试并发的重新生成合并为一次，幂等键在同一事务中移到新文章"""
+        from src.database import get_database_manager
+
+        writer = self._make_writer()
+        news = self._news()
+        first = writer.write_article(news)
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(lambda _: writer.write_article(news, regenerate=True), range(6)))
+
+        ids = {result['article_id'] for result in results}
+        self.assertEqual(len(ids), 1)
+        self.assertNotIn(None, ids)
+        self.assertNotIn(first['article_id'], ids)
+        key = writer._idempotency_key(news, 'breaking_news', 'professional')
+        self.assertEqual(get_database_manager().get_article_by_idempotency_key(key)['id'], ids.pop())
+        print("✅ 并发重新生成测试通过")
+
+    def test_conflict_returns_saved_article(self):
+        """测试生成期间其他进程先保存了同一幂等键的文章时，返回那篇文章而不是冒用其ID"""
+        from src.database import IdempotencyConflict, get_database_manager
+
+        db_manager = get_database_manager()
+        writer = self._make_writer()
+        news = self._news()
+        key = writer._idempotency_key(news, 'breaking_news', 'professional')
+        other_id = []
+
+        def responder(prompt):
+            # 模拟另一个进程在本次生成期间保存了同一篇文章
+            if not other_id:
+                other_id.append(db_manager.save_article({'title': '其他进程的文章', 'content': '其他进程的正文',
+                                                         'idempotency_key': key}))
+            return '## 导语\n\n模拟生成的内容。'
+        writer.ai_clients['openai'] = FakeChatClient(delay=0, responder=responder)
+
+        result = writer.write_article(news)
+
+        self.assertTrue(result['reused'])
+        self.assertEqual(result['article_id'], other_id[0])
+        self.assertEqual(result['title'], '其他进程的文章')
+        with self.assertRaises(IdempotencyConflict):
+            db_manager.save_article({'title': '重复', 'content': '重复', 'idempotency_key': key})
+        print("✅ 幂等键冲突测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多来源综述测试
+"""
+
+import uuid
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest import mock
+
+from src.article_writer import ArticleWriter
+from src.digest import group_stories, merge_story, story_id
+from tests.fakes import FakeChatClient
+from tests.storage import isolated_storage
+
+def _story_news():
+    batch = uuid.uuid4().hex[:8]
+    news = [
+        ('新华社', '某科技公司完成10亿元融资 将投入芯片研发', '某科技公司今日宣布完成10亿元融资，由多家机构领投。'),
+        ('财经网', '某科技公司完成10亿元融资 估值超百亿', '据悉，本轮融资后公司估值超过100亿元。'),
+        ('科技日报', '某科技公司10亿元融资落地 芯片研发提速', '公司表示，资金将用于人工智能芯片研发，预计明年量产。'),
+        ('新华社', '某科技公司完成10亿元融资 新华社追踪报道', '同一来源的后续报道。'),
+        ('体育报', '国足公布新一期集训名单', '国家足球队今日公布新一期集训名单。'),
+    ]
+    return [{
+        'id': f'{batch}-{i}',
+        'title': title,
+        'content': f'{content}（批次{batch}）',
+        'summary': content[:20],
+        'source': source,
+        'link': f'http://test.com/digest/{batch}/{i}',
+        'publish_time': datetime.now()
+    } for i, (source, title, content) in enumerate(news)]
+
+class TestStoryGrouping(unittest.TestCase):
+    """事件分组测试"""
+
+    def test_group_related_items(self):
+        """测试同一事件的不同来源归为一组，同一来源只保留一条"""
+        news = _story_news()
+        stories = group_stories(news, threshold=0.3)
+
+        self.assertEqual([item['source'] for item in stories[0]], ['新华社', '财经网', '科技日报'])
+        self.assertEqual(stories[1][0]['source'], '体育报')
+        self.assertEqual(len(group_stories(news, max_sources=2)[0]), 2)
+
+        merged = merge_story(stories[0], ['摘要一', '摘要二', '摘要三'])
+        self.assertEqual(merged['id'], story_id(list(reversed(stories[0]))))
+        self.assertEqual(merged['source'], '新华社、财经网、科技日报')
+        self.assertIn('【财经网】摘要二', merged['content'])
+        print("✅ 事件分组测试通过")
+
+class TestDigestWriting(unittest.TestCase):
+    """综述撰写测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def test_map_reduce_with_cached_summaries(self):
+        """测试各来源并发摘要后基于摘要撰写，重新生成时复用来源摘要"""
+        prompts = []
+
+        def responder(prompt):
+            prompts.append(prompt)
+            if '概括以下新闻报道' in prompt:
+                source = prompt.split('来源：')[1].split('\n')[0].strip()
+                return f'{source}的事实摘要'
+            if '生成一个吸引人的中文标题' in prompt:
+                return '多家媒体聚焦某科技公司融资'
+            return '## 导语\n\n综合多家媒体报道，某科技公司完成融资。' * 10
+
+        writer = ArticleWriter()
+        writer.ai_clients = {'openai': FakeChatClient(delay=0.01, responder=responder)}
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+        items = group_stories(_story_news())[0]
+
+        result = writer.write_digest(items)
+
+        self.assertEqual(result['mode'], 'ai')
+        self.assertEqual(result['title'], '多家媒体聚焦某科技公司融资')
+        self.assertEqual([source['summary'] for source in result['sources']],
+                         ['新华社的事实摘要', '财经网的事实摘要', '科技日报的事实摘要'])
+        reduce_prompt = next(prompt for prompt in prompts if '综合各来源撰写' in prompt)
+        self.assertIn('【财经网】财经网的事实摘要', reduce_prompt)
+        self.assertNotIn(items[0]['content'], reduce_prompt)
+        self.assertEqual(sum('概括以下新闻报道' in prompt for prompt in prompts), 3)
+
+        # 相同来源再次撰写直接返回已有综述（带回来源摘要和生成方式）；重新生成时来源摘要来自缓存
+        reused = writer.write_digest(items)
+        self.assertTrue(reused['reused'])
+        self.assertEqual(reused['mode'], 'ai')
+        self.assertEqual(reused['sources'], result['sources'])
+        prompts.clear()
+        regenerated = writer.write_digest(items, regenerate=True)
+        self.assertFalse(any('概括以下新闻报道' in prompt for prompt in prompts))
+        self.assertNotEqual(regenerated['article_id'], result['article_id'])
+        print(f"✅ 综述map-reduce测试通过 (耗时: {result['timings']})")
+
+    def test_concurrent_digests_write_once(self):
+        """测试并发撰写同一事件的综述只生成一次，都返回同一篇文章"""
+        prompts = []
+
+        def responder(prompt):
+            prompts.append(prompt)
+            if '概括以下新闻报道' in prompt:
+                return '来源事实摘要'
+            if '生成一个吸引人的中文标题' in prompt:
+                return '并发综述标题'
+            return '## 导语\n\n并发撰写的综述正文。' * 10
+
+        writer = ArticleWriter()
+        writer.ai_clients = {'openai': FakeChatClient(delay=0.05, responder=responder)}
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+        items = group_stories(_story_news())[0]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: writer.write_digest(items), range(4)))
+
+        self.assertEqual(len({result['article_id'] for result in results}), 1)
+        self.assertEqual(sum('综合各来源撰写' in prompt for prompt in prompts), 1)
+        self.assertTrue(all(result['sources'] == results[0]['sources'] for result in results))
+        print("✅ 综述并发合并测试通过")
+
+    def test_template_mode_and_endpoint(self):
+        """测试模板模式下用抽取式摘要撰写综述，以及事件和综述接口"""
+        from src.web_interface import create_app
+
+        news = _story_news()
+        with mock.patch('src.news_analyzer.NewsAnalyzer.get_trending_news', return_value=news), \
+                mock.patch.object(ArticleWriter, '_is_ai_available', return_value=False):
+            app = create_app()
+            client = app.test_client()
+
+            stories = client.get('/api/stories').get_json()['data']
+            self.assertEqual(len(stories), 1)
+            self.assertEqual(stories[0]['sources'], ['新华社', '财经网', '科技日报'])
+
+            response = client.post('/api/write_digest', json={'story_index': 0})
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()['data']
+            self.assertEqual(data['mode'], 'template')
+            self.assertEqual(data['sources'][2]['summary'], news[2]['content'])
+
+            reused = client.post('/api/write_digest', json={'story_index': 0}).get_json()['data']
+            self.assertTrue(reused['reused'])
+            self.assertEqual((reused['mode'], reused['sources']), ('template', data['sources']))
+
+            self.assertEqual(client.post('/api/write_digest', json={'story_index': 'abc'}).status_code, 400)
+            self.assertEqual(client.post('/api/write_digest', data='{bad json',
+                                         content_type='application/json').status_code, 400)
+            self.assertEqual(client.post('/api/write_digest', json={'story_index': 5}).status_code, 404)
+
+            response = client.post('/api/write_digest', json={'news_ids': [news[0]['id'], 'missing-id']})
+            self.assertEqual(response.status_code, 404)
+            app.job_manager.stop()
+        print("✅ 综述接口测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
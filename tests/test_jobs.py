@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务测试
+"""
+
+import json
+import time
+import threading
+import unittest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from src.jobs import InvalidWebhook, JobManager, JobQueueFull, check_webhook_url
+from tests.storage import isolated_storage
+
+def _wait_for(job, timeout=10):
+    deadline = time.time() + timeout
+    while job.status in ('queued', 'running') and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+class TestJobManager(unittest.TestCase):
+    """任务管理器测试"""
+
+    def test_job_lifecycle(self):
+        """测试任务执行、阶段耗时和失败状态"""
+        def handler(payload):
+            if payload.get('fail'):
+                raise ValueError('生成失败')
+            time.sleep(0.05)
+            return {'title': payload['title'], 'timings': {'content': 0.05}}
+
+        manager = JobManager(handler, workers=2, queue_size=10)
+        try:
+            ok = _wait_for(manager.submit({'title': '任务测试'}))
+            failed = _wait_for(manager.submit({'fail': True}))
+        finally:
+            manager.stop()
+
+        self.assertEqual(ok.status, 'succeeded')
+        self.assertEqual(ok.result['title'], '任务测试')
+        self.assertIn('queued', ok.timings)
+        self.assertGreaterEqual(ok.timings['run'], 0.05)
+        self.assertEqual(ok.timings['content'], 0.05)
+        self.assertEqual(failed.status, 'failed')
+        self.assertIn('生成失败', failed.error)
+        print("✅ 任务生命周期测试通过")
+
+    def test_bounded_queue(self):
+        """测试队列满时拒绝提交，吞吐量受工作线程数限制"""
+        release = threading.Event()
+        running = []
+
+        def handler(payload):
+            running.append(payload)
+            release.wait(5)
+            return {}
+
+        manager = JobManager(handler, workers=1, queue_size=2)
+        try:
+            first = manager.submit({'n': 1})
+            while not running:
+                time.sleep(0.01)
+            manager.submit({'n': 2})
+            manager.submit({'n': 3})
+            with self.assertRaises(JobQueueFull):
+                manager.submit({'n': 4})
+            self.assertEqual(manager.get_stats()['running'], 1)
+            release.set()
+            _wait_for(first)
+        finally:
+            release.set()
+            manager.stop()
+
+        self.assertEqual(len(running), 3)
+        print("✅ 有界队列测试通过")
+
+    def test_webhook(self):
+        """测试任务完成后回调通知"""
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers['Content-Length'])
+                received.append(json.loads(self.rfile.read(length)))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        manager = JobManager(lambda payload: {'ok': True}, workers=1, webhook_allowed_hosts=['127.0.0.1'])
+        try:
+            url = f'http://127.0.0.1:{server.server_address[1]}/hook'
+            job = manager.submit({}, webhook=url)
+            manager.stop()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(job.webhook_status, 204)
+        self.assertEqual(received[0]['job_id'], job.id)
+        self.assertEqual(received[0]['result'], {'ok': True})
+        print("✅ 任务回调测试通过")
+
+    def test_webhook_validation(self):
+        """测试回调地址只允许http(s)公网地址或允许列表中的主机"""
+        for url in ['ftp://example.com/hook', 'http:///hook', 'http://127.0.0.1:8080/hook',
+                    'http://localhost/hook', 'http://10.0.0.5/hook', 'http://169.254.169.254/latest',
+                    'http://[::1]/hook']:
+            with self.assertRaises(InvalidWebhook, msg=url):
+                check_webhook_url(url)
+
+        self.assertEqual(check_webhook_url('http://8.8.8.8/hook'), 'http://8.8.8.8/hook')
+        self.assertEqual(check_webhook_url('http://10.0.0.5/hook', ['10.0.0.5']), 'http://10.0.0.5/hook')
+        with self.assertRaises(InvalidWebhook):
+            check_webhook_url('http://8.8.8.8/hook', ['hooks.example.com'])
+
+        manager = JobManager(lambda payload: {}, workers=1)
+        with self.assertRaises(InvalidWebhook):
+            manager.submit({}, webhook='http://127.0.0.1/hook')
+        self.assertEqual(manager.get_stats()['queued'], 0)
+        print("✅ 回调地址校验测试通过")
+
+class TestJobEndpoints(unittest.TestCase):
+    """任务接口测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def test_submit_and_poll(self):
+        """测试提交任务后轮询获取结果（模板模式）"""
+        from src.web_interface import create_app
+        from src.article_writer import ArticleWriter
+
+        news = {
+            'id': 13579,
+            'title': '后台任务测试新闻',
+            'content': '某公司宣布完成新一轮融资，金额达10亿元。',
+            'summary': '后台任务测试摘要',
+            'source': '测试来源',
+            'link': 'http://test.com/jobs',
+            'publish_time': datetime.now()
+        }
+
+        with mock.patch('src.news_analyzer.NewsAnalyzer.get_trending_news', return_value=[news]), \
+                mock.patch.object(ArticleWriter, '_is_ai_available', return_value=False):
+            app = create_app()
+            client = app.test_client()
+
+            response = client.post('/api/jobs', json={'news_id': 13579, 'article_type': 'analysis'})
+            self.assertEqual(response.status_code, 202)
+            job_id = response.get_json()['data']['job_id']
+
+            _wait_for(app.job_manager.get(job_id))
+            data = client.get(f'/api/jobs/{job_id}').get_json()['data']
+
+            self.assertEqual(client.post('/api/jobs', json={'news_id': 1}).status_code, 404)
+            self.assertEqual(client.get('/api/jobs/unknown').status_code, 404)
+            app.job_manager.stop()
+
+        self.assertEqual(data['status'], 'succeeded')
+        self.assertTrue(data['result']['filename'])
+        self.assertIn('analysis', data['timings'])
+        print("✅ 任务接口测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
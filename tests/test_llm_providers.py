@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多服务商路由测试
+"""
+
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import openai
+
+from src.llm_providers import (ClaudeProvider, GeminiProvider, HTTPPoolSettings, LLMRouter, OpenAIProvider,
+                               create_http_session, create_openai_http_client)
+from src.rate_limiter import LLMRateLimiter
+from tests.fakes import FakeChatClient
+from tests.storage import isolated_storage
+from tests.stub_llm_server import StubLLMServer
+
+class TestProviders(unittest.TestCase):
+    """服务商接口测试"""
+
+    def test_claude_and_gemini_formats(self):
+        """测试Claude和Gemini格式的调用"""
+        with StubLLMServer(responses={'你好': '模拟回复'}) as server:
+            claude = ClaudeProvider('stub-key', 'claude-test', server.base_url)
+            gemini = GeminiProvider('stub-key', 'gemini-test', server.base_url)
+
+            self.assertEqual(claude.call('你好', 100, 0.7), '模拟回复')
+            self.assertEqual(gemini.call('你好', 100, 0.7), '模拟回复')
+        self.assertEqual(claude.sample_count(), 1)
+        print("✅ Claude/Gemini接口测试通过")
+
+    def test_token_bucket_corrected_from_usage(self):
+        """测试经限流器调用后按服务商返回的实际用量校正token桶，而不是一直扣除预估值"""
+        limiter = LLMRateLimiter(tokens_per_minute=6000)
+        with StubLLMServer(responses={'你好': '模拟回复'}) as server:
+            claude = ClaudeProvider('stub-key', 'claude-test', server.base_url, rate_limiter=limiter)
+            result = claude.invoke('你好', 1000, 0.7)
+
+        self.assertEqual(result.total_tokens, len('你好') + len('模拟回复'))
+        # 预估扣除了提示词长度 + 1000，校正后只剩实际用量（期间补充的令牌不超过容量）
+        self.assertGreater(limiter.token_bucket._tokens, limiter.token_bucket.capacity - 100)
+        print("✅ token桶用量校正测试通过")
+
+class TestHTTPPool(unittest.TestCase):
+    """HTTP连接池测试"""
+
+    def test_pool_sized_from_config(self):
+        """测试连接池大小默认取并发上限和线程数中的较大值"""
+        from types import SimpleNamespace
+
+        settings = HTTPPoolSettings(SimpleNamespace(
+            LLM_HTTP_MAX_CONNECTIONS=0, LLM_HTTP_MAX_KEEPALIVE=0, LLM_HTTP_KEEPALIVE_EXPIRY=30,
+            LLM_MAX_CONCURRENCY=16, LLM_MAX_WORKERS=24, LLM_CONNECT_TIMEOUT=5, LLM_READ_TIMEOUT=0,
+            REQUEST_TIMEOUT=30))
+        self.assertEqual(settings.max_connections, 24)
+        self.assertEqual(settings.max_keepalive, 24)
+        self.assertEqual(settings.timeout, (5, 30))
+
+        session = create_http_session(max_connections=6)
+        adapter = session.get_adapter('https://api.anthropic.com')
+        self.assertEqual(adapter._pool_maxsize, 6)
+        self.assertTrue(adapter._pool_block)
+        print("✅ 连接池配置测试通过")
+
+    def test_pooled_clients_reuse_connections(self):
+        """测试共享连接池下的并发调用"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with StubLLMServer(responses={'你好': '模拟回复'}) as server:
+            session = create_http_session(max_connections=4)
+            claude = ClaudeProvider('stub-key', 'claude-test', server.base_url, session=session)
+            client = openai.OpenAI(api_key='stub', base_url=server.url, max_retries=0,
+                                   http_client=create_openai_http_client(4, timeout=(2.0, 10.0)))
+            provider = OpenAIProvider(client, 'stub')
+
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda i: (claude if i % 2 else provider).call('你好', 50, 0.7),
+                                        range(16)))
+
+        self.assertEqual(results, ['模拟回复'] * 16)
+        self.assertIs(claude.session, session)
+        print("✅ 共享连接池并发调用测试通过")
+
+class TestLLMRouter(unittest.TestCase):
+    """路由与对冲测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def test_hedged_request(self):
+        """测试主服务商过慢时对冲请求，先返回者胜出"""
+        with StubLLMServer(latency=1.0, responses={'对冲': '慢'}) as slow, \
+                StubLLMServer(latency=0.05, responses={'对冲': '快'}) as fast:
+            primary = OpenAIProvider(openai.OpenAI(api_key='stub', base_url=slow.url, max_retries=0), 'stub')
+            secondary = ClaudeProvider('stub-key', 'claude-test', fast.base_url)
+            router = LLMRouter([primary, secondary], hedge_delay=0.1)
+
+            start = time.perf_counter()
+            text = router.complete('对冲测试', 100, 0.7)
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(text, '快')
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(router.stats['hedged'], 1)
+        self.assertEqual(router.stats['hedge_wins'], 1)
+        print(f"✅ 对冲请求测试通过 ({elapsed:.2f}s)")
+
+    def test_latency_aware_ranking_and_failover(self):
+        """测试按延迟排序以及失败时切换服务商"""
+        with StubLLMServer(error_rate_500=1.0) as broken, \
+                StubLLMServer(responses={'切换': '备用服务商'}) as healthy:
+            primary = GeminiProvider('stub-key', 'gemini-test', broken.base_url)
+            secondary = ClaudeProvider('stub-key', 'claude-test', healthy.base_url)
+            router = LLMRouter([primary, secondary], hedge_enabled=False)
+
+            self.assertEqual(router.complete('切换测试', 100, 0.7), '备用服务商')
+            self.assertEqual(router.stats['failovers'], 1)
+            # 刚失败的服务商排到后面
+            self.assertIs(router.ranked()[0], secondary)
+
+        slow = ClaudeProvider('k', 'slow', 'http://127.0.0.1:9')
+        quick = ClaudeProvider('k', 'quick', 'http://127.0.0.1:9')
+        for _ in range(5):
+            slow.record_latency(2.0)
+            quick.record_latency(0.5)
+        self.assertIs(LLMRouter([slow, quick]).ranked()[0], quick)
+        print("✅ 延迟排序与故障切换测试通过")
+
+    def test_cache_keyed_on_answering_model(self):
+        """测试故障切换后的回复按实际回答的模型缓存，重建路由器时共用线程池"""
+        from src.article_writer import ArticleWriter
+
+        class MemoryCache(dict):
+            def set(self, key, value):
+                self[key] = value
+
+        def fail(prompt):
+            raise RuntimeError('服务不可用')
+
+        writer = ArticleWriter()
+        writer.ai_clients = {
+            'openai': OpenAIProvider(FakeChatClient(delay=0, responder=fail), 'gpt-primary'),
+            'backup': OpenAIProvider(FakeChatClient(delay=0, content='备用回复'), 'gpt-backup', name='backup')
+        }
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = MemoryCache()
+        first_router = writer._get_router()
+
+        self.assertEqual(writer._chat_completion('缓存键测试', 100, 0.7), '备用回复')
+        self.assertIn(writer._llm_cache_key('gpt-backup', 0.7, 100, '缓存键测试'), writer.llm_cache)
+        self.assertNotIn(writer._llm_cache_key('gpt-primary', 0.7, 100, '缓存键测试'), writer.llm_cache)
+
+        writer.set_ai_model('backup')
+        self.assertIsNot(writer._get_router(), first_router)
+        self.assertIs(writer._get_router().executor, first_router.executor)
+        print("✅ 按回答模型缓存测试通过")
+
+    def test_writer_uses_configured_providers(self):
+        """测试只配置Claude时撰写器通过Claude生成"""
+        from src.config import get_config
+        from src.article_writer import ArticleWriter
+
+        config = get_config()
+        with StubLLMServer() as server, \
+                mock.patch.object(config, 'OPENAI_API_KEY', None), \
+                mock.patch.object(config, 'CLAUDE_API_KEY', 'stub-key'), \
+                mock.patch.object(config, 'CLAUDE_BASE_URL', server.base_url), \
+                mock.patch.object(config, 'LLM_CACHE_ENABLED', False):
+            writer = ArticleWriter()
+            news = {
+                'id': 11223,
+                'title': '多服务商测试新闻',
+                'content': '某公司宣布完成新一轮融资，金额达10亿元。',
+                'summary': '多服务商测试摘要',
+                'source': '测试来源',
+                'link': 'http://test.com/providers',
+                'publish_time': datetime.now()
+            }
+            result = writer.write_article(news)
+
+        self.assertEqual(writer.current_ai_model, 'claude')
+        self.assertIn('多服务商测试新闻', result['title'])
+        self.assertGreaterEqual(server.stats['requests'], 2)
+        print("✅ 撰写器多服务商测试通过")
+
+    def test_providers_share_configured_limiters(self):
+        """测试Claude、Gemini使用按配置创建、在撰写器之间共享的限流器，令牌桶与OpenAI互不共用"""
+        from src.config import get_config
+        from src.article_writer import ArticleWriter
+        from src.rate_limiter import create_rate_limiter, get_rate_limiter
+
+        config = get_config()
+        with mock.patch.object(config, 'CLAUDE_API_KEY', 'stub-key'), \
+                mock.patch.object(config, 'GEMINI_API_KEY', 'stub-key'):
+            first, second = ArticleWriter(), ArticleWriter()
+
+        for name in ('claude', 'gemini'):
+            limiter = first.ai_clients[name].rate_limiter
+            self.assertIs(limiter, second.ai_clients[name].rate_limiter)
+            self.assertIs(limiter, get_rate_limiter(name))
+            self.assertIsNot(limiter, get_rate_limiter())
+            self.assertEqual(limiter.max_retries, config.LLM_MAX_RETRIES)
+            self.assertEqual(limiter.concurrency.maximum, config.LLM_MAX_CONCURRENCY)
+
+        with mock.patch.object(config, 'LLM_REQUESTS_PER_MINUTE', 30), \
+                mock.patch.object(config, 'LLM_TOKENS_PER_MINUTE', 6000):
+            limiter = create_rate_limiter(name='claude')
+        self.assertEqual(limiter.request_bucket.capacity, 30)
+        self.assertEqual(limiter.token_bucket.capacity, 6000)
+        print("✅ 服务商共享限流器测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
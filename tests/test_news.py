@@ -6,7 +6,18 @@
 
 from src.news_analyzer import NewsAnalyzer
 from src.article_writer import ArticleWriter
+from contextlib import ExitStack
 from datetime import datetime
+from tests.storage import isolated_storage
+
+_storage = ExitStack()
+
+def setup_function(function):
+    """每个测试使用临时数据库和文章目录"""
+    _storage.enter_context(isolated_storage())
+
+def teardown_function(function):
+    _storage.close()
 
 def test_news_analyzer():
     """测试新闻分析器"""
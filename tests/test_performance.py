@@ -7,9 +7,21 @@
 
 import time
 import statistics
+from contextlib import ExitStack
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from tests.storage import isolated_storage
+
+_storage = ExitStack()
+
+def setup_function(function):
+    """每个测试使用临时数据库和文章目录"""
+    _storage.enter_context(isolated_storage())
+
+def teardown_function(function):
+    _storage.close()
+
 def test_news_fetching_performance():
     """测试新闻获取性能"""
     print("=== 新闻获取性能测试 ===")
@@ -102,6 +114,163 @@ def test_article_generation_performance():
         print(f"❌ 文章生成性能测试失败: {e}")
         return None
 
+def _legacy_analyze(content, title):
+    """优化前的分析实现：关键点逐个正则匹配，实体和情感各自分词一遍"""
+    import re
+    import jieba
+    import jieba.posseg as pseg
+    from src.text_analysis import categorize_news
+
+    sentences = re.split(r'[。！？]', content)
+    important_patterns = [
+        r'\d+%', r'\d+万', r'\d+亿', r'\d+年', r'\d+月',
+        r'宣布', r'发布', r'启动', r'完成', r'增长', r'下降'
+    ]
+    key_points = [s.strip() for s in sentences
+                  if any(re.search(pattern, s) for pattern in important_patterns)][:5]
+
+    entities = [word for word, flag in pseg.cut(content)
+                if flag in ['nr', 'ns', 'nt'] and len(word) > 1]
+
+    words = list(jieba.cut(content))
+    positive_words = ['好', '优秀', '成功', '增长', '提升', '改善', '突破', '创新']
+    negative_words = ['坏', '失败', '下降', '问题', '危机', '困难', '风险', '担忧']
+    positive_count = sum(1 for word in words if word in positive_words)
+    negative_count = sum(1 for word in words if word in negative_words)
+
+    return {
+        'key_points': key_points,
+        'entities': list(set(entities))[:10],
+        'sentiment': 'positive' if positive_count > negative_count else (
+            'negative' if negative_count > positive_count else 'neutral'),
+        'category': categorize_news(title)
+    }
+
+def test_analysis_pipeline_performance():
+    """测试单遍分析流水线与旧实现的单篇分析耗时对比"""
+    print("\n=== 新闻分析流水线性能测试 ===")
+
+    from src.text_analysis import analyze_text
+
+    sentences = [
+        '国家统计局今日发布数据，前三季度GDP同比增长5.2%。',
+        '北京市政府宣布启动新一轮城市更新计划，总投资超过300亿元。',
+        '多家科技企业表示，人工智能芯片的研发投入将继续提升。',
+        '专家指出，当前经济运行仍面临一定风险和困难，但长期向好的趋势没有改变。',
+        '华为公司在深圳完成新一代通信设备的测试工作。',
+        '受国际市场影响，部分出口行业利润出现下降。',
+    ]
+    articles = [(''.join(sentences[i:] + sentences[:i]) * 4, f'测试新闻{i}')
+                for i in range(len(sentences))]
+
+    # 预热jieba词典，避免把加载时间计入
+    analyze_text(articles[0][0], articles[0][1])
+
+    rounds = 5
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        legacy_results = [_legacy_analyze(content, title) for content, title in articles]
+    legacy_time = (time.perf_counter() - start_time) / (rounds * len(articles))
+
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        pipeline_results = [analyze_text(content, title) for content, title in articles]
+    pipeline_time = (time.perf_counter() - start_time) / (rounds * len(articles))
+
+    for legacy, pipeline in zip(legacy_results, pipeline_results):
+        assert legacy['key_points'] == pipeline['key_points']
+        assert legacy['category'] == pipeline['category']
+        assert set(legacy['entities']) == set(pipeline['entities'])
+
+    print(f"✅ 优化前: {legacy_time * 1000:.2f} 毫秒/篇")
+    print(f"✅ 优化后: {pipeline_time * 1000:.2f} 毫秒/篇")
+    print(f"   加速比: {legacy_time / pipeline_time:.2f}x")
+
+    return legacy_time, pipeline_time
+
+def _percentile(values, pct):
+    """计算百分位数（最近秩法）"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def _report_throughput(label, wall_time, latencies, timings_list):
+    """输出吞吐量、延迟分位数和各阶段平均耗时"""
+    print(f"✅ {label}: {len(latencies)} 篇，总耗时 {wall_time:.2f} 秒")
+    print(f"   吞吐量: {len(latencies) / wall_time * 60:.1f} 篇/分钟")
+    print(f"   延迟 p50: {_percentile(latencies, 50):.2f} 秒，p95: {_percentile(latencies, 95):.2f} 秒")
+    stages = {}
+    for timings in timings_list:
+        for stage, value in timings.items():
+            stages.setdefault(stage, []).append(value)
+    if stages:
+        print("   各阶段平均耗时: " + "，".join(
+            f"{stage} {statistics.mean(values):.3f}s" for stage, values in stages.items()))
+
+def test_ai_pipeline_performance(num_articles=8, concurrency=4, latency=0.2, tokens_per_second=1500):
+    """通过本地模拟LLM服务测试AI撰写流程的吞吐量（ArticleWriter和Flask接口）"""
+    print("\n=== AI撰写流程性能测试（模拟LLM服务） ===")
+
+    from unittest import mock
+    from src.config import get_config
+    from tests.stub_llm_server import StubLLMServer
+
+    config = get_config()
+    news_list = [{
+        'id': 66666 + i,
+        'title': f'模拟服务压测新闻{i}：新技术推动产业升级',
+        'content': '最新技术的应用正在推动传统产业的转型升级，为经济发展注入新动力。专家表示，增长趋势将持续。',
+        'summary': '新技术推动产业升级',
+        'source': '性能测试源',
+        'link': f'http://test.com/stub/{i}',
+        'publish_time': datetime.now()
+    } for i in range(num_articles)]
+
+    with StubLLMServer(latency=latency, tokens_per_second=tokens_per_second) as server, \
+            mock.patch.object(config, 'OPENAI_API_KEY', 'stub-key'), \
+            mock.patch.object(config, 'OPENAI_BASE_URL', server.url), \
+            mock.patch.object(config, 'LLM_CACHE_ENABLED', False):
+        from src.article_writer import ArticleWriter
+        writer = ArticleWriter()
+        assert writer.current_ai_model == 'openai'
+
+        def write(news):
+            start_time = time.perf_counter()
+            result = writer.write_article(news)
+            return time.perf_counter() - start_time, result.get('timings', {})
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(write, news_list))
+        writer_wall = time.perf_counter() - start_time
+        _report_throughput('ArticleWriter', writer_wall, [o[0] for o in outcomes], [o[1] for o in outcomes])
+
+        # Flask接口：新闻获取使用固定数据，只测撰写链路；使用新的存储，避免直接复用上面写好的文章
+        with isolated_storage(), \
+                mock.patch('src.news_analyzer.NewsAnalyzer.get_trending_news', return_value=news_list):
+            from src.web_interface import create_app
+            app = create_app()
+
+            def post(news):
+                client = app.test_client()
+                start_time = time.perf_counter()
+                response = client.post('/api/write_article', json={'news_id': news['id']})
+                data = response.get_json()['data']
+                return time.perf_counter() - start_time, data.get('timings', {})
+
+            start_time = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                api_outcomes = list(executor.map(post, news_list))
+            api_wall = time.perf_counter() - start_time
+        _report_throughput('Flask接口', api_wall, [o[0] for o in api_outcomes], [o[1] for o in api_outcomes])
+
+        print(f"   模拟服务统计: {server.stats}")
+
+    return {
+        'writer': {'wall': writer_wall, 'articles_per_min': num_articles / writer_wall * 60},
+        'api': {'wall': api_wall, 'articles_per_min': num_articles / api_wall * 60}
+    }
+
 def test_database_performance():
     """测试数据库性能"""
     print("\n=== 数据库性能测试 ===")
@@ -315,6 +484,13 @@ def run_performance_tests():
     generation_time = test_article_generation_performance()
     results['article_generation'] = {'time': generation_time}
     
+    # 新闻分析性能
+    test_analysis_pipeline_performance()
+
+    # AI撰写流程性能（本地模拟LLM服务）
+    results['ai_pipeline'] = test_ai_pipeline_performance(num_articles=20, concurrency=8,
+                                                          latency=0.5, tokens_per_second=200)
+
     # 数据库性能
     db_time = test_database_performance()
     results['database'] = {'time': db_time}
@@ -349,4 +525,5 @@ def run_performance_tests():
     return results
 
 if __name__ == "__main__":
-    results = run_performance_tests()
+    with isolated_storage():
+        results = run_performance_tests()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词构建测试
+"""
+
+import unittest
+from datetime import datetime
+
+from src.prompt_builder import PromptBuilder, estimate_tokens, split_sentences, textrank
+from tests.storage import isolated_storage
+
+LONG_CONTENT = (
+    '某科技公司今日宣布完成新一轮融资，金额达10亿元。'
+    '本轮融资由多家知名投资机构联合领投，老股东继续跟投。'
+    '公司表示，融资资金将主要用于人工智能芯片研发和市场拓展。'
+    '分析人士认为，人工智能芯片市场正在快速增长，融资将加快公司的研发进度。'
+    '当天下午，公司所在园区举办了一场小型音乐会。'
+    '业内专家指出，芯片研发投入大、周期长，持续融资能力是企业竞争的关键。'
+) * 4
+
+class TestTokenCounting(unittest.TestCase):
+    """token计数测试"""
+
+    def test_estimate_tokens(self):
+        """测试中文按字计数，英文单词按长度估算"""
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('人工智能'), 4)
+        self.assertEqual(estimate_tokens('hello world'), 4)
+        self.assertEqual(estimate_tokens('融资10亿元。'), 6)
+        print("✅ token估算测试通过")
+
+    def test_split_sentences(self):
+        """测试按句末标点切分并保留标点"""
+        sentences = split_sentences('第一句。第二句！\n第三句')
+        self.assertEqual(sentences, ['第一句。', '第二句！', '第三句'])
+        print("✅ 句子切分测试通过")
+
+class TestCompression(unittest.TestCase):
+    """原文压缩测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def test_textrank_prefers_central_sentences(self):
+        """测试与其他句子关联最多的句子得分更高"""
+        sentences = split_sentences(LONG_CONTENT)[:6]
+        scores = textrank(sentences)
+        # 与融资、芯片主题无关的音乐会句子得分最低
+        self.assertEqual(scores.index(min(scores)), 4)
+        print("✅ TextRank测试通过")
+
+    def test_compress_fits_budget_in_original_order(self):
+        """测试压缩结果不超过预算、按原文顺序拼接且去掉重复句"""
+        builder = PromptBuilder(source_budget=80)
+        compressed = builder.compress(LONG_CONTENT)
+
+        self.assertLessEqual(builder.count(compressed), 80)
+        sentences = split_sentences(compressed)
+        self.assertEqual(len(sentences), len(set(sentences)))
+        original = split_sentences(LONG_CONTENT)[:6]
+        self.assertEqual(sentences, [s for s in original if s in sentences])
+        # 短文本原样返回
+        self.assertEqual(builder.compress('短新闻。'), '短新闻。')
+        print(f"✅ 原文压缩测试通过 ({builder.count(LONG_CONTENT)} -> {builder.count(compressed)} tokens)")
+
+    def test_fit_list_and_stats(self):
+        """测试列表按预算截取和提示词token统计"""
+        builder = PromptBuilder(list_budget=10)
+        self.assertEqual(builder.fit_list(['人工智能', '芯片研发', '融资']), '人工智能, 芯片研发')
+
+        builder.record('title', '生成一个标题')
+        builder.record('title', '生成一个更长的标题')
+        stats = builder.get_stats()['title']
+        self.assertEqual(stats['prompts'], 2)
+        self.assertEqual(stats['max_tokens'], 9)
+        print("✅ 列表截取和统计测试通过")
+
+    def test_writer_prompt_uses_budget(self):
+        """测试撰写器的正文提示词使用压缩后的原文并报告token数"""
+        from src.article_writer import ArticleWriter
+
+        writer = ArticleWriter()
+        writer.prompt_builder = PromptBuilder(source_budget=80)
+        news = {
+            'id': 97531,
+            'title': '提示词预算测试新闻',
+            'content': LONG_CONTENT,
+            'summary': '提示词预算测试摘要',
+            'source': '测试来源',
+            'link': 'http://test.com/prompt-budget',
+            'publish_time': datetime.now()
+        }
+        analysis = writer._analyze_news_content(news)
+        prompt = writer._build_content_prompt(news, analysis, 'analysis', 'professional')
+
+        self.assertIn(writer.prompt_builder.compress(LONG_CONTENT), prompt)
+        self.assertNotIn(LONG_CONTENT[:300], prompt)
+        tokens = writer._prompt_tokens(news, analysis, 'analysis', 'professional')
+        self.assertEqual(tokens['content'], writer.prompt_builder.count(prompt))
+        print(f"✅ 撰写器提示词预算测试通过 ({tokens})")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM调用限流测试
+"""
+
+import os
+import time
+import tempfile
+import unittest
+
+import openai
+
+from src.rate_limiter import AIMDLimiter, LLMRateLimiter, SQLiteTokenBucket, TokenBucket
+from tests.stub_llm_server import StubLLMServer
+
+class TestTokenBucket(unittest.TestCase):
+    """令牌桶测试"""
+
+    def test_refill_rate(self):
+        """测试突发量用完后按速率补充"""
+        bucket = TokenBucket(rate_per_minute=600, capacity=2)  # 每秒10个
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.25)
+        print("✅ 令牌桶速率测试通过")
+
+    def test_shared_bucket(self):
+        """测试多个实例（模拟多进程）共享同一配额"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'rate_limit.db')
+            worker_a = SQLiteTokenBucket(path, 'requests', rate_per_minute=600, capacity=3)
+            worker_b = SQLiteTokenBucket(path, 'requests', rate_per_minute=600, capacity=3)
+
+            self.assertLess(worker_a.acquire(3), 0.05)
+            start = time.monotonic()
+            worker_b.acquire(1)
+            self.assertGreaterEqual(time.monotonic() - start, 0.08)
+        print("✅ 共享令牌桶测试通过")
+
+class TestAIMDLimiter(unittest.TestCase):
+    """自适应并发测试"""
+
+    def test_additive_increase_multiplicative_decrease(self):
+        """测试正常时缓慢增加、限流时减半"""
+        limiter = AIMDLimiter(initial=8, minimum=1, maximum=16, cooldown=0)
+        limiter.acquire()
+        limiter.release(latency=0.1, throttled=True)
+        self.assertEqual(limiter.limit, 4)
+
+        for _ in range(8):
+            limiter.acquire()
+            limiter.release(latency=0.1)
+        self.assertGreater(limiter.limit, 5)
+        self.assertLess(limiter.limit, 7)
+
+        slow = AIMDLimiter(initial=8, latency_target=0.5, cooldown=0)
+        slow.acquire()
+        slow.release(latency=1.0)
+        self.assertEqual(slow.limit, 4)
+        print("✅ AIMD并发调整测试通过")
+
+class TestLLMRateLimiter(unittest.TestCase):
+    """限流器重试测试"""
+
+    def test_retry_after_429(self):
+        """测试遇到429时按Retry-After重试直到成功"""
+        with StubLLMServer(fail_first=2, retry_after=0.1) as server:
+            client = openai.OpenAI(api_key='stub-key', base_url=server.url, max_retries=0)
+            limiter = LLMRateLimiter(max_concurrency=4, base_delay=0.01)
+
+            start = time.monotonic()
+            response = limiter.call(client.chat.completions.create, model='stub-model',
+                                    messages=[{'role': 'user', 'content': 'a'}], estimated_tokens=10)
+            elapsed = time.monotonic() - start
+
+        self.assertTrue(response.choices[0].message.content)
+        self.assertGreaterEqual(elapsed, 0.2)
+        stats = limiter.get_stats()
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['throttled'], 2)
+        self.assertLess(stats['concurrency_limit'], 4)
+        print(f"✅ 429退避重试测试通过 (stats: {stats})")
+
+    def test_non_retryable_error(self):
+        """测试不可重试的错误直接抛出"""
+        limiter = LLMRateLimiter(max_retries=3)
+        calls = []
+
+        def bad_request():
+            calls.append(1)
+            raise ValueError('参数错误')
+
+        with self.assertRaises(ValueError):
+            limiter.call(bad_request)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(limiter.get_stats()['failures'], 1)
+        print("✅ 不可重试错误测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
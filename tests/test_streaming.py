@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式生成测试
+"""
+
+import json
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from src.article_writer import ArticleWriter
+from tests.fakes import FakeChatClient
+from tests.storage import isolated_storage
+
+def _sample_news():
+    return {
+        'id': 67890,
+        'title': '流式生成测试新闻',
+        'content': '某公司宣布完成新一轮融资，金额达10亿元。',
+        'summary': '流式生成测试摘要',
+        'source': '测试来源',
+        'link': 'http://test.com/streaming',
+        'publish_time': datetime.now()
+    }
+
+class TestStreamArticle(unittest.TestCase):
+    """流式撰写测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def test_ai_stream_events(self):
+        """测试AI模式逐段输出正文，最后给出完整结果"""
+        content = '## 导语\n\n这是一段用于流式输出测试的模拟正文内容。'
+        writer = ArticleWriter()
+        writer.ai_clients['openai'] = FakeChatClient(delay=0.05, content=content, chunk_size=5)
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+
+        events = list(writer.stream_article(_sample_news()))
+        names = [event['event'] for event in events]
+        tokens = [event['data']['text'] for event in events if event['event'] == 'token']
+
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual(''.join(tokens), content)
+        self.assertEqual(names.count('title'), 1)
+        self.assertEqual(names[-1], 'done')
+
+        done = events[-1]['data']
+        self.assertEqual(done['content'], content.strip())
+        self.assertIn('total_score', done['quality'])
+        self.assertLessEqual(done['timings']['first_token'], done['timings']['total'])
+        print(f"✅ AI流式撰写测试通过 (timings: {done['timings']})")
+
+    def test_stream_endpoint(self):
+        """测试SSE接口按事件格式输出（模板模式）"""
+        from src.web_interface import create_app
+
+        with mock.patch('src.news_analyzer.NewsAnalyzer.get_trending_news',
+                        return_value=[_sample_news()]), \
+                mock.patch.object(ArticleWriter, '_is_ai_available', return_value=False):
+            app = create_app()
+            client = app.test_client()
+
+            response = client.post('/api/write_article/stream', json={'news_id': 67890})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.mimetype.startswith('text/event-stream'))
+            body = response.get_data(as_text=True)
+
+            missing = client.post('/api/write_article/stream', json={'news_id': 1})
+            self.assertEqual(missing.status_code, 404)
+
+        events = []
+        for block in body.strip().split('\n\n'):
+            lines = dict(line.split(': ', 1) for line in block.split('\n'))
+            events.append((lines['event'], json.loads(lines['data'])))
+
+        self.assertEqual(events[0][0], 'token')
+        self.assertEqual(events[-1][0], 'done')
+        self.assertIn('title', [name for name, _ in events])
+        self.assertTrue(events[-1][1]['filename'])
+        print("✅ 流式接口测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟LLM服务测试
+"""
+
+import time
+import unittest
+
+import openai
+
+from tests.stub_llm_server import StubLLMServer
+
+class TestStubLLMServer(unittest.TestCase):
+    """模拟服务与openai客户端的兼容性测试"""
+
+    def _client(self, server, max_retries=0):
+        return openai.OpenAI(api_key='stub-key', base_url=server.url, max_retries=max_retries)
+
+    def test_completion_and_canned_response(self):
+        """测试普通调用、固定回复和生成速度"""
+        with StubLLMServer(latency=0.05, tokens_per_second=200,
+                           responses={'固定': '固定回复内容'}) as server:
+            client = self._client(server)
+
+            start = time.perf_counter()
+            response = client.chat.completions.create(
+                model='stub-model', messages=[{'role': 'user', 'content': '请给出固定回复'}])
+            elapsed = time.perf_counter() - start
+
+            title = client.chat.completions.create(
+                model='stub-model',
+                messages=[{'role': 'user', 'content': '原标题：测试新闻\n请只返回标题，不要其他内容。'}])
+
+        self.assertEqual(response.choices[0].message.content, '固定回复内容')
+        self.assertGreaterEqual(elapsed, 0.05 + len('固定回复内容') / 200)
+        self.assertIn('测试新闻', title.choices[0].message.content)
+        print("✅ 模拟服务普通调用测试通过")
+
+    def test_streaming(self):
+        """测试流式输出"""
+        with StubLLMServer(chunk_size=3, responses={'流式': '这是一段流式输出的内容'}) as server:
+            stream = self._client(server).chat.completions.create(
+                model='stub-model', messages=[{'role': 'user', 'content': '流式'}], stream=True)
+            pieces = [chunk.choices[0].delta.content for chunk in stream
+                      if chunk.choices and chunk.choices[0].delta.content]
+
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual(''.join(pieces), '这是一段流式输出的内容')
+        self.assertEqual(server.stats['streams'], 1)
+        print("✅ 模拟服务流式输出测试通过")
+
+    def test_error_injection(self):
+        """测试429/500错误注入"""
+        with StubLLMServer(fail_first=1, retry_after=0) as server:
+            client = self._client(server)
+            with self.assertRaises(openai.RateLimitError):
+                client.chat.completions.create(model='stub-model', messages=[{'role': 'user', 'content': 'a'}])
+            response = client.chat.completions.create(
+                model='stub-model', messages=[{'role': 'user', 'content': 'a'}])
+            self.assertTrue(response.choices[0].message.content)
+
+        with StubLLMServer(error_rate_500=1.0) as server:
+            with self.assertRaises(openai.InternalServerError):
+                self._client(server).chat.completions.create(
+                    model='stub-model', messages=[{'role': 'user', 'content': 'a'}])
+
+        self.assertEqual(server.stats['errors_500'], 1)
+        print("✅ 模拟服务错误注入测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
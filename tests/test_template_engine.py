@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量模板渲染测试
+"""
+
+import io
+import json
+import time
+import unittest
+
+from src import text_analysis
+from src.article_templates import template_manager
+from src.template_engine import TemplateEngine, render_many, write_jsonl
+
+def _sample_news(count):
+    return [{
+        'id': i,
+        'title': f'模板引擎测试新闻{i}',
+        'content': f'某科技公司宣布完成第{i}轮融资，金额达10亿元，资金将用于人工智能芯片研发。',
+        'summary': f'模板引擎测试摘要{i}',
+        'source': '测试来源'
+    } for i in range(count)]
+
+class TestTemplateEngine(unittest.TestCase):
+    """批量模板渲染测试"""
+
+    def test_matches_template_manager(self):
+        """测试预编译计划的渲染结果与逐章生成完全一致"""
+        engine = TemplateEngine()
+        news = _sample_news(1)[0]
+        analysis = text_analysis.analyze_news(news)
+
+        for article_type in template_manager.get_available_types() + ['unknown']:
+            self.assertEqual(engine.render_content(article_type, news, analysis),
+                             template_manager.generate_structure_content(article_type, news, analysis))
+        print("✅ 渲染结果一致性测试通过")
+
+    def test_render_many_in_processes_keeps_order(self):
+        """测试多进程分块渲染按输入顺序产出，单条错误不影响其他条目"""
+        news_list = _sample_news(50)
+        analyses = [text_analysis.analyze_news(news) for news in news_list]
+        items = list(zip(news_list, analyses))
+        items[7] = ({'id': 7, 'title': '缺少来源字段'}, analyses[7], 'breaking_news')
+
+        results = list(render_many(iter(items), article_type='analysis', processes=2, chunk_size=8))
+
+        self.assertEqual([result['news_id'] for result in results], list(range(50)))
+        self.assertIn('error', results[7])
+        self.assertEqual(results[0]['article_type'], 'analysis')
+        self.assertEqual(results[1]['content'],
+                         template_manager.generate_structure_content('analysis', news_list[1], analyses[1]))
+        print("✅ 多进程批量渲染测试通过")
+
+    def test_streaming_throughput(self):
+        """测试流式写出JSON Lines并报告渲染速度"""
+        news_list = _sample_news(2000)
+        analysis = text_analysis.analyze_news(news_list[0])
+        stream = io.StringIO()
+
+        start = time.time()
+        count = write_jsonl(render_many(((news, analysis) for news in news_list), processes=1), stream)
+        elapsed = time.time() - start
+
+        self.assertEqual(count, 2000)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(json.loads(lines[-1])['news_id'], 1999)
+        print(f"✅ 流式渲染测试通过 ({count / max(elapsed, 1e-6):.0f} 篇/秒)")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本分析测试
+"""
+
+import os
+import json
+import tempfile
+import unittest
+
+import jieba
+
+from src.keyword_matcher import KeywordMatcher
+from src.news_analyzer import NewsAnalyzer
+from tests.storage import isolated_storage
+
+def _legacy_sentiment(news_content):
+    """原有情感评分：按jieba分词整词统计正负面词"""
+    positive_words = ['好', '优秀', '成功', '增长', '提升', '改善', '突破']
+    negative_words = ['坏', '失败', '下降', '问题', '危机', '困难', '风险']
+    words = list(jieba.cut(news_content))
+    positive_count = sum(1 for word in words if word in positive_words)
+    negative_count = sum(1 for word in words if word in negative_words)
+    if positive_count > negative_count:
+        return 'positive'
+    elif negative_count > positive_count:
+        return 'negative'
+    return 'neutral'
+
+class TestKeywordMatcher(unittest.TestCase):
+    """关键词匹配器测试"""
+
+    def test_overlapping_matches(self):
+        """测试重叠词和跨词典命中"""
+        matcher = KeywordMatcher({'a': ['he', 'she', 'hers'], 'b': ['she']})
+        hits = matcher.scan('ushers')
+
+        self.assertEqual(hits['a'], {'he': 1, 'she': 1, 'hers': 1})
+        self.assertEqual(hits['b'], {'she': 1})
+        self.assertEqual(matcher.count('she sells, he sees'), {'a': 3, 'b': 1})
+        print("✅ 关键词重叠匹配测试通过")
+
+    def test_default_dictionaries(self):
+        """测试默认词典与原有分类、质量评估逻辑一致"""
+        matcher = KeywordMatcher()
+
+        self.assertEqual(matcher.categorize('人工智能芯片取得突破'), '科技')
+        self.assertEqual(matcher.categorize('科技创新推动经济发展'), '经济')
+        self.assertEqual(matcher.categorize('今日天气晴'), '综合')
+
+        hits = matcher.distinct('专家分析认为，市场数据向好。因此，此外，同时')
+        self.assertEqual(hits['quality'], 4)
+        self.assertEqual(hits['connector'], 3)
+        print("✅ 默认词典测试通过")
+
+    def test_hot_reload(self):
+        """测试词典文件修改后自动重新加载"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'keywords.json')
+            matcher = KeywordMatcher(dictionary_file=path, check_interval=0)
+            self.assertEqual(matcher.categorize('新能源汽车销量创新高'), '科技')
+            fingerprint = matcher.fingerprint
+
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'category:汽车': ['新能源汽车']}, f, ensure_ascii=False)
+            matcher.reload_if_changed()
+
+            self.assertIn('汽车', matcher.categories())
+            self.assertNotEqual(matcher.fingerprint, fingerprint)
+            self.assertIn('新能源汽车', matcher.scan('新能源汽车销量')['category:汽车'])
+        print("✅ 词典热加载测试通过")
+
+class TestSentiment(unittest.TestCase):
+    """新闻情感测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def test_parity_with_legacy_scorer(self):
+        """测试情感按整词匹配，与原有评分结果一致"""
+        analyzer = NewsAnalyzer()
+        samples = [
+            '公司业绩增长，产品质量优秀，市场表现很好。',
+            '项目失败，销量下降，面临困难和风险。',
+            '他好像没来，大家都在讨论这个问题。',
+            '坏天气导致航班延误，但救援取得突破，转危为安。',
+            '会议按计划举行。',
+        ]
+        for sample in samples:
+            self.assertEqual(analyzer.get_news_sentiment(sample), _legacy_sentiment(sample), sample)
+        print("✅ 情感评分一致性测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM用量账本测试
+"""
+
+import time
+import threading
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from src.article_writer import ArticleWriter
+from src.database import get_database_manager
+from src.llm_providers import CallTrace, ClaudeProvider, LLMRouter
+from src.usage_ledger import UsageLedger, percentile, summarize
+from tests.fakes import FakeChatClient
+from tests.storage import isolated_storage
+from tests.stub_llm_server import StubLLMServer
+
+class MemoryDatabase:
+    """只保存LLM调用记录的内存数据库"""
+
+    available = True
+
+    def __init__(self):
+        self.calls = []
+
+    def save_llm_calls(self, calls):
+        self.calls.extend(calls)
+        return len(calls)
+
+def _call(day, latency_ms, article_type='analysis', cache_hit=False, outcome='ok'):
+    return {
+        'created_at': day, 'kind': 'content', 'article_type': article_type, 'provider': 'openai',
+        'model': 'gpt-test', 'prompt_tokens': 0 if cache_hit else 100, 'completion_tokens': 0 if cache_hit else 50,
+        'tokens_estimated': False, 'latency_ms': latency_ms, 'retries': 1 if outcome == 'error' else 0,
+        'cache_hit': cache_hit, 'outcome': outcome
+    }
+
+class TestUsageSummary(unittest.TestCase):
+    """用量汇总测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+        self.db = get_database_manager()
+        if not self.db.available:
+            self.skipTest("数据库不可用")
+
+    def test_summarize_groups_and_percentiles(self):
+        """测试数据库按天、文章类型汇总，分位数只统计真正请求服务商的成功调用"""
+        today = datetime.utcnow().replace(hour=8, minute=0, second=0, microsecond=0)
+        yesterday = today - timedelta(days=1)
+        calls = [_call(today, latency) for latency in range(100, 1100, 100)]
+        calls += [_call(today, 0, cache_hit=True), _call(yesterday, 5000, 'feature', outcome='error'),
+                  _call(today - timedelta(days=30), 100), _call(today, 100, article_type=None)]
+        self.db.save_llm_calls(calls)
+
+        summary = summarize(self.db, since=today - timedelta(days=3))
+        day = today.strftime('%Y-%m-%d')
+
+        self.assertEqual(summary['totals']['calls'], 13)
+        self.assertEqual(summary['totals']['errors'], 1)
+        self.assertEqual(summary['totals']['retries'], 1)
+        self.assertEqual(summary['by_day'][day]['cache_hits'], 1)
+        self.assertEqual(summary['by_day'][day]['latency_p50_ms'], 500)
+        self.assertEqual(summary['by_day'][day]['latency_p95_ms'], 1000)
+        self.assertEqual(summary['by_day'][yesterday.strftime('%Y-%m-%d')]['errors'], 1)
+        self.assertEqual(summary['by_article_type']['analysis']['prompt_tokens'], 1000)
+        self.assertEqual(summary['by_article_type']['other']['calls'], 1)
+        self.assertIsNone(summary['by_article_type']['feature']['latency_p50_ms'])
+        self.assertEqual(summary['by_model']['gpt-test']['calls'], 13)
+        self.assertIsNone(percentile([], 50))
+        print("✅ 用量汇总测试通过")
+
+    def test_ledger_flushes_in_background(self):
+        """测试账本由后台线程按批和按时间写入，record不在调用线程中写库，汇总前写入剩余记录"""
+        writers = []
+        save_llm_calls = self.db.save_llm_calls
+
+        def save(calls):
+            writers.append((threading.current_thread().name, len(calls)))
+            return save_llm_calls(calls)
+
+        def wait_for(count):
+            for _ in range(100):
+                if len(writers) >= count:
+                    return
+                time.sleep(0.02)
+
+        with mock.patch.object(self.db, 'save_llm_calls', side_effect=save):
+            ledger = UsageLedger(self.db, batch_size=3, flush_interval=3600)
+            for _ in range(3):
+                ledger.record('title', 'gpt-test', prompt_tokens=10, completion_tokens=5, latency=0.25)
+            wait_for(1)
+            self.assertEqual(writers, [('usage-ledger', 3)])
+
+            ledger.record('title', 'gpt-test', prompt_tokens=10, completion_tokens=5, latency=0.25)
+            summary = ledger.summary(days=1)
+            self.assertEqual(summary['totals']['calls'], 4)
+            self.assertEqual(summary['totals']['completion_tokens'], 20)
+            self.assertEqual(self.db.get_llm_latencies()[0]['latency_ms'], 250)
+            ledger.close()
+
+            timed = UsageLedger(self.db, batch_size=100, flush_interval=0.05)
+            timed.record('content', 'gpt-test')
+            wait_for(3)
+            self.assertEqual(writers[-1], ('usage-ledger', 1))
+            timed.close()
+        print("✅ 账本后台写入测试通过")
+
+class TestUsageRecording(unittest.TestCase):
+    """LLM调用记录测试"""
+
+    def setUp(self):
+        self.enterContext(isolated_storage())
+
+    def _writer(self, client):
+        writer = ArticleWriter()
+        writer.ai_clients = {'openai': client}
+        writer.current_ai_model = 'openai'
+        writer.llm_cache = None
+        writer.usage_ledger = UsageLedger(MemoryDatabase(), batch_size=1000, flush_interval=3600)
+        return writer
+
+    def test_writer_records_calls(self):
+        """测试成功、缓存命中和失败的调用都写入账本"""
+        writer = self._writer(FakeChatClient(delay=0.01, content='用量测试标题'))
+        writer._chat_completion('生成一个标题', 100, 0.7, kind='title', article_type='analysis')
+
+        writer.llm_cache = mock.Mock()
+        writer.llm_cache.get.return_value = '缓存的标题'
+        writer._chat_completion('生成一个标题', 100, 0.7, kind='title', article_type='analysis')
+        writer.llm_cache = None
+
+        def fail(prompt):
+            raise RuntimeError('服务不可用')
+        writer.ai_clients = {'openai': FakeChatClient(delay=0, responder=fail)}
+        with self.assertRaises(RuntimeError):
+            writer._chat_completion('生成正文', 500, 0.7, kind='content', article_type='feature')
+
+        writer.usage_ledger.flush()
+        ok, cached, failed = writer.usage_ledger.db_manager.calls
+        self.assertEqual((ok['kind'], ok['article_type'], ok['outcome']), ('title', 'analysis', 'ok'))
+        self.assertTrue(ok['tokens_estimated'])
+        self.assertEqual(ok['completion_tokens'], writer.prompt_builder.count('用量测试标题'))
+        self.assertTrue(cached['cache_hit'])
+        self.assertEqual(cached['prompt_tokens'], 0)
+        self.assertEqual((failed['outcome'], failed['article_type']), ('error', 'feature'))
+        print("✅ 撰写器调用记录测试通过")
+
+    def test_calls_attributed_to_article_type(self):
+        """测试分章节生成、章节改进等调用都计入文章类型，各类型之和等于总数"""
+        writer = self._writer(FakeChatClient(delay=0.01, content='分章节测试内容。'))
+        writer.usage_ledger = UsageLedger(get_database_manager(), batch_size=1000, flush_interval=3600)
+        news = {'id': 'usage-type-1', 'title': '某公司发布新一代芯片', 'content': '某公司今日发布新一代芯片。',
+                'summary': '新一代芯片', 'source': '测试来源', 'link': 'http://test.com/usage/1',
+                'publish_time': datetime.now()}
+
+        writer.write_article(news, article_type='analysis')
+        summary = writer.usage_ledger.summary(days=1)
+        writer.usage_ledger.close()
+
+        self.assertIn('section', summary['by_kind'])
+        self.assertTrue({'improve', 'improve_section'} & set(summary['by_kind']))
+        self.assertEqual(set(summary['by_article_type']), {'analysis'})
+        self.assertEqual(sum(stats['calls'] for stats in summary['by_article_type'].values()),
+                         summary['totals']['calls'])
+        print(f"✅ 文章类型归属测试通过 (调用: {summary['totals']['calls']})")
+
+    def test_provider_usage_and_attempts(self):
+        """测试服务商返回的真实用量和故障切换次数"""
+        with StubLLMServer(responses={'你好': '模拟回复'}) as server:
+            broken = ClaudeProvider('stub-key', 'claude-broken', 'http://127.0.0.1:9')
+            claude = ClaudeProvider('stub-key', 'claude-test', server.base_url)
+            router = LLMRouter([broken, claude], hedge_enabled=False)
+            trace = CallTrace()
+
+            result = router.generate('你好', 100, 0.7, trace=trace)
+
+        self.assertEqual(result.text, '模拟回复')
+        self.assertEqual((result.prompt_tokens, result.completion_tokens), (len('你好'), len('模拟回复')))
+        self.assertEqual((trace.model, trace.retries), ('claude-test', 1))
+        print("✅ 服务商用量测试通过")
+
+    def test_usage_endpoint(self):
+        """测试用量汇总接口"""
+        from src.web_interface import create_app
+
+        app = create_app()
+        client = app.test_client()
+
+        response = client.get('/api/llm/usage?days=3')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()['data']
+        self.assertEqual(data['days'], 3)
+        self.assertIn('latency_p95_ms', data['totals'])
+        self.assertEqual(client.get('/api/llm/usage?days=abc').status_code, 400)
+        app.job_manager.stop()
+        print("✅ 用量接口测试通过")
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)